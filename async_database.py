@@ -0,0 +1,253 @@
+# async_database.py
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import database as db
+import report
+import storage
+
+# STORAGE_BACKEND အတိုင်း database.py (Mongo) (သို့) sqlite_storage.py ကို သုံးပါ (storage.py)
+backend = storage.load_backend()
+
+# --- Executor ---
+# pymongo/sqlite3 က blocking driver ဖြစ်လို့ DB call တိုင်းကို bounded thread pool ထဲမှာ run ပါ။
+# Main bot နဲ့ clone bot အားလုံး event loop တစ်ခုတည်းကို share လုပ်ထားလို့
+# Mongo query တစ်ခု နှေးနေလည်း အခြား chat တွေကို မပိတ်ဆို့စေရပါ။ Migration/backfill/archive ကဲ့သို့ background job
+# များလည်း run() ဖြင့် ဒီ pool ကိုပဲ သုံးလို့ DB concurrency သည် DB_MAX_WORKERS ထက် မကျော်ပါ။ (job တစ်ခု worker တစ်ခု)
+DB_MAX_WORKERS = int(os.environ.get("DB_MAX_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="db")
+
+async def run(func, *args, **kwargs):
+    """Sync function တစ်ခုကို DB executor ထဲမှာ run ပြီး result ကို ပြန်ပေးပါ။"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+def _async(func):
+    """Storage backend function တစ်ခုကို await လုပ်လို့ရတဲ့ version အဖြစ် ပြောင်းပါ။"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(func, *args, **kwargs)
+    return wrapper
+
+# --- User Functions ---
+
+get_user = _async(backend.get_user)
+get_user_profile = _async(backend.get_user_profile)
+get_user_summary = _async(backend.get_user_summary)
+create_user = _async(backend.create_user)
+get_balance = _async(backend.get_balance)
+has_pending_topup = _async(backend.has_pending_topup)
+backfill_pending_topup_counts = _async(backend.backfill_pending_topup_counts)
+update_balance = _async(backend.update_balance)
+
+async def iter_users(projection=None, batch_size=storage.USER_BATCH_SIZE):
+    """
+    User document များကို async generator အဖြစ် ပေးပါ။ Batch တစ်ခုစီကိုသာ executor ထဲမှာ ဆွဲယူလို့
+    Event loop ကို မပိတ်ဆို့ဘဲ memory ထဲမှာ batch တစ်ခုစာသာ ရှိပါတယ်။
+    """
+    batches = backend.iter_user_batches(projection, batch_size)
+    while True:
+        batch = await run(next, batches, None)
+        if batch is None:
+            break
+        for user_doc in batch:
+            yield user_doc
+
+# --- Balance Ledger ---
+
+ledger_balance = _async(backend.ledger_balance)
+get_ledger_entries = _async(backend.get_ledger_entries)
+snapshot_balances = _async(backend.snapshot_balances)
+open_balance_ledger = _async(backend.open_balance_ledger)
+
+# --- Index Management ---
+
+ensure_indexes = _async(backend.ensure_indexes)
+verify_query_plans = _async(backend.verify_query_plans)
+
+# --- Order & Topup Functions ---
+
+add_order = _async(backend.add_order)
+place_order = _async(backend.place_order)
+add_topup = _async(backend.add_topup)
+find_and_update_order = _async(backend.find_and_update_order)
+cancel_order = _async(backend.cancel_order)
+find_and_update_topup = _async(backend.find_and_update_topup)
+approve_topup = _async(backend.approve_topup)
+get_recent_history = _async(backend.get_recent_history)
+get_history_page = _async(backend.get_history_page)
+get_user_orders = _async(backend.get_user_orders)
+get_user_topups = _async(backend.get_user_topups)
+get_order_by_id = _async(backend.get_order_by_id)
+get_topup_by_id = _async(backend.get_topup_by_id)
+get_latest_pending_topup = _async(backend.get_latest_pending_topup)
+get_group_chat_ids = _async(backend.get_group_chat_ids)
+list_group_chats = _async(backend.list_group_chats)
+count_group_chats = _async(backend.count_group_chats)
+group_chats_ready = _async(backend.group_chats_ready)
+backfill_group_chats = _async(backend.backfill_group_chats)
+legacy_records_pending = _async(backend.legacy_records_pending)
+daily_stats_ready = _async(backend.daily_stats_ready)
+rebuild_daily_stats = _async(backend.rebuild_daily_stats)
+
+# --- Report Functions ---
+
+async def sales_report(start, end, granularity="day"):
+    """Cache ထဲမှာ ရှိရင် executor thread မသုံးဘဲ ချက်ချင်း ပြန်ပေးပါ။"""
+    if backend is not db:
+        return await run(backend.sales_report, start, end, granularity)
+    cached = report.cached_sales_report(start, end, granularity)
+    if cached is not None:
+        return cached
+    return await run(report.sales_report, start, end, granularity)
+
+# --- Price Functions ---
+
+load_prices = _async(backend.load_prices)
+save_prices = _async(backend.save_prices)
+
+# --- Authorization Functions ---
+
+is_user_authorized = _async(backend.is_user_authorized)
+count_authorized_users = _async(backend.count_authorized_users)
+add_authorized_user = _async(backend.add_authorized_user)
+remove_authorized_user = _async(backend.remove_authorized_user)
+migrate_auth_list = _async(backend.migrate_auth_list)
+
+# --- Admin Functions ---
+
+load_admin_ids = _async(backend.load_admin_ids)
+add_admin = _async(backend.add_admin)
+remove_admin = _async(backend.remove_admin)
+
+# --- Settings Functions ---
+
+load_settings = _async(backend.load_settings)
+update_setting = _async(backend.update_setting)
+
+# --- Clone Bot Functions ---
+
+load_clone_bots = _async(backend.load_clone_bots)
+save_clone_bot = _async(backend.save_clone_bot)
+remove_clone_bot = _async(backend.remove_clone_bot)
+get_clone_bot_by_admin = _async(backend.get_clone_bot_by_admin)
+update_clone_bot_balance = _async(backend.update_clone_bot_balance)
+
+# --- Per-update Unit of Work ---
+
+class UnitOfWork:
+    """
+    Update တစ်ခုအတွင်း user တစ်ယောက်၏ field တစ်ခုကို DB မှ တစ်ကြိမ်သာ load လုပ်ပါ (identity map)။
+    Projection အမျိုးမျိုးဖြင့် ဖတ်ထားတဲ့ field များကို user တစ်ယောက်ချင်း document တစ်ခုထဲ ပေါင်းသိမ်းပြီး
+    Write များကို DB သို့ ပို့ပြီး cache ထဲက document ကိုပါ တစ်ခါတည်း update လုပ်ပါ။
+    """
+
+    def __init__(self):
+        self._users = {}
+        self._loaded = {}
+
+    async def _load(self, user_id, fields, loader):
+        """fields အားလုံး cache ထဲမှာ မရှိမှသာ loader ဖြင့် DB မှ ဖတ်ပါ။ User မရှိရင် None ပြန်ပေးပါ။"""
+        user_id = str(user_id)
+        if user_id in self._users and self._users[user_id] is None:
+            return None
+        loaded = self._loaded.setdefault(user_id, set())
+        if not set(fields) <= loaded:
+            doc = await loader(user_id)
+            if doc is None:
+                self._users[user_id] = None
+                return None
+            self._users.setdefault(user_id, {}).update(doc)
+            loaded.update(fields)
+        return self._users[user_id]
+
+    def _patch(self, user_id, field, change):
+        """Cache ထဲမှာ load ပြီးသား field ဖြစ်မှသာ တန်ဖိုးကို တိုး/လျော့ ပါ။"""
+        user = self._users.get(str(user_id))
+        if user is not None and field in self._loaded.get(str(user_id), ()):
+            user[field] = user.get(field, 0) + change
+
+    async def get_profile(self, user_id):
+        return await self._load(user_id, storage.PROFILE_FIELDS, get_user_profile)
+
+    async def get_summary(self, user_id):
+        return await self._load(user_id, storage.SUMMARY_FIELDS, get_user_summary)
+
+    async def get_balance(self, user_id):
+        async def load_balance(uid):
+            return {"balance": await get_balance(uid)}
+        user = await self._load(user_id, storage.BALANCE_FIELDS, load_balance)
+        return user.get("balance", 0) if user else 0
+
+    async def has_pending_topup(self, user_id):
+        user = self._users.get(str(user_id))
+        if user is not None and "pending_topup_count" in self._loaded.get(str(user_id), ()):
+            return user.get("pending_topup_count", 0) > 0
+        return await has_pending_topup(user_id)
+
+    def forget(self, user_id):
+        """Cache ထဲက user data ကို ဖယ်ပါ။ နောက်တစ်ကြိမ် ဖတ်ရင် DB မှ ပြန် load လုပ်မည်။"""
+        user_id = str(user_id)
+        self._users.pop(user_id, None)
+        self._loaded.pop(user_id, None)
+
+    async def create_user(self, user_id, name, username):
+        await create_user(user_id, name, username)
+        self.forget(user_id)
+
+    async def update_balance(self, user_id, amount_change, reason="adjustment", ref_id=None):
+        await update_balance(user_id, amount_change, reason, ref_id)
+        if self._users.get(str(user_id)) is None:
+            self.forget(user_id) # upsert က document အသစ် ဆောက်နိုင်သည်
+        else:
+            self._patch(user_id, "balance", amount_change)
+
+    async def place_order(self, user_id, order_data):
+        new_balance = await place_order(user_id, order_data)
+        if new_balance is None or self._users.get(str(user_id)) is None:
+            self.forget(user_id) # Balance က တခြား update ကြောင့် ပြောင်းသွားနိုင်သည်
+        else:
+            self._users[str(user_id)]["balance"] = new_balance
+            self._loaded[str(user_id)].add("balance")
+            self._patch(user_id, "order_count", 1)
+        return new_balance
+
+    async def add_topup(self, user_id, topup_data):
+        await add_topup(user_id, topup_data)
+        self.forget(user_id) # Pending topup counter ပြောင်းသွားသည်
+
+    async def find_and_update_order(self, order_id, updates):
+        target_user_id = await find_and_update_order(order_id, updates)
+        if target_user_id:
+            self.forget(target_user_id)
+        return target_user_id
+
+    async def find_and_update_topup(self, topup_id, updates):
+        target_user_id = await find_and_update_topup(topup_id, updates)
+        if target_user_id:
+            self.forget(target_user_id) # Balance နဲ့ pending counter ပြောင်းသွားနိုင်သည်
+        return target_user_id
+
+    async def cancel_order(self, order_id, updates):
+        cancelled = await cancel_order(order_id, updates)
+        if cancelled:
+            self.forget(cancelled["user_id"])
+        return cancelled
+
+    async def approve_topup(self, topup_id, updates):
+        approved = await approve_topup(topup_id, updates)
+        if approved:
+            self.forget(approved["user_id"])
+        return approved
+
+def unit_of_work(context):
+    """Update တစ်ခုချင်းစီ၏ context ပေါ်တွင် UnitOfWork ကို တစ်ခါတည်း ဆောက်ပြီး ပြန်သုံးပါ။"""
+    uow = getattr(context, "uow", None)
+    if uow is None:
+        uow = UnitOfWork()
+        context.uow = uow
+    return uow
@@ -0,0 +1,71 @@
+# clock.py
+
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# လုပ်ငန်း၏ အချိန်ဇုန်။ DB ထဲမှာ BSON date (UTC) အဖြစ် သိမ်းပြီး ရက်/လ/နှစ် ခွဲခြားရာမှာ ဒီ zone ကို သုံးပါ။
+BUSINESS_TZ = ZoneInfo(os.environ.get("BUSINESS_TIMEZONE", "Asia/Yangon"))
+
+# ISO string timestamp အဟောင်းများကို ထုတ်ခဲ့တဲ့ server ၏ zone။ မသတ်မှတ်ရင် ဒီ server ၏ local zone ကို သုံးပါ။
+_legacy_tz_name = os.environ.get("LEGACY_TIMESTAMP_TZ")
+LEGACY_TZ = ZoneInfo(_legacy_tz_name) if _legacy_tz_name else None
+
+# Order/topup document များထဲက datetime field များ
+DATE_FIELDS = ("timestamp", "confirmed_at", "approved_at", "rejected_at", "cancelled_at")
+
+def now():
+    """Business timezone ဖြင့် လက်ရှိအချိန်။"""
+    return datetime.now(BUSINESS_TZ)
+
+def parse(value):
+    """ISO string (သို့) naive datetime ကို timezone ပါတဲ့ datetime အဖြစ် ပြောင်းပါ။ မပြောင်းနိုင်ရင် မူလတန်ဖိုးကို ပြန်ပေးပါ။"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=LEGACY_TZ) if LEGACY_TZ else value.astimezone()
+        # BSON date သည် millisecond အထိသာ သိမ်းလို့ ပြန်ဖတ်ရင် တူညီအောင် ဖြတ်ပါ
+        value = value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+def format_date(value, fmt="%Y-%m-%d"):
+    """Datetime ကို business timezone ဖြင့် ပြသရန် string အဖြစ် ပြောင်းပါ။"""
+    value = parse(value)
+    if isinstance(value, datetime):
+        return value.astimezone(BUSINESS_TZ).strftime(fmt)
+    return str(value or "Unknown")[:10]
+
+def day_key(value=None):
+    """Datetime (မပေးရင် ယခု) ၏ business timezone ရက်ကို 'YYYY-MM-DD' အဖြစ် ပြန်ပေးပါ။"""
+    return parse(value or now()).astimezone(BUSINESS_TZ).strftime("%Y-%m-%d")
+
+def is_day_start(value):
+    """Business timezone ၏ ရက်တစ်ရက် အစ (00:00) ဖြစ်မဖြစ် စစ်ပါ။"""
+    local = value.astimezone(BUSINESS_TZ)
+    return (local.hour, local.minute, local.second, local.microsecond) == (0, 0, 0, 0)
+
+def _period_bounds(period):
+    """'YYYY'၊ 'YYYY-MM'၊ 'YYYY-MM-DD' ကာလတစ်ခု၏ အစနဲ့ နောက်ကာလ၏ အစကို ပြန်ပေးပါ။"""
+    if len(period) == 4:
+        start = datetime.strptime(period, "%Y")
+        end = start.replace(year=start.year + 1)
+    elif len(period) == 7:
+        start = datetime.strptime(period, "%Y-%m")
+        end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    else:
+        start = datetime.strptime(period, "%Y-%m-%d")
+        end = datetime.fromordinal(start.toordinal() + 1)
+    return start.replace(tzinfo=BUSINESS_TZ), end.replace(tzinfo=BUSINESS_TZ)
+
+def period_range(start_period, end_period=None):
+    """
+    Report ကာလ (ရက်/လ/နှစ်) နှစ်ခုကို [start, end) datetime range အဖြစ် ပြောင်းပါ။
+    Format မှားရင် ValueError ဖြစ်ပါတယ်။
+    """
+    start, _ = _period_bounds(start_period)
+    _, end = _period_bounds(end_period or start_period)
+    return start, end
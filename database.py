@@ -1,8 +1,16 @@
 # database.py
 
 import pymongo
+import heapq
+import importlib.util
+import itertools
 import os
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+
+import clock
+import storage
+from storage import PROFILE_FIELDS, USER_BATCH_SIZE, WATCHED_COLLECTIONS, clone_bot_account
 
 # --- MongoDB Connection ---
 # Environment Variables များကို os module ဖြင့် import လုပ်ပါ
@@ -10,7 +18,7 @@ try:
     MONGO_URL = os.environ.get("MONGO_URL")
     ADMIN_ID = int(os.environ.get("ADMIN_ID"))
     
-    if not MONGO_URL or not ADMIN_ID:
+    if (storage.STORAGE_BACKEND == "mongo" and not MONGO_URL) or not ADMIN_ID:
         print("Error: MONGO_URL or ADMIN_ID environment variable မတွေ့ပါ။")
         exit()
         
@@ -19,33 +27,274 @@ except Exception as e:
     exit()
 
 
-try:
-    client = pymongo.MongoClient(MONGO_URL)
-    db = client["mlbb_bot_db"] # Database နာမည်
+# --- Connection Profile ---
+# Pool အရွယ်အစား၊ timeout၊ wire compression၊ retry နဲ့ appname ကို environment variable ဖြင့် ချိန်ညှိပါ။
+# minPoolSize ဖြင့် connection အချို့ကို အမြဲ warm ထားလို့ Atlas ကဲ့သို့ အဝေးက cluster ကို
+# Command တိုင်းမှာ TLS handshake အသစ် မလုပ်ရပါ။ Compressor များကို install ထားတဲ့ library ရှိမှသာ သုံးပါ။
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def _env_bool(name, default):
+    return os.environ.get(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+def _available_compressors(names):
+    """zstd (zstandard) / snappy (python-snappy) library မရှိရင် ချန်ထားပါ။ zlib သည် အမြဲ ရပါတယ်။"""
+    modules = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+    return [name for name in names if name in modules and importlib.util.find_spec(modules[name])]
+
+def connection_profile():
+    """
+    MongoClient သို့ ပေးမည့် option များကို environment variable များမှ တည်ဆောက်ပါ။
+    MONGO_URL ထဲမှာ ပါပြီးသား option (ဥပမာ retryWrites) ကိုတော့ URL အတိုင်း ထားပါ။
+    """
+    compressors = _available_compressors(
+        [name.strip() for name in os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib").split(",") if name.strip()]
+    )
+    profile = {
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", "50"),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", "5"),
+        "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS", "300000"),
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"),
+        "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", "10000"),
+        "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS", "60000"),
+        "retryWrites": _env_bool("MONGO_RETRY_WRITES", "true"),
+        "retryReads": _env_bool("MONGO_RETRY_READS", "true"),
+        "appname": os.environ.get("MONGO_APP_NAME", "mlbb-topup-bot"),
+    }
+    if compressors:
+        profile["compressors"] = ",".join(compressors)
+    uri_options = _uri_option_names(MONGO_URL)
+    return {key: value for key, value in profile.items() if key.lower() not in uri_options}
+
+def _uri_option_names(url):
+    """Connection string ထဲမှာ ပါပြီးသား option နာမည်များ (lowercase)။ ဒီ option များကို environment ထက် ဦးစားပေးပါ။"""
+    query = url.split("?", 1)[1] if "?" in url else ""
+    return {pair.split("=", 1)[0].lower() for pair in re.split("[&;]", query) if pair}
+
+def _redact_url(url):
+    """Log ထဲမှာ username/password မပါအောင် ဖယ်ပါ။"""
+    return re.sub(r"//[^@/]+@", "//***@", url)
+
+client = None
+if storage.STORAGE_BACKEND == "mongo":
+    try:
+        MONGO_PROFILE = connection_profile()
+        print(f"🔌 MongoDB profile: {_redact_url(MONGO_URL)} "
+              + ", ".join(f"{key}={value}" for key, value in MONGO_PROFILE.items()))
+        # Datetime များကို UTC BSON date အဖြစ် သိမ်းပြီး ပြန်ဖတ်ရင် business timezone ဖြင့် ရပါမည်
+        client = pymongo.MongoClient(MONGO_URL, tz_aware=True, tzinfo=clock.BUSINESS_TZ, **MONGO_PROFILE)
+        db = client["mlbb_bot_db"] # Database နာမည်
     
-    users_collection = db["users"]
-    prices_collection = db["prices"]
-    auth_collection = db["authorized_users"]
-    admins_collection = db["admins"]
-    settings_collection = db["settings"]
-    clone_bots_collection = db["clone_bots"]
-
-    print("✅ MongoDB database နှင့် အောင်မြင်စွာ ချိတ်ဆက်ပြီးပါပြီ။")
-except Exception as e:
-    print(f"❌ MongoDB ချိတ်ဆက်ရာတွင် Error ဖြစ်နေပါသည်: {e}")
-    client = None
+        users_collection = db["users"]
+        prices_collection = db["prices"]
+        auth_collection = db["authorized_users"] # Legacy: auth_list document တစ်ခုတည်း (migrate_auth_list ဖြင့် ပြောင်းရွှေ့ပြီး)
+        auth_users_collection = db["auth_users"] # User တစ်ယောက် document တစ်ခု၊ _id = user_id
+        admins_collection = db["admins"]
+        settings_collection = db["settings"]
+        clone_bots_collection = db["clone_bots"]
+        orders_collection = db["orders"]
+        topups_collection = db["topups"]
+        orders_archive_collection = db["orders_archive"] # ARCHIVE_AFTER_DAYS ကျော်ပြီး ပြီးဆုံးပြီး order များ
+        topups_archive_collection = db["topups_archive"]
+        migrations_collection = db["migrations"]
+        daily_stats_collection = db["daily_stats"] # _id = "YYYY-MM-DD" (business timezone)
+        group_chats_collection = db["group_chats"] # _id = chat_id (အနုတ်ကိန်း)
+        cache_versions_collection = db["cache_versions"] # _id = collection နာမည်၊ version = write အကြိမ်ရေ
+        balance_ledger_collection = db["balance_ledger"] # Balance ပြောင်းလဲမှု တစ်ခု entry တစ်ခု (append-only)
+        balance_snapshots_collection = db["balance_snapshots"] # _id = account_id၊ last_id run အထိ entry များ၏ ပေါင်းလဒ်
+
+        print("✅ MongoDB database နှင့် အောင်မြင်စွာ ချိတ်ဆက်ပြီးပါပြီ။")
+    except Exception as e:
+        print(f"❌ MongoDB ချိတ်ဆက်ရာတွင် Error ဖြစ်နေပါသည်: {e}")
+        client = None
+
+# --- Analytics Read Profile ---
+# Report၊ broadcast ကဲ့သို့ ဖတ်ရတာ များတဲ့ query များကို secondary သို့ ပို့လို့ balance/order write များ
+# လုပ်နေတဲ့ primary ကို မနှေးစေပါ။ Secondary က maxStalenessSeconds ထက် နောက်ကျနေရင် မသုံးပါ။
+# (Driver ၏ အနည်းဆုံး 90 စက္ကန့်) Balance/order path များသည် primary ပေါ်မှာပဲ ဆက်ရှိပါတယ်။
+ANALYTICS_READS = _env_bool("MONGO_ANALYTICS_READS", "true")
+ANALYTICS_MAX_STALENESS_SECONDS = max(90, _env_int("MONGO_ANALYTICS_MAX_STALENESS_SECONDS", "120"))
+ANALYTICS_READ_PREFERENCE = (
+    pymongo.read_preferences.SecondaryPreferred(max_staleness=ANALYTICS_MAX_STALENESS_SECONDS)
+    if ANALYTICS_READS else pymongo.read_preferences.Primary()
+)
+
+if client:
+    print(f"📊 Analytics reads: {ANALYTICS_READ_PREFERENCE.name}"
+          + (f" (maxStalenessSeconds={ANALYTICS_MAX_STALENESS_SECONDS})" if ANALYTICS_READS else ""))
+
+def analytics(collection):
+    """Collection ကို analytics read preference (secondaryPreferred + max staleness) ဖြင့် ပြန်ပေးပါ။"""
+    return collection.with_options(read_preference=ANALYTICS_READ_PREFERENCE)
+
+# --- Index Management ---
+# database.py ထဲက query တိုင်း အသုံးပြုမည့် index များ: (collection, keys, options)
+GROUP_CHAT_FILTER = {"chat_id": {"$lt": 0}}
+
+INDEXES = [
+    ("users", [("user_id", 1)], {"unique": True}),
+    ("orders", [("order_id", 1)], {"unique": True}),
+    ("orders", [("user_id", 1), ("timestamp", -1)], {}),
+    ("orders", [("status", 1), ("confirmed_at", 1)], {}),
+    ("orders", [("chat_id", 1)], {"partialFilterExpression": GROUP_CHAT_FILTER}),
+    ("topups", [("topup_id", 1)], {"unique": True}),
+    ("topups", [("user_id", 1), ("timestamp", -1)], {}),
+    ("topups", [("status", 1), ("approved_at", 1)], {}),
+    ("topups", [("chat_id", 1)], {"partialFilterExpression": GROUP_CHAT_FILTER}),
+    ("clone_bots", [("owner_id", 1)], {}),
+    ("group_chats", [("last_seen", -1)], {}),
+    ("balance_ledger", [("account_id", 1), ("created_at", -1)], {}),
+    ("balance_ledger", [("account_id", 1), ("snapshot_id", 1)], {}),
+    ("balance_ledger", [("snapshot_id", 1)], {}),
+    # Archive job က cancelled/rejected record များကို ရှာရန် (confirmed/approved သည် report index ကို သုံးပါ)
+    ("orders", [("status", 1), ("cancelled_at", 1)], {"partialFilterExpression": {"status": "cancelled"}}),
+    ("topups", [("status", 1), ("rejected_at", 1)], {"partialFilterExpression": {"status": "rejected"}}),
+]
+# orders_archive/topups_archive တွင်လည်း history၊ lookup၊ report query များ အတွက် index တူတူ ထားပါ
+INDEXES += [(f"{name}_archive", keys, options) for name, keys, options in INDEXES if name in ("orders", "topups")]
+
+# Embedded array migration မပြီးခင် legacy fallback lookup များအတွက်သာ လိုအပ်ပါတယ်
+LEGACY_INDEXES = [
+    ("users", [("orders.order_id", 1)], {}),
+    ("users", [("topups.topup_id", 1)], {}),
+]
+
+# Startup မှာ explain() ဖြင့် စစ်မည့် query shape များ: (name, collection, filter, sort)
+_SAMPLE_RANGE = {"$gte": datetime(2024, 1, 1, tzinfo=clock.BUSINESS_TZ), "$lt": datetime(2024, 2, 1, tzinfo=clock.BUSINESS_TZ)}
+
+QUERY_SHAPES = [
+    ("user by user_id", "users", {"user_id": "0"}, None),
+    ("order by id", "orders", {"order_id": "ORD", "status": "pending"}, None),
+    ("orders by user", "orders", {"user_id": "0"}, [("timestamp", -1)]),
+    ("confirmed orders in range", "orders", {"status": "confirmed", "confirmed_at": _SAMPLE_RANGE}, None),
+    ("order group chats", "orders", GROUP_CHAT_FILTER, None),
+    ("topup by id", "topups", {"topup_id": "TOP", "status": "pending"}, None),
+    ("topups by user", "topups", {"user_id": "0"}, [("timestamp", -1)]),
+    ("latest pending topup", "topups", {"user_id": "0", "status": "pending", "amount": 0}, [("timestamp", -1)]),
+    ("approved topups in range", "topups", {"status": "approved", "approved_at": _SAMPLE_RANGE}, None),
+    ("topup group chats", "topups", GROUP_CHAT_FILTER, None),
+    ("clone bot by owner", "clone_bots", {"owner_id": 0}, None),
+    ("group chats by last seen", "group_chats", {}, [("last_seen", -1)]),
+    ("ledger entries by account", "balance_ledger", {"account_id": "0"}, [("created_at", -1)]),
+    ("ledger tail by account", "balance_ledger", {"account_id": "0", "snapshot_id": {"$gt": 0}}, None),
+    ("unsnapshotted ledger entries", "balance_ledger", {"snapshot_id": None}, None),
+    ("ledger entries by snapshot run", "balance_ledger", {"snapshot_id": 1}, None),
+    ("archivable cancelled orders", "orders", {"status": "cancelled", "cancelled_at": _SAMPLE_RANGE}, None),
+    ("archivable rejected topups", "topups", {"status": "rejected", "rejected_at": _SAMPLE_RANGE}, None),
+    ("archived orders by user", "orders_archive", {"user_id": "0"}, [("timestamp", -1)]),
+    ("archived topups by user", "topups_archive", {"user_id": "0"}, [("timestamp", -1)]),
+    ("archived confirmed orders in range", "orders_archive", {"status": "confirmed", "confirmed_at": _SAMPLE_RANGE}, None),
+    ("archived approved topups in range", "topups_archive", {"status": "approved", "approved_at": _SAMPLE_RANGE}, None),
+]
+
+LEGACY_QUERY_SHAPES = [
+    ("legacy order by id", "users", {"orders.order_id": "ORD"}, None),
+    ("legacy topup by id", "users", {"topups.topup_id": "TOP"}, None),
+]
+
+def ensure_indexes():
+    """INDEXES ထဲက index များကို ဆောက်ပါ။ ရှိပြီးသား index ဆိုရင် MongoDB က ဘာမှ မလုပ်ပါ။"""
+    if not client: return
+    specs = INDEXES + (LEGACY_INDEXES if legacy_records_pending() else [])
+    for name, keys, options in specs:
+        try:
+            db[name].create_index(keys, **options)
+        except pymongo.errors.OperationFailure as e:
+            print(f"🚨 Index {name} {keys} ဆောက်လို့ မရပါ: {e}")
+            if options.get("unique"):
+                # Data အဟောင်းမှာ ထပ်နေတဲ့ value ရှိရင် unique မပါဘဲ lookup index ကိုတော့ ဆောက်ပါ
+                db[name].create_index(keys, **{**options, "unique": False})
+
+def _plan_stages(plan):
+    """explain() ၏ winning plan ထဲက stage နာမည်များကို အဆင့်တိုင်း လိုက်ရှာပါ။"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+def verify_query_plans():
+    """
+    QUERY_SHAPES တစ်ခုချင်းစီကို explain() လုပ်ပြီး COLLSCAN ဖြစ်နေတဲ့ shape များကို
+    Log မှာ သတိပေးပြီး နာမည် list အဖြစ် ပြန်ပေးပါ။
+    """
+    if not client: return []
+    shapes = QUERY_SHAPES + (LEGACY_QUERY_SHAPES if legacy_records_pending() else [])
+    collscans = []
+    for name, collection, query, sort in shapes:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(plan)):
+            collscans.append(name)
+            print(f"🚨 COLLSCAN: '{name}' query ({collection} {query}) က index မသုံးပါ!")
+    return collscans
 
 # --- User Functions ---
 
+def _pending_topups_expr():
+    return {"$filter": {
+        "input": {"$ifNull": ["$topups", []]},
+        "cond": {"$eq": ["$$this.status", "pending"]}
+    }}
+
 def get_user(user_id):
-    """User တစ်ယောက်၏ data ကို user_id ဖြင့် ရှာဖွေပါ။"""
+    """User တစ်ယောက်၏ data ကို user_id ဖြင့် ရှာဖွေပါ။ (orders/topups အပါအဝင် document အပြည့်)"""
     if not client: return None
     return users_collection.find_one({"user_id": str(user_id)})
 
-def get_all_users():
-    """User တွေအားလုံးရဲ့ data ကို list အဖြစ် ယူပါ။"""
-    if not client: return []
-    return list(users_collection.find({}))
+def get_user_profile(user_id):
+    """User ၏ name, username, balance စတဲ့ profile field များကိုသာ ရယူပါ။"""
+    if not client: return None
+    projection = {"_id": 0, **{field: 1 for field in PROFILE_FIELDS}}
+    return users_collection.find_one({"user_id": str(user_id)}, projection)
+
+def get_user_summary(user_id):
+    """
+    Profile field များနှင့်အတူ order/topup အရေအတွက်နဲ့ pending topup ပမာဏကို
+    orders/topups collection ၏ user_id index ပေါ်မှာ server-side တွက်ပြီး ရယူပါ။
+    """
+    if not client: return None
+    user = get_user_profile(user_id)
+    if not user: return None
+    _migrate_legacy_user(user_id)
+    topup_stats = next(topups_collection.aggregate([
+        {"$match": {"user_id": str(user_id)}},
+        {"$group": {
+            "_id": None,
+            "topup_count": {"$sum": 1},
+            "pending_topup_amount": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, "$amount", 0]}}
+        }}
+    ]), {})
+    user["order_count"] = sum(collection.count_documents({"user_id": str(user_id)})
+                              for collection in (orders_collection, orders_archive_collection))
+    user["topup_count"] = topup_stats.get("topup_count", 0) + topups_archive_collection.count_documents({"user_id": str(user_id)})
+    user["pending_topup_amount"] = topup_stats.get("pending_topup_amount", 0)
+    return user
+
+def iter_users(projection=None, batch_size=USER_BATCH_SIZE):
+    """
+    User document များကို cursor ဖြင့် batch_size ခုစီ DB မှ ဆွဲယူပြီး တစ်ခုချင်း yield လုပ်ပါ။
+    projection မပေးရင် user_id ကိုသာ ယူလို့ user အရေအတွက် ဘယ်လောက်များများ memory မတက်ပါ။
+    """
+    if not client: return
+    yield from analytics(users_collection).find({}, projection or {"_id": 0, "user_id": 1}, batch_size=batch_size)
+
+def iter_user_batches(projection=None, batch_size=USER_BATCH_SIZE):
+    """iter_users ကို batch_size ခုပါ list များအဖြစ် yield လုပ်ပါ။ (async_database.iter_users အတွက်)"""
+    batch = []
+    for user_doc in iter_users(projection, batch_size):
+        batch.append(user_doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 def create_user(user_id, name, username):
     """User အသစ်ကို database တွင် ထည့်သွင်းပါ။"""
@@ -55,9 +304,8 @@ def create_user(user_id, name, username):
         "name": name,
         "username": username,
         "balance": 0,
-        "orders": [],
-        "topups": [],
-        "joined_at": datetime.now().isoformat()
+        "pending_topup_count": 0,
+        "joined_at": clock.now()
     }
     users_collection.update_one(
         {"user_id": str(user_id)},
@@ -67,105 +315,813 @@ def create_user(user_id, name, username):
 
 def get_balance(user_id):
     """User ၏ balance ကိုသာ ရယူပါ။"""
-    user = get_user(user_id)
+    if not client: return 0
+    user = users_collection.find_one({"user_id": str(user_id)}, {"_id": 0, "balance": 1})
     return user.get("balance", 0) if user else 0
 
-def update_balance(user_id, amount_change):
-    """User ၏ balance ကို တိုး/လျော့ ပါ။ (amount_change က + or - ဖြစ်နိုင်သည်)"""
-    if not client: return None
-    users_collection.update_one(
+def has_pending_topup(user_id):
+    """User မှာ approve မလုပ်ရသေးတဲ့ topup ရှိမရှိကို counter field တစ်ခုတည်း ဖတ်ပြီး စစ်ပါ။"""
+    if not client: return False
+    user = users_collection.find_one(
         {"user_id": str(user_id)},
-        {"$inc": {"balance": amount_change}},
-        upsert=True
+        {"_id": 0, "pending_topup_count": 1}
     )
+    return bool(user and user.get("pending_topup_count", 0) > 0)
 
-# --- Order & Topup Functions ---
+def backfill_pending_topup_counts():
+    """
+    pending_topup_count field မရှိသေးတဲ့ user document အဟောင်းတွေမှာ
+    topups array ထဲက pending အရေအတွက်ကို server-side မှာ တွက်ပြီး ထည့်ပါ။
+    """
+    if not client: return 0
+    result = users_collection.update_many(
+        {"pending_topup_count": {"$exists": False}},
+        [{"$set": {"pending_topup_count": {"$size": _pending_topups_expr()}}}]
+    )
+    return result.modified_count
 
-def add_order(user_id, order_data):
+def update_balance(user_id, amount_change, reason="adjustment", ref_id=None):
+    """User ၏ balance ကို တိုး/လျော့ ပြီး ledger ထဲမှာ reason ဖြင့် မှတ်ပါ။ (amount_change က + or - ဖြစ်နိုင်သည်)"""
     if not client: return None
-    users_collection.update_one(
+
+    def update(session):
+        users_collection.update_one(
+            {"user_id": str(user_id)},
+            {"$inc": {"balance": amount_change}},
+            upsert=True,
+            session=session
+        )
+        _record_ledger(user_id, amount_change, reason, ref_id, session)
+
+    _run_in_transaction(update)
+
+# --- Balance Ledger ---
+# Balance ပြောင်းတိုင်း (account_id, delta, reason, ref_id) entry တစ်ခုကို balance update နဲ့ transaction
+# တစ်ခုတည်းမှာ ထည့်ပါ။ User document ၏ balance သည် cache (fast path) ဖြစ်ပြီး place_order ကဲ့သို့ hot path များက
+# ဆက်သုံးပါတယ်။ Snapshot run တိုင်း snapshot_id မရှိသေးတဲ့ entry များကို run နံပါတ် (snapshot_id) ဖြင့် အရင်
+# မှတ်ပြီးမှ account အလိုက် snapshot ထဲ ပေါင်းပါ။ Snapshot ၏ last_id သည် ပေါင်းပြီးသား နောက်ဆုံး run ဖြစ်ပြီး
+# Ledger balance သည် snapshot + (snapshot_id မရှိ (သို့) last_id ထက်ကြီးတဲ့) entry များ ဖြစ်ပါတယ်။ created_at ကို
+# မသုံးလို့ commit နောက်ကျတဲ့ entry လည်း နောက် run မှာ ပါဝင်ပြီး entry မရှိတဲ့ account ၏ last_id ဟောင်းနေလည်း မှန်ပါတယ်။
+
+LEDGER_ID = "balance_ledger"
+LEDGER_SNAPSHOT_ID = "balance_snapshots"
+
+def _record_ledger(account_id, delta, reason, ref_id=None, session=None):
+    if not delta: return
+    balance_ledger_collection.insert_one({
+        "account_id": str(account_id),
+        "delta": delta,
+        "reason": reason,
+        "ref_id": ref_id,
+        "created_at": clock.now()
+    }, session=session)
+
+def _ledger_sums(match, session=None):
+    """match ဖြစ်တဲ့ entry များ၏ delta ကို account_id အလိုက် ပေါင်းပါ။"""
+    return balance_ledger_collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$account_id", "delta": {"$sum": "$delta"}}}
+    ], session=session)
+
+def ledger_balance(account_id):
+    """Ledger မှ တွက်ထားတဲ့ balance (snapshot + tail) ကို ပြန်ပေးပါ။ Cache ဖြစ်တဲ့ users.balance နဲ့ တိုက်စစ်ရန်"""
+    if not client: return 0
+    snapshot = balance_snapshots_collection.find_one({"_id": str(account_id)}) or {}
+    tail = next(_ledger_sums({
+        "account_id": str(account_id),
+        "$or": [{"snapshot_id": None}, {"snapshot_id": {"$gt": snapshot.get("last_id", 0)}}]
+    }), {})
+    return snapshot.get("balance", 0) + tail.get("delta", 0)
+
+def get_ledger_entries(account_id, limit=10):
+    """Account ၏ နောက်ဆုံး ledger entry များ"""
+    if not client: return []
+    return list(balance_ledger_collection.find({"account_id": str(account_id)}, {"_id": 0})
+                .sort("created_at", pymongo.DESCENDING).limit(limit))
+
+def snapshot_balances():
+    """
+    snapshot_id မရှိသေးတဲ့ entry များကို run နံပါတ်အသစ်ဖြင့် မှတ်ပြီး account အလိုက် snapshot ထဲ ပေါင်းပါ။
+    Run နံပါတ်ကို marker ထဲ အရင် သိမ်းထားပြီး snapshot တစ်ခုချင်းကို last_id ငယ်မှသာ ပေါင်းလို့ ကြားမှာ ရပ်ပြီး
+    ပြန် run လည်း မထပ်ပါ။ Entry ရှိခဲ့တဲ့ account အရေအတွက်ကို ပြန်ပေးပါ။
+    """
+    if not client: return 0
+    marker = migrations_collection.find_one({"_id": LEDGER_SNAPSHOT_ID}) or {}
+    if marker.get("as_of"):
+        # created_at ဖြင့် snapshot ယူခဲ့တဲ့ ယခင်ပုံစံမှ ပေါင်းပြီးသား entry များကို run 0 အဖြစ် မှတ်ပါ
+        balance_ledger_collection.update_many(
+            {"snapshot_id": None, "created_at": {"$lt": marker["as_of"]}}, {"$set": {"snapshot_id": 0}}
+        )
+        migrations_collection.update_one({"_id": LEDGER_SNAPSHOT_ID}, {"$unset": {"as_of": "", "pending_as_of": ""}})
+    run_id = marker.get("pending_id")
+    if run_id is None:
+        run_id = marker.get("last_id", 0) + 1
+        migrations_collection.update_one({"_id": LEDGER_SNAPSHOT_ID}, {"$set": {"pending_id": run_id}}, upsert=True)
+        balance_ledger_collection.update_many({"snapshot_id": None}, {"$set": {"snapshot_id": run_id}})
+
+    accounts = 0
+    ops = []
+    for row in _ledger_sums({"snapshot_id": run_id}):
+        ops.append(pymongo.UpdateOne({"_id": row["_id"]}, [{"$set": {
+            "balance": {"$cond": [{"$lt": [{"$ifNull": ["$last_id", 0]}, run_id]},
+                                  {"$add": [{"$ifNull": ["$balance", 0]}, row["delta"]]}, "$balance"]},
+            "last_id": {"$max": [{"$ifNull": ["$last_id", 0]}, run_id]}
+        }}], upsert=True))
+        if len(ops) >= USER_BATCH_SIZE:
+            balance_snapshots_collection.bulk_write(ops, ordered=False)
+            accounts += len(ops)
+            ops = []
+    if ops:
+        balance_snapshots_collection.bulk_write(ops, ordered=False)
+        accounts += len(ops)
+
+    migrations_collection.update_one(
+        {"_id": LEDGER_SNAPSHOT_ID},
+        {"$set": {"last_id": run_id, "updated_at": clock.now()}, "$unset": {"pending_id": ""}}
+    )
+    return accounts
+
+def open_balance_ledger():
+    """
+    Ledger မတိုင်ခင်က user/clone bot balance များအတွက် "opening" entry (cache balance - ledger balance) ကို ထည့်ပါ။
+    Batch တစ်ခုချင်း၏ balance နဲ့ ledger sum ကို transaction တစ်ခုတည်း (snapshot တစ်ခု) မှ ဖတ်လို့ ကြားမှာ
+    ဝင်လာတဲ့ balance update ကြောင့် မလွဲပါ။ Opening entry ၏ _id သည် account_id အလိုက် တစ်ခုတည်း ဖြစ်ပြီး
+    $setOnInsert ဖြင့် upsert လုပ်လို့ ထပ် run လည်း မထပ်ပါ။ အမှန်တကယ် ထည့်ခဲ့တဲ့ entry အရေအတွက် ပြန်ပေးပါ။
+    """
+    if not client: return 0
+    marker = migrations_collection.find_one({"_id": LEDGER_ID}, {"status": 1})
+    if marker and marker.get("status") == "done": return 0
+    opened = 0
+    sources = (
+        (users_collection, {"balance": {"$ne": 0}}, lambda doc: doc.get("user_id")),
+        (clone_bots_collection, {"balance": {"$ne": 0}}, lambda doc: clone_bot_account(doc["_id"])),
+    )
+    for collection, query, account_of in sources:
+        last_id = None
+
+        def open_batch(session):
+            batch_query = {**query, "_id": {"$gt": last_id}} if last_id else query
+            batch = list(collection.find(batch_query, {"user_id": 1, "balance": 1}, session=session)
+                         .sort("_id", 1).limit(USER_BATCH_SIZE))
+            if not batch: return None, 0
+            balances = {str(account_of(doc)): doc.get("balance", 0) for doc in batch if account_of(doc) is not None}
+            for row in _ledger_sums({"account_id": {"$in": list(balances)}}, session):
+                balances[row["_id"]] -= row["delta"]
+            ops = [pymongo.UpdateOne({"_id": f"opening:{account_id}"}, {"$setOnInsert": {
+                       "account_id": account_id, "delta": delta, "reason": "opening", "ref_id": None,
+                       "created_at": clock.now()}}, upsert=True)
+                   for account_id, delta in balances.items() if delta]
+            inserted = balance_ledger_collection.bulk_write(ops, ordered=False, session=session).upserted_count if ops else 0
+            return batch[-1]["_id"], inserted
+
+        while True:
+            last_id, inserted = _run_in_transaction(open_batch)
+            if last_id is None: break
+            opened += inserted
+    migrations_collection.update_one(
+        {"_id": LEDGER_ID}, {"$set": {"status": "done", "opened": opened, "updated_at": clock.now()}}, upsert=True
+    )
+    return opened
+
+# --- Order & Topup Functions ---
+# Order/topup များကို user document ထဲ array အဖြစ် မထားတော့ဘဲ orders/topups collection သီးသန့်ထဲမှာ
+# record တစ်ခု document တစ်ခုစီ သိမ်းပါ။ Status update များသည် document သေးသေးလေးကိုသာ ပြင်ပါတယ်။
+
+_transactions_supported = None
+
+def _run_in_transaction(callback):
+    """
+    callback(session) ကို multi-document transaction ထဲမှာ run ပါ။
+    Replica set မဟုတ်တဲ့ standalone server ဆိုရင် session=None ဖြင့် တိုက်ရိုက် run ပါ။
+    Callback များက record ကို အရင် claim လုပ်ပြီးမှ balance ကို ပြင်တဲ့ အစီအစဉ်ဖြင့် ရေးထားလို့
+    Transaction မရှိလည်း record တစ်ခုကို နှစ်ခါ settle မလုပ်မိပါ။
+    """
+    global _transactions_supported
+    if _transactions_supported is not False:
+        try:
+            with client.start_session() as session:
+                result = session.with_transaction(callback)
+            _transactions_supported = True
+            return result
+        except pymongo.errors.OperationFailure as e:
+            if _transactions_supported or e.code != 20: raise
+            _transactions_supported = False
+            print("⚠️ MongoDB transactions ကို support မလုပ်ပါ။ Transaction မပါဘဲ ဆက်လုပ်ပါမည်။")
+    return callback(None)
+
+def _adjust_user(user_id, balance_change=0, pending_change=0, session=None):
+    """
+    User ၏ balance နဲ့ pending_topup_count ကို ပြင်ပြီး notification အတွက် user_id, name, balance ကို ပြန်ပေးပါ။
+    Counter ကို သုညအောက် မရောက်အောင် pipeline update ဖြင့် ထိန်းပါ။
+    """
+    changes = {"balance": {"$add": [{"$ifNull": ["$balance", 0]}, balance_change]}}
+    if pending_change:
+        changes["pending_topup_count"] = {"$max": [0, {"$add": [{"$ifNull": ["$pending_topup_count", 0]}, pending_change]}]}
+    return users_collection.find_one_and_update(
         {"user_id": str(user_id)},
-        {"$push": {"orders": order_data}}
+        [{"$set": changes}],
+        projection={"_id": 0, "user_id": 1, "name": 1, "balance": 1},
+        return_document=pymongo.ReturnDocument.AFTER,
+        session=session
     )
 
+def add_order(user_id, order_data):
+    if not client: return None
+    orders_collection.insert_one({**order_data, "user_id": str(user_id)})
+    touch_group_chat(order_data, "order")
+
+def place_order(user_id, order_data):
+    """
+    Balance လုံလောက်မှသာ order price ကို နှုတ်ပြီး order ကို ထည့်ပါ။ (Transaction တစ်ခုတည်း)
+    အောင်မြင်ရင် balance အသစ်ကို ပြန်ပေးပြီး balance မလုံလောက်ရင် None ကို ပြန်ပေးပါ။
+    """
+    if not client: return None
+    price = order_data["price"]
+
+    def place(session):
+        user = users_collection.find_one_and_update(
+            {"user_id": str(user_id), "balance": {"$gte": price}},
+            {"$inc": {"balance": -price}},
+            projection={"_id": 0, "balance": 1},
+            return_document=pymongo.ReturnDocument.AFTER,
+            session=session
+        )
+        if user is None: return None
+        recorded = False
+        try:
+            _record_ledger(user_id, -price, "order", order_data.get("order_id"), session)
+            recorded = True
+            orders_collection.insert_one({**order_data, "user_id": str(user_id)}, session=session)
+        except Exception:
+            if session is None: # Transaction မရှိရင် နှုတ်ထားတဲ့ balance ကို ပြန်ထည့်ပါ
+                users_collection.update_one({"user_id": str(user_id)}, {"$inc": {"balance": price}})
+                if recorded:
+                    _record_ledger(user_id, price, "order_rollback", order_data.get("order_id"))
+            raise
+        return user.get("balance", 0)
+
+    new_balance = _run_in_transaction(place)
+    if new_balance is not None:
+        touch_group_chat(order_data, "order")
+    return new_balance
+
 def add_topup(user_id, topup_data):
     if not client: return None
-    users_collection.update_one(
-        {"user_id": str(user_id)},
-        {"$push": {"topups": topup_data}}
-    )
+
+    def add(session):
+        topups_collection.insert_one({**topup_data, "user_id": str(user_id)}, session=session)
+        if topup_data.get("status") == "pending":
+            users_collection.update_one(
+                {"user_id": str(user_id)}, {"$inc": {"pending_topup_count": 1}}, session=session
+            )
+
+    _run_in_transaction(add)
+    touch_group_chat(topup_data, "topup")
+
+# Order/topup status ပြောင်းတိုင်း ခေါ်မည့် listener များ (ဥပမာ report cache invalidation)
+_status_listeners = []
+
+def add_status_listener(listener):
+    """listener(kind, updates) ကို order/topup status ပြောင်းပြီးတိုင်း ခေါ်ရန် မှတ်ပါ။ kind သည် "order"/"topup"။"""
+    _status_listeners.append(listener)
+
+def _notify_status_change(kind, updates):
+    for listener in _status_listeners:
+        try:
+            listener(kind, updates)
+        except Exception as e:
+            print(f"❌ Status listener error: {e}")
 
 def find_and_update_order(order_id, updates):
-    """Order ID ဖြင့် order ကိုရှာပြီး update လုပ်ပါ။"""
+    """Order ID ဖြင့် pending order ကိုရှာပြီး update လုပ်ပါ။"""
     if not client: return None
-    filter_query = {"orders.order_id": order_id, "orders.status": "pending"}
-    update_fields = {}
-    for key, value in updates.items():
-        update_fields[f"orders.$.{key}"] = value
-        
-    result = users_collection.find_one_and_update(
-        filter_query, {"$set": update_fields}
-    )
-    return result.get("user_id") if result else None
+
+    def update():
+        return orders_collection.find_one_and_update(
+            {"order_id": order_id, "status": "pending"},
+            {"$set": updates},
+            projection={"_id": 0, "user_id": 1}
+        )
+
+    result = _with_legacy_fallback("orders", "order_id", order_id, update)
+    if not result: return None
+    _notify_status_change("order", updates)
+    return result.get("user_id")
 
 def find_and_update_topup(topup_id, updates):
-    """Topup ID ဖြင့် topup ကိုရှာပြီး update လုပ်ပါ။"""
+    """Topup ID ဖြင့် pending topup ကိုရှာပြီး update လုပ်ပါ။"""
     if not client: return None
-    filter_query = {"topups.topup_id": topup_id, "topups.status": "pending"}
-    update_fields = {}
-    for key, value in updates.items():
-        update_fields[f"topups.$.{key}"] = value
-        
-    result = users_collection.find_one_and_update(
-        filter_query, {"$set": update_fields}
+    # Topup approve ဖြစ်ရင် balance ပါ တစ်ခါတည်း တိုးပေး
+    if updates.get("status") == "approved":
+        approved = approve_topup(topup_id, updates)
+        return approved["user_id"] if approved else None
+
+    def update(session):
+        result = topups_collection.find_one_and_update(
+            {"topup_id": topup_id, "status": "pending"},
+            {"$set": updates},
+            projection={"_id": 0, "user_id": 1},
+            session=session
+        )
+        if not result: return None
+        if updates.get("status", "pending") != "pending":
+            _adjust_user(result["user_id"], pending_change=-1, session=session)
+        return result.get("user_id")
+
+    target_user_id = _with_legacy_fallback("topups", "topup_id", topup_id, lambda: _run_in_transaction(update))
+    if target_user_id:
+        _notify_status_change("topup", updates)
+    return target_user_id
+
+def _settle_pending(collection, id_field, record_id, updates, credit_field, reason, pending_change=0):
+    """
+    Pending record ကို updates ဖြင့် ပြောင်းပြီး ၎င်း၏ credit_field ကို user balance ထဲ ပေါင်းပြီး ledger မှာ reason ဖြင့် မှတ်ပါ။
+    Record ကို pending မှ အရင် claim လုပ်လို့ တစ်ပြိုင်နက် click နှစ်ခါ ဖြစ်လည်း တစ်ခါသာ settle ဖြစ်ပါတယ်။
+    (user, record) ကို ပြန်ပေးပြီး pending record မရှိရင် None ကို ပြန်ပေးပါ။
+    """
+    def settle(session):
+        record = collection.find_one_and_update(
+            {id_field: record_id, "status": "pending"},
+            {"$set": updates},
+            projection={"_id": 0},
+            session=session
+        )
+        if record is None: return None
+        record.update(updates)
+        user = _adjust_user(record["user_id"], record.get(credit_field, 0), pending_change, session=session)
+        if user: # User document မရှိရင် balance မပြောင်းလို့ ledger မှာ မမှတ်ပါ
+            _record_ledger(record["user_id"], record.get(credit_field, 0), reason, record_id, session)
+        return (user or {"user_id": record["user_id"]}), record
+
+    settled = _with_legacy_fallback(collection.name, id_field, record_id, lambda: _run_in_transaction(settle))
+    if settled:
+        _notify_status_change("order" if collection is orders_collection else "topup", updates)
+    return settled
+
+def approve_topup(topup_id, updates):
+    """
+    Pending topup ကို approve လုပ်ပြီး amount ကို balance ထဲ တစ်ခါတည်း ပေါင်းပါ။
+    Notification ပို့ဖို့ လိုတဲ့ user_id, name, amount, balance, chat_id ကို dict အဖြစ် ပြန်ပေးပါ။
+    """
+    if not client: return None
+    settled = _settle_pending(topups_collection, "topup_id", topup_id, updates, "amount", "topup",
+                              pending_change=-1)
+    if not settled: return None
+    user, topup = settled
+    return {
+        "user_id": user.get("user_id"),
+        "name": user.get("name", "Unknown"),
+        "amount": topup.get("amount", 0),
+        "balance": user.get("balance", 0),
+        "chat_id": topup.get("chat_id")
+    }
+
+def cancel_order(order_id, updates):
+    """
+    Pending order ကို cancel လုပ်ပြီး price ကို balance ထဲ တစ်ခါတည်း ပြန်အမ်းပါ။
+    user_id, name, refund, balance, chat_id ကို dict အဖြစ် ပြန်ပေးပါ။
+    """
+    if not client: return None
+    settled = _settle_pending(orders_collection, "order_id", order_id, updates, "price", "refund")
+    if not settled: return None
+    user, order = settled
+    return {
+        "user_id": user.get("user_id"),
+        "name": user.get("name", "Unknown"),
+        "refund": order.get("price", 0),
+        "balance": user.get("balance", 0),
+        "chat_id": order.get("chat_id")
+    }
+
+def _latest(collection, query, limit, skip=0):
+    """user_id/status + timestamp index ပေါ်မှာ နောက်ဆုံး record များကို sort/skip/limit လုပ်ပြီး ရယူပါ။"""
+    cursor = collection.find(query, {"_id": 0}).sort("timestamp", pymongo.DESCENDING)
+    return list(cursor.skip(skip).limit(limit))
+
+def _latest_with_archive(collection, query, limit, skip=0):
+    """
+    _latest ကဲ့သို့ပင် ဖြစ်ပြီး hot collection နဲ့ archive ကို timestamp အစဉ်အတိုင်း ပေါင်းပြီးမှ skip/limit လုပ်ပါ။
+    Archive ကို settle အချိန်ဖြင့် ရွေးလို့ ကြာကြာ pending ဖြစ်ခဲ့တဲ့ hot record သည် archive ထဲက record ထက်
+    ဟောင်းနိုင်ပါတယ်။ ဒါကြောင့် source တစ်ခုစီမှ skip + limit ခုစီ ယူပြီး merge လုပ်ပါ။
+    """
+    epoch = datetime(1970, 1, 1, tzinfo=clock.BUSINESS_TZ)
+    merged = heapq.merge(
+        _latest(collection, query, skip + limit),
+        _latest(archive_of(collection), query, skip + limit),
+        key=lambda record: record.get("timestamp") or epoch, reverse=True
     )
-    
-    if result:
-        user_id = result.get("user_id")
-        # Topup approve ဖြစ်ရင် balance ပါ တစ်ခါတည်း တိုးပေး
-        if updates.get("status") == "approved":
-            # Find the exact amount from the matched topup
-            topup_amount = 0
-            for topup in result.get("topups", []):
-                if topup.get("topup_id") == topup_id:
-                    topup_amount = topup.get("amount", 0)
-                    break
-            if topup_amount > 0:
-                update_balance(user_id, topup_amount)
-        return user_id
-    return None
+    return list(itertools.islice(merged, skip, skip + limit))
+
+def get_recent_history(user_id, limit=5):
+    """နောက်ဆုံး order/topup limit ခုစီကို ရယူပါ။"""
+    if not client: return None
+    _migrate_legacy_user(user_id)
+    return {
+        "orders": _latest_with_archive(orders_collection, {"user_id": str(user_id)}, limit),
+        "topups": _latest_with_archive(topups_collection, {"user_id": str(user_id)}, limit)
+    }
 
 def get_user_orders(user_id, limit=5):
-    user = get_user(user_id)
-    if not user: return []
-    # Sort descending by timestamp and get latest 5
-    orders = sorted(user.get("orders", []), key=lambda x: x.get('timestamp', ''), reverse=True)
-    return orders[:limit]
+    if not client: return []
+    _migrate_legacy_user(user_id)
+    return _latest_with_archive(orders_collection, {"user_id": str(user_id)}, limit)
 
 def get_user_topups(user_id, limit=5):
-    user = get_user(user_id)
-    if not user: return []
-    # Sort descending by timestamp and get latest 5
-    topups = sorted(user.get("topups", []), key=lambda x: x.get('timestamp', ''), reverse=True)
-    return topups[:limit]
+    if not client: return []
+    _migrate_legacy_user(user_id)
+    return _latest_with_archive(topups_collection, {"user_id": str(user_id)}, limit)
+
+def get_history_page(user_id, page=0, page_size=5):
+    """
+    /history အတွက် order/topup page တစ်ခုစီကို server-side မှာ sort/skip/limit လုပ်ပြီး ရယူပါ။
+    Page တစ်ခုစာထက် တစ်ခု ပိုယူပြီး နောက် page ရှိ/မရှိ ကို သိရှိပါ။
+    """
+    if not client: return None
+    _migrate_legacy_user(user_id)
+    skip = page * page_size
+    orders = _latest_with_archive(orders_collection, {"user_id": str(user_id)}, page_size + 1, skip)
+    topups = _latest_with_archive(topups_collection, {"user_id": str(user_id)}, page_size + 1, skip)
+    return {
+        "orders": orders[:page_size],
+        "topups": topups[:page_size],
+        "has_next": len(orders) > page_size or len(topups) > page_size
+    }
+
+def get_latest_pending_topup(user_id, amount):
+    """User ၏ ပမာဏတူ pending topup များထဲမှ နောက်ဆုံးတစ်ခုကို ရယူပါ။"""
+    if not client: return None
+    _migrate_legacy_user(user_id)
+    topups = _latest(topups_collection, {"user_id": str(user_id), "status": "pending", "amount": amount}, 1)
+    return topups[0] if topups else None
 
 def get_order_by_id(order_id):
-    """Nested array ထဲက order ကို ID နဲ့ဆွဲထုတ်ပါ။"""
     if not client: return None
-    result = users_collection.find_one(
-        {"orders.order_id": order_id},
-        {"_id": 0, "orders.$": 1}
-    )
-    return result.get("orders", [{}])[0] if result else None
+    return _with_legacy_fallback("orders", "order_id", order_id,
+                                 lambda: _find_with_archive(orders_collection, {"order_id": order_id}))
 
 def get_topup_by_id(topup_id):
-    """Nested array ထဲက topup ကို ID နဲ့ဆွဲထုတ်ပါ။"""
     if not client: return None
-    result = users_collection.find_one(
-        {"topups.topup_id": topup_id},
-        {"_id": 0, "topups.$": 1}
+    return _with_legacy_fallback("topups", "topup_id", topup_id,
+                                 lambda: _find_with_archive(topups_collection, {"topup_id": topup_id}))
+
+# --- Daily Stats ---
+# ပြီးဆုံးသွားတဲ့ ရက်များ၏ confirmed order / approved topup စုစုပေါင်းနဲ့ package / payment method အလိုက်
+# {key, total, count} များကို ရက်တစ်ရက် document တစ်ခုဖြင့် သိမ်းလို့
+# /d /m /y report များသည် history အရွယ်အစား မည်မျှကြီးကြီး ရက် row အနည်းငယ်ကိုသာ ပေါင်းပါတယ်။
+# Confirm/approve အချိန်သည် အမြဲ "ယခု" ဖြစ်လို့ ပြီးသွားတဲ့ ရက်၏ စုစုပေါင်း မပြောင်းတော့ပါ။ ဒါကြောင့် write path မှာ
+# $inc မလုပ်ဘဲ ပြီးသွားတဲ့ ရက်များကိုသာ raw record များမှ တွက်ပြီး $merge (replace) ဖြင့် ရေးလို့ lock မလိုဘဲ
+# Process အများအပြားက တစ်ပြိုင်နက် rebuild လုပ်လည်း result တူပါတယ်။ marker ၏ "before" ရက်နဲ့ နောက်ပိုင်းကို
+# Report များက raw record များမှ တွက်ပါတယ်။
+
+DAILY_STATS_ID = "daily_stats"
+DAILY_STATS_FIELDS = ("order_total", "order_count", "topup_total", "topup_count")
+DAILY_STATS_VERSION = 2 # Document ပုံစံ ပြောင်းရင် တိုးပါ (full rebuild ဖြစ်စေရန်)
+DAILY_STATS_BREAKDOWNS = ("packages", "payment_methods")
+DAILY_STATS_LAG_SECONDS = 300 # ညသန်းခေါင် မတိုင်မီ စပြီး နောက်မှ commit ဖြစ်တဲ့ write များကို စောင့်ရန်
+_daily_stats_ready = None
+
+def daily_stats_ready():
+    """daily_stats ကို history အားလုံးမှ rebuild လုပ်ပြီးပြီဆိုရင် True ပြန်ပေးပါ။"""
+    global _daily_stats_ready
+    if _daily_stats_ready is None and client:
+        marker = migrations_collection.find_one({"_id": DAILY_STATS_ID}, {"status": 1, "version": 1}) or {}
+        _daily_stats_ready = marker.get("status") == "done" and marker.get("version") == DAILY_STATS_VERSION
+    return bool(_daily_stats_ready)
+
+def daily_stats_before():
+    """daily_stats ထဲမှာ ပြည့်စုံနေတဲ့ ရက်များ၏ အဆုံး (ဒီအချိန် မပါ) ကို datetime ဖြင့် ပြန်ပေးပါ။ မရှိရင် None။"""
+    if not client or not daily_stats_ready(): return None
+    marker = migrations_collection.find_one({"_id": DAILY_STATS_ID}, {"before": 1}) or {}
+    return clock.period_range(marker["before"])[0] if marker.get("before") else None
+
+def rebuild_daily_stats(full=False):
+    """
+    ပြီးဆုံးသွားတဲ့ ရက်များ၏ daily_stats ကို orders/topups collection (archive အပါအဝင်) များမှ ပြန်တွက်ပါ။
+    full မဟုတ်ရင် ယခင် rebuild ၏ "before" ရက်မှ စပြီး တွက်ပါ။ Embedded array migration ပြီးမှသာ full ဖြင့် ခေါ်ပါ။
+    """
+    global _daily_stats_ready
+    if not client: return
+    marker = migrations_collection.find_one({"_id": DAILY_STATS_ID}) or {}
+    current = marker.get("status") == "done" and marker.get("version") == DAILY_STATS_VERSION
+    since = marker.get("before") if current and not full else None
+    before = clock.day_key(clock.now() - timedelta(seconds=DAILY_STATS_LAG_SECONDS))
+    if since and since >= before: return
+
+    def source(collection, status, date_field, amount_field, prefix, breakdown_field, breakdown_name):
+        date_range = {"$lt": clock.period_range(before)[0]}
+        if since:
+            date_range["$gte"] = clock.period_range(since)[0]
+        match = {"status": status, date_field: date_range}
+        return [
+            {"$match": match},
+            {"$unionWith": {"coll": archive_of(collection).name, "pipeline": [{"$match": match}]}},
+            {"$project": {
+                "_id": 0,
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${date_field}", "timezone": clock.BUSINESS_TZ.key}},
+                "breakdown": {"$literal": breakdown_name},
+                "key": {"$ifNull": [f"${breakdown_field}", "Unknown"]},
+                f"{prefix}_total": f"${amount_field}",
+                f"{prefix}_count": {"$literal": 1}
+            }}
+        ]
+
+    orders = source(orders_collection, "confirmed", "confirmed_at", "price", "order", "amount", "packages")
+    topups = source(topups_collection, "approved", "approved_at", "amount", "topup", "payment_method", "payment_methods")
+    sums = {field: {"$sum": f"${field}"} for field in DAILY_STATS_FIELDS}
+    list(orders_collection.aggregate([
+        *orders,
+        {"$unionWith": {"coll": topups_collection.name, "pipeline": topups}},
+        # ရက် + breakdown key အလိုက် အရင် ပေါင်းပြီးမှ ရက်အလိုက် array အဖြစ် စုပါ
+        {"$group": {"_id": {"day": "$day", "breakdown": "$breakdown", "key": "$key"}, **sums}},
+        {"$group": {
+            "_id": "$_id.day",
+            **sums,
+            "breakdown": {"$push": {
+                "name": "$_id.breakdown", "key": "$_id.key",
+                "total": {"$add": ["$order_total", "$topup_total"]},
+                "count": {"$add": ["$order_count", "$topup_count"]}
+            }}
+        }},
+        {"$project": {
+            **{field: 1 for field in DAILY_STATS_FIELDS},
+            **{name: {"$map": {
+                "input": {"$filter": {"input": "$breakdown", "cond": {"$eq": ["$$this.name", name]}}},
+                "in": {"key": "$$this.key", "total": "$$this.total", "count": "$$this.count"}
+            }} for name in DAILY_STATS_BREAKDOWNS}
+        }},
+        {"$merge": {"into": daily_stats_collection.name, "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]))
+    migrations_collection.update_one(
+        {"_id": DAILY_STATS_ID},
+        {"$set": {"status": "done", "version": DAILY_STATS_VERSION, "rebuilt_at": clock.now()}, "$max": {"before": before}},
+        upsert=True
+    )
+    _daily_stats_ready = True
+
+# --- Group Chat Registry ---
+# Group ထဲက တင်တဲ့ order/topup တိုင်း group_chats ထဲမှာ chat_id တစ်ခု document တစ်ခုဖြင့် upsert လုပ်လို့
+# Broadcast နဲ့ /groups သည် orders/topups အားလုံးကို မဖတ်ဘဲ ဒီ collection သေးသေးလေးကိုသာ ဖတ်ပါတယ်။
+
+GROUP_CHATS_ID = "group_chats"
+_group_chats_ready = None
+
+def touch_group_chat(record, kind):
+    """Record ၏ chat_id သည် group ဖြစ်ရင် registry ထဲမှာ last_seen နဲ့ {kind}_count ကို update လုပ်ပါ။"""
+    chat_id = record.get("chat_id")
+    if not client or not isinstance(chat_id, int) or chat_id >= 0: return
+    seen_at = clock.parse(record.get("timestamp") or clock.now())
+    try:
+        group_chats_collection.update_one(
+            {"_id": chat_id},
+            {"$max": {"last_seen": seen_at}, "$min": {"first_seen": seen_at}, "$inc": {f"{kind}_count": 1}},
+            upsert=True
+        )
+    except Exception as e:
+        # Registry သည် broadcast အတွက်သာ ဖြစ်လို့ order/topup ကို မထိခိုက်စေရပါ
+        print(f"❌ Group chat registry update error ({chat_id}): {e}")
+
+def group_chats_ready():
+    """group_chats ကို orders/topups history မှ backfill လုပ်ပြီးပြီဆိုရင် True ပြန်ပေးပါ။"""
+    global _group_chats_ready
+    if _group_chats_ready is None and client:
+        marker = migrations_collection.find_one({"_id": GROUP_CHATS_ID}, {"status": 1})
+        _group_chats_ready = bool(marker and marker.get("status") == "done")
+    return bool(_group_chats_ready)
+
+def backfill_group_chats():
+    """
+    orders/topups (archive အပါအဝင်) ထဲက group chat_id များကို partial chat_id index ပေါ်မှာ group လုပ်ပြီး registry ထဲ $merge ပါ။
+    Embedded array migration ပြီးမှသာ ခေါ်ပါ။ ထပ် run လည်း count များ မတိုးဘဲ history အတိုင်း ပြန်ရေးပါတယ်။
+    """
+    global _group_chats_ready
+    if not client: return 0
+    for collection, kind in ((orders_collection, "order"), (topups_collection, "topup")):
+        list(collection.aggregate([
+            *_with_archive(collection, GROUP_CHAT_FILTER),
+            {"$group": {"_id": "$chat_id", "first_seen": {"$min": "$timestamp"},
+                        "last_seen": {"$max": "$timestamp"}, f"{kind}_count": {"$sum": 1}}},
+            {"$merge": {
+                "into": group_chats_collection.name,
+                "whenMatched": [{"$set": {
+                    "first_seen": {"$min": ["$first_seen", "$$new.first_seen"]},
+                    "last_seen": {"$max": ["$last_seen", "$$new.last_seen"]},
+                    f"{kind}_count": f"$$new.{kind}_count"
+                }}],
+                "whenNotMatched": "insert"
+            }}
+        ]))
+    migrations_collection.update_one(
+        {"_id": GROUP_CHATS_ID}, {"$set": {"status": "done", "updated_at": clock.now()}}, upsert=True
     )
-    return result.get("topups", [{}])[0] if result else None
+    _group_chats_ready = True
+    return group_chats_collection.estimated_document_count()
+
+def list_group_chats(limit=50):
+    """နောက်ဆုံး အသုံးပြုခဲ့တဲ့ group များကို last_seen အစဉ်လိုက် ရယူပါ။"""
+    if not client: return []
+    return list(analytics(group_chats_collection).find({}).sort("last_seen", pymongo.DESCENDING).limit(limit))
+
+def count_group_chats():
+    if not client: return 0
+    return group_chats_collection.estimated_document_count()
+
+def get_group_chat_ids():
+    """Order/topup တင်ခဲ့ဖူးတဲ့ group chat ID (အနုတ်ကိန်း) များကို ရယူပါ။"""
+    if not client: return set()
+    chat_ids = set(analytics(group_chats_collection).distinct("_id"))
+    if not group_chats_ready():
+        # Backfill မပြီးသေးခင် orders/topups (နဲ့ embedded array) ထဲကပါ ရှာပါ
+        chat_ids |= set(analytics(orders_collection).distinct("chat_id", GROUP_CHAT_FILTER))
+        chat_ids |= set(analytics(topups_collection).distinct("chat_id", GROUP_CHAT_FILTER))
+        if legacy_records_pending():
+            for field in ("orders", "topups"):
+                chat_ids.update(chat_id for chat_id in analytics(users_collection).distinct(f"{field}.chat_id")
+                                if chat_id and chat_id < 0)
+    return chat_ids
+
+# --- Legacy Embedded Records ---
+# orders/topups collection မတိုင်ခင်က record များကို user document ထဲ array အဖြစ် သိမ်းခဲ့ပါတယ်။
+# migrations.py က batch လိုက် ရွှေ့နေစဉ် ရွှေ့ပြီးသား/မရွှေ့ရသေးတဲ့ user နှစ်မျိုးလုံး မှန်မှန် ဖတ်လို့ရအောင်
+# Array ကျန်နေသေးတဲ့ user ကို လိုအပ်သလို ချက်ချင်းရွှေ့ပြီး report များမှာ array ထဲက record များကိုပါ ပေါင်းဖတ်ပါ။
+
+LEGACY_MIGRATION_ID = "embedded_records"
+LEGACY_ID_FIELDS = {"orders": "order_id", "topups": "topup_id"}
+_legacy_pending = None
+
+def legacy_records_pending():
+    """Embedded array migration မပြီးသေးရင် True ပြန်ပေးပါ။ (Checkpoint ကို တစ်ကြိမ်သာ ဖတ်ပါ)"""
+    global _legacy_pending
+    if _legacy_pending is None and client:
+        checkpoint = migrations_collection.find_one({"_id": LEGACY_MIGRATION_ID}, {"status": 1})
+        _legacy_pending = not (checkpoint and checkpoint.get("status") == "done")
+    return bool(_legacy_pending)
+
+def mark_legacy_records_migrated():
+    global _legacy_pending
+    _legacy_pending = False
+
+# Status ပြောင်းတဲ့အချိန် field မရှိတဲ့ record အဟောင်းများအတွက် timestamp ကို သုံးပါ
+SETTLED_DATE_FIELDS = {"confirmed": "confirmed_at", "approved": "approved_at"}
+
+def normalize_record_dates(record):
+    """Order/topup record ၏ ISO string datetime များကို datetime အဖြစ် ပြောင်းပါ။"""
+    for date_field in clock.DATE_FIELDS:
+        if date_field in record:
+            record[date_field] = clock.parse(record[date_field])
+    settled_field = SETTLED_DATE_FIELDS.get(record.get("status"))
+    if settled_field and settled_field not in record and "timestamp" in record:
+        record[settled_field] = record["timestamp"]
+    return record
+
+def _legacy_record_op(user_doc, field, index, record, suffixed=False):
+    """User document ၏ array ထဲက record တစ်ခုအတွက် idempotent upsert operation ကို ပြင်ဆင်ပါ။"""
+    id_field = LEGACY_ID_FIELDS[field]
+    record = normalize_record_dates({**record, "user_id": str(user_doc.get("user_id"))})
+    if suffixed:
+        # ID အဟောင်းများက တစ်စက္ကန့်တည်းမှာ ထပ်နိုင်လို့ user_id နဲ့ array index ဖြင့် ခွဲပါ
+        record["legacy_id"] = record[id_field]
+        record[id_field] = f"{record[id_field]}-{record['user_id']}-{index}"
+    key = {id_field: record.get(id_field), "user_id": record["user_id"], "timestamp": record.get("timestamp")}
+    return pymongo.UpdateOne(key, {"$setOnInsert": record}, upsert=True)
+
+def import_legacy_records(user_docs):
+    """
+    User document များ၏ embedded orders/topups များကို collection များထဲ upsert လုပ်ပြီးမှ array များကို ဖယ်ပါ။
+    Upsert က $setOnInsert ဖြစ်လို့ ထပ် run လည်း ရွှေ့ပြီးသား record ကို မထိပါ။ (orders, topups) အရေအတွက် ပြန်ပေးပါ။
+    """
+    counts = {}
+    for field, collection in (("orders", orders_collection), ("topups", topups_collection)):
+        records = [(user_doc, index, record) for user_doc in user_docs
+                   for index, record in enumerate(user_doc.get(field) or [])]
+        counts[field] = len(records)
+        if not records: continue
+        try:
+            collection.bulk_write([_legacy_record_op(user_doc, field, index, record)
+                                   for user_doc, index, record in records], ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if any(error["code"] != 11000 for error in errors): raise
+            # ID ထပ်လို့ မဝင်ခဲ့တဲ့ record များကိုသာ suffix ဖြင့် ထပ်ထည့်ပါ (ဝင်ပြီးသား record ကို မထိပါ)
+            retries = []
+            for error in errors:
+                user_doc, index, record = records[error["index"]]
+                retries.append(_legacy_record_op(user_doc, field, index, record, suffixed=True))
+            collection.bulk_write(retries, ordered=False)
+    users_collection.update_many(
+        {"_id": {"$in": [user_doc["_id"] for user_doc in user_docs]}},
+        {"$unset": {"orders": "", "topups": ""}}
+    )
+    return counts["orders"], counts["topups"]
+
+def _migrate_legacy_user(user_id):
+    """Migration မပြီးသေးရင် user တစ်ယောက်၏ array များကို ချက်ချင်း ရွှေ့ပါ။"""
+    if not legacy_records_pending(): return
+    user_doc = users_collection.find_one(
+        {"user_id": str(user_id), "$or": [{"orders": {"$exists": True}}, {"topups": {"$exists": True}}]},
+        {"user_id": 1, "orders": 1, "topups": 1}
+    )
+    if user_doc:
+        import_legacy_records([user_doc])
+
+def _with_legacy_fallback(field, id_field, record_id, operation):
+    """
+    operation() က record ကို မတွေ့ရင် အဲဒီ record ပါတဲ့ user ကို array မှ ရွှေ့ပြီး တစ်ခါ ထပ်ကြိုးစားပါ။
+    """
+    result = operation()
+    if result is None and legacy_records_pending():
+        user_doc = users_collection.find_one(
+            {f"{field}.{id_field}": record_id}, {"user_id": 1, "orders": 1, "topups": 1}
+        )
+        if user_doc:
+            import_legacy_records([user_doc])
+            result = operation()
+    return result
+
+def legacy_records(field, match):
+    """Migration မပြီးသေးရင် user document array များထဲက match ဖြစ်တဲ့ record များကို ရယူပါ။"""
+    if not legacy_records_pending(): return []
+    return list(users_collection.aggregate([
+        {"$match": {field: {"$elemMatch": match}}},
+        {"$unwind": f"${field}"},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": [{"user_id": "$user_id"}, f"${field}"]}}},
+        {"$match": match}
+    ]))
+
+# --- Order/Topup Archive ---
+# ပြီးဆုံးပြီး ARCHIVE_AFTER_DAYS ရက်ကျော်တဲ့ order/topup များကို migrations.archive_finished_records က
+# orders_archive/topups_archive သို့ batch လိုက် ရွှေ့လို့ hot collection နဲ့ index များ သေးငယ်ပြီး RAM ထဲ ဆံ့နေပါတယ်။
+# Settle ဖြစ်ချိန်ကို ကြည့်ပြီး ရွှေ့လို့ report များက cutoff မတိုင်မီ ကာလအတွက်သာ archive ကို ဖတ်ပြီး
+# History/lookup များက hot collection မှာ မတွေ့မှသာ archive ကို ဆက်ဖတ်ပါတယ်။
+# ARCHIVE_AFTER_DAYS ကို လျှော့ရင် bot process အားလုံးကို restart လုပ်ပါ။ (Report များက cutoff ကို သုံးလို့)
+
+ARCHIVE_AFTER_DAYS = max(1, _env_int("ARCHIVE_AFTER_DAYS", "180"))
+
+# Collection => ((status, settle ဖြစ်ချိန် field), ...)
+ARCHIVE_STATUSES = {
+    "orders": (("confirmed", "confirmed_at"), ("cancelled", "cancelled_at")),
+    "topups": (("approved", "approved_at"), ("rejected", "rejected_at")),
+}
+
+def archive_of(collection):
+    return db[f"{collection.name}_archive"]
+
+def archive_cutoff():
+    """ဒီအချိန်မတိုင်မီ settle ဖြစ်ခဲ့တဲ့ record များကို archive လုပ်ပါ။"""
+    return clock.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+def archive_covers(start):
+    """start နောက်ပိုင်း settle ဖြစ်ခဲ့တဲ့ record များ archive ထဲ ရောက်နေနိုင်ရင် True ပြန်ပေးပါ။"""
+    return start < archive_cutoff()
+
+def _with_archive(collection, match):
+    """collection နဲ့ archive နှစ်ခုလုံးမှ match ဖြစ်တဲ့ document များကို ယူမည့် aggregation stage များ"""
+    return [
+        {"$match": match},
+        {"$unionWith": {"coll": archive_of(collection).name, "pipeline": [{"$match": match}]}}
+    ]
+
+def _find_with_archive(collection, query):
+    return collection.find_one(query, {"_id": 0}) or archive_of(collection).find_one(query, {"_id": 0})
+
+def archive_batch(collection, cutoff, batch_size):
+    """
+    cutoff မတိုင်မီ settle ဖြစ်ခဲ့တဲ့ record batch_size ခုအထိကို archive သို့ ရွှေ့ပြီး အရေအတွက်ကို ပြန်ပေးပါ။
+    Archive ထဲ upsert လုပ်ပြီးမှ hot collection မှ ဖျက်လို့ transaction မရှိတဲ့ server မှာ ကြားက ရပ်သွားလည်း
+    Record မပျောက်ဘဲ နောက်တစ်ကြိမ် run ရင် ဆက်ရွှေ့ပါတယ်။
+    """
+    id_field = LEGACY_ID_FIELDS[collection.name]
+    query = {"$or": [{"status": status, date_field: {"$lt": cutoff}}
+                     for status, date_field in ARCHIVE_STATUSES[collection.name]]}
+    batch = list(collection.find(query).limit(batch_size))
+    if not batch: return 0
+
+    def move(session):
+        archive_of(collection).bulk_write(
+            [pymongo.ReplaceOne({id_field: doc[id_field]}, doc, upsert=True) for doc in batch],
+            ordered=False, session=session
+        )
+        collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}}, session=session)
+
+    _run_in_transaction(move)
+    return len(batch)
+
+# --- Cache Versions ---
+# Process တိုင်းက memory ထဲမှာ cache လုပ်ထားတဲ့ collection များ။ ဒီ collection များကို ပြင်တိုင်း version ကို
+# တိုးလို့ change stream မရတဲ့ server (standalone) မှာ watcher.py က version document များကိုသာ poll လုပ်ပြီး
+# အခြား bot process များ၏ ပြောင်းလဲမှုကို သိနိုင်ပါတယ်။
+
+def bump_cache_version(name):
+    if not client: return
+    try:
+        cache_versions_collection.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True)
+    except Exception as e:
+        print(f"❌ Cache version update error ({name}): {e}")
+
+def get_cache_versions():
+    """Watched collection တစ်ခုချင်းစီ၏ version ကို dict အဖြစ် ပြန်ပေးပါ။"""
+    if not client: return {}
+    return {doc["_id"]: doc.get("version", 0)
+            for doc in cache_versions_collection.find({"_id": {"$in": list(WATCHED_COLLECTIONS)}})}
 
 # --- Price Functions ---
 
@@ -181,28 +1137,56 @@ def save_prices(prices_dict):
         {"$set": {"prices": prices_dict}},
         upsert=True
     )
+    bump_cache_version("prices")
 
 # --- Authorization Functions ---
 
-def load_authorized_users():
-    if not client: return set()
-    doc = auth_collection.find_one({"_id": "auth_list"})
-    return set(doc.get("users", [])) if doc else set()
+def is_user_authorized(user_id):
+    """_id index ပေါ်မှာ point lookup တစ်ခုတည်းဖြင့် user authorize ရှိ/မရှိ စစ်ပါ။"""
+    if not client: return False
+    return auth_users_collection.find_one({"_id": str(user_id)}, {"_id": 1}) is not None
+
+def count_authorized_users():
+    if not client: return 0
+    return auth_users_collection.estimated_document_count()
 
 def add_authorized_user(user_id):
-    if not client: return
-    auth_collection.update_one(
-        {"_id": "auth_list"},
-        {"$addToSet": {"users": str(user_id)}},
+    """User ကို authorize လုပ်ပါ။ အသစ်ထည့်ခဲ့ရင် True၊ ရှိပြီးသားဆိုရင် False ပြန်ပေးပါ။"""
+    if not client: return False
+    result = auth_users_collection.update_one(
+        {"_id": str(user_id)},
+        {"$setOnInsert": {"authorized_at": clock.now()}},
         upsert=True
     )
+    if result.upserted_id is None: return False
+    bump_cache_version("auth_users")
+    return True
 
 def remove_authorized_user(user_id):
-    if not client: return
-    auth_collection.update_one(
-        {"_id": "auth_list"},
-        {"$pull": {"users": str(user_id)}}
-    )
+    """User ၏ authorize ကို ဖယ်ပါ။ ဖယ်ခဲ့ရင် True၊ authorize မလုပ်ထားရင် False ပြန်ပေးပါ။"""
+    if not client: return False
+    if auth_users_collection.delete_one({"_id": str(user_id)}).deleted_count == 0: return False
+    bump_cache_version("auth_users")
+    return True
+
+def migrate_auth_list(batch_size=1000):
+    """
+    Legacy auth_list document ထဲက users array ကို auth_users collection သို့ batch လိုက် upsert လုပ်ပြီး
+    ပြီးဆုံးမှ auth_list ကို ဖျက်ပါ။ ထပ်ခါထပ်ခါ run လည်း အန္တရာယ်မရှိပါ။ ပြောင်းရွှေ့ခဲ့တဲ့ user အရေအတွက်ကို ပြန်ပေးပါ။
+    """
+    if not client: return 0
+    doc = auth_collection.find_one({"_id": "auth_list"})
+    if not doc: return 0
+    user_ids = [str(uid) for uid in doc.get("users", [])]
+    migrated_at = clock.now()
+    for start in range(0, len(user_ids), batch_size):
+        auth_users_collection.bulk_write([
+            pymongo.UpdateOne({"_id": uid}, {"$setOnInsert": {"authorized_at": migrated_at}}, upsert=True)
+            for uid in user_ids[start:start + batch_size]
+        ], ordered=False)
+    auth_collection.delete_one({"_id": "auth_list"})
+    bump_cache_version("auth_users")
+    return len(user_ids)
 
 # --- Admin Functions ---
 
@@ -224,6 +1208,7 @@ def add_admin(admin_id):
         {"$addToSet": {"admins": int(admin_id)}},
         upsert=True
     )
+    bump_cache_version("admins")
 
 def remove_admin(admin_id):
     if not client: return
@@ -231,6 +1216,7 @@ def remove_admin(admin_id):
         {"_id": "admin_list"},
         {"$pull": {"admins": int(admin_id)}}
     )
+    bump_cache_version("admins")
 
 # --- Settings Collection Functions (For Render) ---
 
@@ -290,6 +1276,7 @@ def update_setting(key, value):
             {"$set": {key: value}},
             upsert=True
         )
+        bump_cache_version("settings")
     except Exception as e:
         print(f"Failed to update setting '{key}': {e}")
 
@@ -326,10 +1313,12 @@ def get_clone_bot_by_admin(admin_id):
     if not client: return None
     return clone_bots_collection.find_one({"owner_id": admin_id})
 
-def update_clone_bot_balance(bot_id, amount_change):
-    """Clone bot ၏ balance ကို တိုး/လျော့ ပါ။"""
+def update_clone_bot_balance(bot_id, amount_change, reason="adjustment"):
+    """Clone bot ၏ balance ကို တိုး/လျော့ ပြီး ledger ထဲမှာ reason ဖြင့် မှတ်ပါ။"""
     if not client: return
-    clone_bots_collection.update_one(
-        {"_id": bot_id},
-        {"$inc": {"balance": amount_change}}
-    )
+
+    def update(session):
+        if clone_bots_collection.update_one({"_id": bot_id}, {"$inc": {"balance": amount_change}}, session=session).matched_count:
+            _record_ledger(clone_bot_account(bot_id), amount_change, reason, session=session)
+
+    _run_in_transaction(update)
@@ -0,0 +1,47 @@
+# ids.py
+
+import os
+import threading
+import time
+
+# ULID ပုံစံ ID: 48-bit millisecond timestamp + 80-bit random ကို Crockford base32 ဖြင့် စာလုံး 26 လုံး ရေးပါ။
+# Timestamp က ရှေ့မှာရှိလို့ string အဖြစ် စီရင် အချိန်စဉ်အတိုင်း စီသွားပြီး index ထဲမှာ range scan လုပ်လို့ရပါတယ်။
+# Process တစ်ခုအတွင်း millisecond တူရင် random အပိုင်းကို +1 တိုးလို့ monotonic ဖြစ်ပြီး
+# Process အချင်းချင်းကြား 80-bit random ကြောင့် ထပ်တူ ID ထွက်နိုင်ခြေ မရှိသလောက်ပါ။
+
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ENCODING[index])
+    return "".join(reversed(chars))
+
+def new_ulid():
+    """Monotonic ULID string (စာလုံး 26 လုံး) တစ်ခု ထုတ်ပေးပါ။"""
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _last_ms:
+            # နာရီ မရွေ့သေးရင် (သို့) နောက်ပြန်ရွေ့ရင် ယခင် timestamp ကိုပဲ ဆက်သုံးပြီး random ကို တိုးပါ
+            now_ms = _last_ms
+            _last_random += 1
+            if _last_random >> RANDOM_BITS:
+                now_ms += 1
+                _last_random = int.from_bytes(os.urandom(10), "big")
+        else:
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        _last_ms = now_ms
+        return _encode(now_ms, 10) + _encode(_last_random, 16)
+
+def new_order_id():
+    return f"ORD{new_ulid()}"
+
+def new_topup_id():
+    return f"TOP{new_ulid()}"
@@ -1,8 +1,13 @@
 import asyncio, os, re
-from datetime import datetime, timedelta
+from datetime import timedelta
 from telegram import Update, Bot
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ChatMember
+import clock
+import ids
+import migrations
+import storage
+import watcher
 
 # env.py file မှ settings များကို import လုပ်ပါ
 try:
@@ -21,6 +26,7 @@ except Exception as e:
 # Database module ကို import လုပ်ပါ
 try:
     import database as db
+    import async_database as adb
 except ImportError:
     print("Error: database.py file ကို မတွေ့ပါ။")
     exit()
@@ -31,11 +37,8 @@ except Exception as e:
 
 # --- Global Variables ---
 
-# Authorized users - DB မှ တစ်ခါတည်း load လုပ်ပါ
-AUTHORIZED_USERS = db.load_authorized_users()
-
-# Admin IDs - DB မှ တစ်ခါတည်း load လုပ်ပါ
-ADMIN_IDS = db.load_admin_ids(ADMIN_ID)
+# Admin IDs - Bot စတက်လျှင် (post_init) DB မှ load လုပ်မည်
+ADMIN_IDS = [ADMIN_ID]
 
 # User states for restricting actions after screenshot (In-memory)
 user_states = {}
@@ -66,20 +69,47 @@ pending_topups = {}
 clone_bot_apps = {}
 order_queue = asyncio.Queue()
 
-def load_global_settings():
+# DB-backed caches (watcher.py က အခြား process များ၏ ပြောင်းလဲမှုကိုပါ invalidate လုပ်ပေးသည်)
+price_cache = None
+price_cache_generation = 0
+auth_cache = {}
+auth_cache_generation = 0
+AUTH_CACHE_MAX_SIZE = 10000
+
+async def load_global_settings():
     """
     Database မှ settings များကို g_settings global variable ထဲသို့ load လုပ်ပါ။
     """
     global g_settings
-    g_settings = db.load_settings(DEFAULT_PAYMENT_INFO, DEFAULT_MAINTENANCE)
+    g_settings = await adb.load_settings(DEFAULT_PAYMENT_INFO, DEFAULT_MAINTENANCE)
     print("✅ Global settings loaded from MongoDB.")
 
 
 # --- Helper Functions ---
 
-def is_user_authorized(user_id):
-    """Check if user is authorized to use the bot (uses global set)"""
-    return str(user_id) in AUTHORIZED_USERS or int(user_id) == ADMIN_ID
+async def is_user_authorized(user_id):
+    """Check if user is authorized to use the bot (cached indexed point lookup in DB)"""
+    if int(user_id) == ADMIN_ID:
+        return True
+    user_id = str(user_id)
+    if user_id in auth_cache:
+        return auth_cache[user_id]
+    generation = auth_cache_generation
+    authorized = await adb.is_user_authorized(user_id)
+    if generation == auth_cache_generation: # Load နေစဉ် invalidate မဖြစ်ခဲ့မှသာ သိမ်းပါ
+        if len(auth_cache) >= AUTH_CACHE_MAX_SIZE:
+            auth_cache.clear()
+        auth_cache[user_id] = authorized
+    return authorized
+
+def invalidate_authorization(user_id=None):
+    """User တစ်ယောက် (သို့) အားလုံး၏ cached authorization ကို ဖယ်ပါ။"""
+    global auth_cache_generation
+    auth_cache_generation += 1
+    if user_id is None:
+        auth_cache.clear()
+    else:
+        auth_cache.pop(str(user_id), None)
 
 def is_owner(user_id):
     """Check if user is the owner"""
@@ -89,15 +119,10 @@ def is_admin(user_id):
     """Check if user is any admin (uses global list)"""
     return int(user_id) in ADMIN_IDS
 
-def load_authorized_users():
-    """Reload authorized users from DB into global set"""
-    global AUTHORIZED_USERS
-    AUTHORIZED_USERS = db.load_authorized_users()
-
-def load_admin_ids_global():
+async def load_admin_ids_global():
     """Reload admin IDs from DB into global list"""
     global ADMIN_IDS
-    ADMIN_IDS = db.load_admin_ids(ADMIN_ID)
+    ADMIN_IDS = await adb.load_admin_ids(ADMIN_ID)
 
 async def is_bot_admin_in_group(bot, chat_id):
     """Check if bot is admin in the group"""
@@ -143,13 +168,26 @@ def simple_reply(message_text):
 
 # --- Price Functions (Using DB) ---
 
-def load_prices():
-    """Load custom prices from DB"""
-    return db.load_prices()
-
-def save_prices(prices):
+async def load_prices():
+    """Load custom prices (cached until invalidated by watcher or save_prices)"""
+    global price_cache
+    if price_cache is None:
+        generation = price_cache_generation
+        prices = await adb.load_prices()
+        if generation != price_cache_generation:
+            return dict(prices)
+        price_cache = prices
+    return dict(price_cache)
+
+def invalidate_prices(document_id=None):
+    global price_cache, price_cache_generation
+    price_cache_generation += 1
+    price_cache = None
+
+async def save_prices(prices):
     """Save prices to DB"""
-    db.save_prices(prices)
+    await adb.save_prices(prices)
+    invalidate_prices()
 
 # --- Validation Functions ---
 
@@ -184,9 +222,9 @@ def is_banned_account(game_id):
         return True
     return False
 
-def get_price(diamonds):
+async def get_price(diamonds):
     """Get price for diamond amount, checking custom prices first"""
-    custom_prices = load_prices()
+    custom_prices = await load_prices()
     if diamonds in custom_prices:
         return custom_prices[diamonds]
 
@@ -214,16 +252,9 @@ def is_payment_screenshot(update):
 
 # --- Bot State Check Functions ---
 
-async def check_pending_topup(user_id):
-    """Check if user has pending topups in DB"""
-    user_data = db.get_user(user_id)
-    if not user_data:
-        return False
-    
-    for topup in user_data.get("topups", []):
-        if topup.get("status") == "pending":
-            return True
-    return False
+async def check_pending_topup(context, user_id):
+    """Check if user has pending topups in DB (reads only the pending counter)"""
+    return await adb.unit_of_work(context).has_pending_topup(user_id)
 
 async def send_pending_topup_warning(update: Update):
     """Send pending topup warning message"""
@@ -281,12 +312,11 @@ async def send_maintenance_message(update: Update, command_type):
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     user_id = str(user.id)
+    uow = adb.unit_of_work(context)
     username = user.username or "-"
     name = f"{user.first_name} {user.last_name or ''}".strip()
 
-    load_authorized_users() # Reload global set from DB
-
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         keyboard = [
             [InlineKeyboardButton("📝 Register တောင်းဆိုမယ်", callback_data="request_register")]
         ]
@@ -306,13 +336,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    if await check_pending_topup(user_id):
+    # Profile ထဲက pending_topup_count ကို သုံးလို့ pending topup အတွက် query သီးသန့် မလိုပါ
+    user_doc = await uow.get_profile(user_id)
+    if user_doc and user_doc.get("pending_topup_count", 0) > 0:
         await send_pending_topup_warning(update)
         return
-
-    user_doc = db.get_user(user_id)
     if not user_doc:
-        db.create_user(user_id, name, username)
+        await uow.create_user(user_id, name, username)
 
     if user_id in user_states:
         del user_states[user_id]
@@ -350,9 +380,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
 
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         keyboard = [[InlineKeyboardButton("👑 Contact Owner", url=f"tg://user?id={ADMIN_ID}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -375,7 +405,7 @@ async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    if await check_pending_topup(user_id):
+    if await check_pending_topup(context, user_id):
         await send_pending_topup_warning(update)
         return
 
@@ -444,7 +474,7 @@ async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
         return
 
-    price = get_price(amount)
+    price = await get_price(amount)
     if not price:
         await update.message.reply_text(
             "❌ Diamond amount မှားနေပါတယ်!\n\n"
@@ -453,9 +483,24 @@ async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    user_balance = db.get_balance(user_id)
+    order_id = ids.new_order_id()
+    order = {
+        "order_id": order_id,
+        "game_id": game_id,
+        "server_id": server_id,
+        "amount": amount,
+        "price": price,
+        "status": "pending",
+        "timestamp": clock.now(),
+        "user_id": user_id,
+        "chat_id": update.effective_chat.id
+    }
 
-    if user_balance < price:
+    # Balance စစ်ခြင်း၊ နှုတ်ခြင်းနဲ့ order ထည့်ခြင်းကို DB မှာ တစ်ခါတည်း atomic လုပ်ပါ
+    new_balance = await uow.place_order(user_id, order)
+    if new_balance is None:
+        # မလုံလောက်မှသာ message အတွက် လက်ကျန်ကို ဖတ်ပါ
+        user_balance = await uow.get_balance(user_id)
         keyboard = [[InlineKeyboardButton("💳 ငွေဖြည့်မယ်", callback_data="topup_button")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -469,23 +514,6 @@ async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    order_id = f"ORD{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    order = {
-        "order_id": order_id,
-        "game_id": game_id,
-        "server_id": server_id,
-        "amount": amount,
-        "price": price,
-        "status": "pending",
-        "timestamp": datetime.now().isoformat(),
-        "user_id": user_id,
-        "chat_id": update.effective_chat.id
-    }
-
-    db.update_balance(user_id, -price)
-    db.add_order(user_id, order)
-    new_balance = db.get_balance(user_id)
-
     keyboard = [
         [
             InlineKeyboardButton("✅ Confirm", callback_data=f"order_confirm_{order_id}"),
@@ -504,11 +532,10 @@ async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"🌐 ***Server ID:*** `{server_id}`\n"
         f"💎 ***Amount:*** {amount}\n"
         f"💰 ***Price:*** {price:,} MMK\n"
-        f"⏰ ***Time:*** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"⏰ ***Time:*** {clock.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
         f"📊 Status: ⏳ ***စောင့်ဆိုင်းနေသည်***"
     )
 
-    load_admin_ids_global()
     for admin_id in ADMIN_IDS:
         try:
             await context.bot.send_message(
@@ -552,9 +579,9 @@ async def mmb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
 
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         keyboard = [[InlineKeyboardButton("👑 Contact Owner", url=f"tg://user?id={ADMIN_ID}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -581,25 +608,20 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    if await check_pending_topup(user_id):
+    if await check_pending_topup(context, user_id):
         await send_pending_topup_warning(update)
         return
 
-    user_data = db.get_user(user_id)
+    user_data = await uow.get_summary(user_id)
     if not user_data:
         await update.message.reply_text("❌ အရင်ဆုံး /start နှိပ်ပါ။")
         return
 
     balance = user_data.get("balance", 0)
-    total_orders = len(user_data.get("orders", []))
-    total_topups = len(user_data.get("topups", []))
-
-    pending_topups_count = 0
-    pending_amount = 0
-    for topup in user_data.get("topups", []):
-        if topup.get("status") == "pending":
-            pending_topups_count += 1
-            pending_amount += topup.get("amount", 0)
+    total_orders = user_data.get("order_count", 0)
+    total_topups = user_data.get("topup_count", 0)
+    pending_topups_count = user_data.get("pending_topup_count", 0)
+    pending_amount = user_data.get("pending_topup_amount", 0)
 
     name = user_data.get('name', 'Unknown').replace('*', '').replace('_', '').replace('`', '')
     username = user_data.get('username', 'None').replace('*', '').replace('_', '').replace('`', '')
@@ -642,8 +664,7 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def topup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
 
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         keyboard = [[InlineKeyboardButton("👑 Contact Owner", url=f"tg://user?id={ADMIN_ID}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -664,7 +685,7 @@ async def topup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    if await check_pending_topup(user_id):
+    if await check_pending_topup(context, user_id):
         await send_pending_topup_warning(update)
         return
 
@@ -708,7 +729,7 @@ async def topup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     pending_topups[user_id] = {
         "amount": amount,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": clock.now()
     }
 
     keyboard = [
@@ -731,8 +752,7 @@ async def topup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
 
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         keyboard = [[InlineKeyboardButton("👑 Contact Owner", url=f"tg://user?id={ADMIN_ID}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -759,7 +779,7 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    custom_prices = load_prices() # From DB
+    custom_prices = await load_prices() # From DB
 
     default_prices = {
         "wp1": 6000, "wp2": 12000, "wp3": 18000, "wp4": 24000, "wp5": 30000,
@@ -817,7 +837,7 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         return
 
     if user_id in pending_topups:
@@ -874,11 +894,39 @@ async def c_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         await update.message.reply_text(f"❌ မှားယွင်းသော expression!: {e}")
 
+HISTORY_PAGE_SIZE = 5
+
+def build_history_page(history, page):
+    """History page တစ်ခုအတွက် message နဲ့ ယခင်/နောက် button များကို ပြင်ဆင်ပါ။"""
+    orders, topups = history["orders"], history["topups"]
+
+    msg = f"📋 သင့်ရဲ့ မှတ်တမ်းများ (စာမျက်နှာ {page + 1})\n\n"
+    if orders:
+        msg += "🛒 အော်ဒါများ:\n"
+        for order in orders:
+            status_emoji = "✅" if order.get("status") == "confirmed" else "⏳" if order.get("status") == "pending" else "❌"
+            msg += f"{status_emoji} {order['order_id']} - {order['amount']} ({order['price']:,} MMK)\n"
+        msg += "\n"
+
+    if topups:
+        msg += "💳 ငွေဖြည့်များ:\n"
+        for topup in topups:
+            status_emoji = "✅" if topup.get("status") == "approved" else "⏳" if topup.get("status") == "pending" else "❌"
+            msg += f"{status_emoji} {topup['amount']:,} MMK - {clock.format_date(topup.get('timestamp'))}\n"
+
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ ယခင်", callback_data=f"history_page_{page - 1}"))
+    if history["has_next"]:
+        buttons.append(InlineKeyboardButton("နောက် ➡️", callback_data=f"history_page_{page + 1}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return msg, reply_markup
+
 async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
 
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         keyboard = [[InlineKeyboardButton("👑 Contact Owner", url=f"tg://user?id={ADMIN_ID}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -903,42 +951,28 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    if await check_pending_topup(user_id):
+    # Profile ထဲက pending_topup_count ကို သုံးလို့ pending topup အတွက် query သီးသန့် မလိုပါ
+    user_data = await uow.get_profile(user_id)
+    if user_data and user_data.get("pending_topup_count", 0) > 0:
         await send_pending_topup_warning(update)
         return
-
-    user_data = db.get_user(user_id)
     if not user_data:
         await update.message.reply_text("❌ အရင်ဆုံး /start နှိပ်ပါ။")
         return
 
-    orders = db.get_user_orders(user_id, limit=5)
-    topups = db.get_user_topups(user_id, limit=5)
-
-    if not orders and not topups:
+    history = await adb.get_history_page(user_id, page=0, page_size=HISTORY_PAGE_SIZE)
+    if not history or (not history["orders"] and not history["topups"]):
         await update.message.reply_text("📋 သင့်မှာ မည်သည့် မှတ်တမ်းမှ မရှိသေးပါ။")
         return
 
-    msg = "📋 သင့်ရဲ့ မှတ်တမ်းများ\n\n"
-    if orders:
-        msg += "🛒 အော်ဒါများ (နောက်ဆုံး 5 ခု):\n"
-        for order in orders:
-            status_emoji = "✅" if order.get("status") == "confirmed" else "⏳" if order.get("status") == "pending" else "❌"
-            msg += f"{status_emoji} {order['order_id']} - {order['amount']} ({order['price']:,} MMK)\n"
-        msg += "\n"
-
-    if topups:
-        msg += "💳 ငွေဖြည့်များ (နောက်ဆုံး 5 ခု):\n"
-        for topup in topups:
-            status_emoji = "✅" if topup.get("status") == "approved" else "⏳" if topup.get("status") == "pending" else "❌"
-            msg += f"{status_emoji} {topup['amount']:,} MMK - {topup.get('timestamp', 'Unknown')[:10]}\n"
-
-    await update.message.reply_text(msg, parse_mode="Markdown")
+    msg, reply_markup = build_history_page(history, 0)
+    await update.message.reply_text(msg, parse_mode="Markdown", reply_markup=reply_markup)
 
 # --- Admin Command Handlers ---
 
 async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
     admin_name = f"{update.effective_user.first_name} {update.effective_user.last_name or ''}".strip()
 
     if not is_admin(user_id):
@@ -961,16 +995,13 @@ async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ ငွေပမာဏမှားနေပါတယ်!")
         return
 
-    user_data = db.get_user(target_user_id)
+    user_data = await uow.get_profile(target_user_id)
     if not user_data:
         await update.message.reply_text("❌ User မတွေ့ရှိပါ!")
         return
 
-    topup_id_to_approve = None
-    for topup in reversed(user_data.get("topups", [])):
-        if topup.get("status") == "pending" and topup.get("amount") == amount:
-            topup_id_to_approve = topup.get("topup_id")
-            break
+    pending_topup = await adb.get_latest_pending_topup(target_user_id, amount)
+    topup_id_to_approve = pending_topup.get("topup_id") if pending_topup else None
 
     if not topup_id_to_approve:
         await update.message.reply_text(
@@ -982,20 +1013,20 @@ async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     updates = {
         "status": "approved",
         "approved_by": admin_name,
-        "approved_at": datetime.now().isoformat()
+        "approved_at": clock.now()
     }
     
-    approved_user_id = db.find_and_update_topup(topup_id_to_approve, updates) # This also updates balance
+    approved = await uow.approve_topup(topup_id_to_approve, updates) # This also updates balance
 
-    if not approved_user_id:
+    if not approved:
         await update.message.reply_text("❌ Topup approve လုပ်ရာတွင် အမှားဖြစ်သွားသည်!")
         return
 
     if target_user_id in user_states:
         del user_states[target_user_id]
 
+    user_balance = approved["balance"]
     try:
-        user_balance = db.get_balance(target_user_id)
         keyboard = [[InlineKeyboardButton("💎 Order တင်မယ်", url=f"https://t.me/{context.bot.username}?start=order")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -1005,7 +1036,7 @@ async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                  f"💰 ***ပမာဏ:*** `{amount:,} MMK`\n"
                  f"💳 ***လက်ကျန်ငွေ:*** `{user_balance:,} MMK`\n"
                  f"👤 ***Approved by:*** [{admin_name}](tg://user?id={user_id})\n"
-                 f"⏰ ***အချိန်:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                 f"⏰ ***အချိန်:** {clock.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
                  f"🎉 ***ယခုအခါ diamonds များ ဝယ်ယူနိုင်ပါပြီ!***\n"
                  f"🔓 ***Bot လုပ်ဆောင်ချက်များ ပြန်လည် အသုံးပြုနိုင်ပါပြီ!***",
             parse_mode="Markdown",
@@ -1018,13 +1049,14 @@ async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"✅ ***Approve အောင်မြင်ပါပြီ!***\n\n"
         f"👤 ***User ID:*** `{target_user_id}`\n"
         f"💰 ***Amount:*** `{amount:,} MMK`\n"
-        f"💳 ***User's new balance:*** `{db.get_balance(target_user_id):,} MMK`\n"
+        f"💳 ***User's new balance:*** `{user_balance:,} MMK`\n"
         f"🔓 ***User restrictions cleared!***",
         parse_mode="Markdown"
     )
 
 async def deduct_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
     if not is_admin(user_id):
         await update.message.reply_text("❌ သင်သည် admin မဟုတ်ပါ!")
         return
@@ -1048,11 +1080,11 @@ async def deduct_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ ငွေပမာဏမှားနေပါတယ်!")
         return
 
-    if not db.get_user(target_user_id):
+    if not await uow.get_profile(target_user_id):
         await update.message.reply_text("❌ User မတွေ့ရှိပါ!")
         return
 
-    current_balance = db.get_balance(target_user_id)
+    current_balance = await uow.get_balance(target_user_id)
     if current_balance < amount:
         await update.message.reply_text(
             f"❌ ***နှုတ်လို့မရပါ!***\n\n"
@@ -1062,8 +1094,8 @@ async def deduct_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    db.update_balance(target_user_id, -amount)
-    new_balance = db.get_balance(target_user_id)
+    await uow.update_balance(target_user_id, -amount, "admin_deduct")
+    new_balance = await uow.get_balance(target_user_id)
 
     try:
         user_msg = (
@@ -1141,8 +1173,7 @@ async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return text
     username_escaped = escape_markdown(username)
 
-    load_authorized_users()
-    if is_user_authorized(user_id):
+    if await is_user_authorized(user_id):
         await update.message.reply_text(
             "✅ သင်သည် အသုံးပြုခွင့် ရပြီးသား ဖြစ်ပါတယ်!\n\n"
             "🚀 /start နှိပ်ပြီး bot ကို အသုံးပြုနိုင်ပါပြီ။",
@@ -1161,7 +1192,7 @@ async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"👤 ***User Name:*** [{name}](tg://user?id={user_id})\n"
         f"🆔 ***User ID:*** `{user_id}`\n"
         f"📱 ***Username:*** @{username_escaped}\n"
-        f"⏰ ***Time:*** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        f"⏰ ***Time:*** {clock.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
         f"***အသုံးပြုခွင့် ပေးမလား?***"
     )
 
@@ -1211,6 +1242,7 @@ async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
     admin_name = f"{update.effective_user.first_name} {update.effective_user.last_name or ''}".strip()
 
     if not is_admin(user_id):
@@ -1223,14 +1255,11 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     target_user_id = args[0]
-    load_authorized_users()
 
-    if target_user_id not in AUTHORIZED_USERS:
+    if not await adb.remove_authorized_user(target_user_id):
         await update.message.reply_text("ℹ️ User သည် authorize မလုပ်ထားပါ။")
         return
-
-    db.remove_authorized_user(target_user_id)
-    load_authorized_users()
+    invalidate_authorization(target_user_id)
 
     try:
         await context.bot.send_message(
@@ -1244,7 +1273,7 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
 
     try:
-        user_doc = db.get_user(target_user_id)
+        user_doc = await uow.get_profile(target_user_id)
         user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
         await context.bot.send_message(
             chat_id=ADMIN_ID,
@@ -1259,7 +1288,7 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         if await is_bot_admin_in_group(context.bot, ADMIN_GROUP_ID):
-            user_doc = db.get_user(target_user_id)
+            user_doc = await uow.get_profile(target_user_id)
             user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
             group_msg = (
                 f"🚫 ***User Ban ဖြစ်ပါပြီ!***\n\n"
@@ -1275,12 +1304,13 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         f"✅ User Ban အောင်မြင်ပါပြီ!\n\n"
         f"👤 User ID: `{target_user_id}`\n"
-        f"📝 Total authorized users: {len(AUTHORIZED_USERS)}",
+        f"📝 Total authorized users: {await adb.count_authorized_users()}",
         parse_mode="Markdown"
     )
 
 async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
     admin_name = f"{update.effective_user.first_name} {update.effective_user.last_name or ''}".strip()
 
     if not is_admin(user_id):
@@ -1293,14 +1323,11 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     target_user_id = args[0]
-    load_authorized_users()
 
-    if target_user_id in AUTHORIZED_USERS:
+    if not await adb.add_authorized_user(target_user_id):
         await update.message.reply_text("ℹ️ User သည် authorize ပြုလုပ်ထားပြီးပါပြီ။")
         return
-
-    db.add_authorized_user(target_user_id)
-    load_authorized_users()
+    invalidate_authorization(target_user_id)
 
     if target_user_id in user_states:
         del user_states[target_user_id]
@@ -1317,7 +1344,7 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
 
     try:
-        user_doc = db.get_user(target_user_id)
+        user_doc = await uow.get_profile(target_user_id)
         user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
         await context.bot.send_message(
             chat_id=ADMIN_ID,
@@ -1332,7 +1359,7 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         if await is_bot_admin_in_group(context.bot, ADMIN_GROUP_ID):
-            user_doc = db.get_user(target_user_id)
+            user_doc = await uow.get_profile(target_user_id)
             user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
             group_msg = (
                 f"✅ ***User Unban ဖြစ်ပါပြီ!***\n\n"
@@ -1348,7 +1375,7 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         f"✅ User Unban အောင်မြင်ပါပြီ!\n\n"
         f"👤 User ID: `{target_user_id}`\n"
-        f"📝 Total authorized users: {len(AUTHORIZED_USERS)}",
+        f"📝 Total authorized users: {await adb.count_authorized_users()}",
         parse_mode="Markdown"
     )
 
@@ -1380,9 +1407,9 @@ async def maintenance_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     new_status = (status == "on")
     
     # Update DB
-    db.update_setting(f"maintenance.{feature}", new_status)
+    await adb.update_setting(f"maintenance.{feature}", new_status)
     # Reload local settings from DB
-    load_global_settings()
+    await load_global_settings()
 
     status_text = "🟢 ***ဖွင့်ထား***" if new_status else "🔴 ***ပိတ်ထား***"
     feature_text = {
@@ -1415,7 +1442,7 @@ async def testgroup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 chat_id=ADMIN_GROUP_ID,
                 text=f"✅ **Test Notification**\n\n"
                      f"🔔 Bot ကနေ group ထဲကို message ပို့နိုင်ပါပြီ!\n"
-                     f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                     f"⏰ Time: {clock.now().strftime('%Y-%m-%d %H:%M:%S')}",
                 parse_mode="Markdown"
             )
             await update.message.reply_text(
@@ -1468,9 +1495,9 @@ async def setprice_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ ဈေးနှုန်း ကိန်းဂဏန်းဖြင့် ထည့်ပါ!")
         return
 
-    custom_prices = load_prices()
+    custom_prices = await load_prices()
     custom_prices[item] = price
-    save_prices(custom_prices) # Save to DB
+    await save_prices(custom_prices) # Save to DB
 
     await update.message.reply_text(
         f"✅ ***ဈေးနှုန်း ပြောင်းလဲပါပြီ!***\n\n"
@@ -1494,13 +1521,13 @@ async def removeprice_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     item = args[0]
-    custom_prices = load_prices()
+    custom_prices = await load_prices()
     if item not in custom_prices:
         await update.message.reply_text(f"❌ `{item}` မှာ custom price မရှိပါ!")
         return
 
     del custom_prices[item]
-    save_prices(custom_prices) # Save to DB
+    await save_prices(custom_prices) # Save to DB
 
     await update.message.reply_text(
         f"✅ ***Custom Price ဖျက်ပါပြီ!***\n\n"
@@ -1520,8 +1547,8 @@ async def setwavenum_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     new_number = args[0]
-    db.update_setting("payment_info.wave_number", new_number)
-    load_global_settings()
+    await adb.update_setting("payment_info.wave_number", new_number)
+    await load_global_settings()
 
     await update.message.reply_text(
         f"✅ ***Wave နံပါတ် ပြောင်းလဲပါပြီ!***\n\n"
@@ -1541,8 +1568,8 @@ async def setkpaynum_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     new_number = args[0]
-    db.update_setting("payment_info.kpay_number", new_number)
-    load_global_settings()
+    await adb.update_setting("payment_info.kpay_number", new_number)
+    await load_global_settings()
 
     await update.message.reply_text(
         f"✅ ***KPay နံပါတ် ပြောင်းလဲပါပြီ!***\n\n"
@@ -1562,8 +1589,8 @@ async def setwavename_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     new_name = " ".join(args)
-    db.update_setting("payment_info.wave_name", new_name)
-    load_global_settings()
+    await adb.update_setting("payment_info.wave_name", new_name)
+    await load_global_settings()
 
     await update.message.reply_text(
         f"✅ ***Wave နာမည် ပြောင်းလဲပါပြီ!***\n\n"
@@ -1583,8 +1610,8 @@ async def setkpayname_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     new_name = " ".join(args)
-    db.update_setting("payment_info.kpay_name", new_name)
-    load_global_settings()
+    await adb.update_setting("payment_info.kpay_name", new_name)
+    await load_global_settings()
 
     await update.message.reply_text(
         f"✅ ***KPay နာမည် ပြောင်းလဲပါပြီ!***\n\n"
@@ -1603,8 +1630,8 @@ async def setkpayqr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     photo = update.message.reply_to_message.photo[-1].file_id
-    db.update_setting("payment_info.kpay_image", photo)
-    load_global_settings()
+    await adb.update_setting("payment_info.kpay_image", photo)
+    await load_global_settings()
     await update.message.reply_text("✅ KPay QR Code ထည့်သွင်းပြီးပါပြီ!")
 
 async def removekpayqr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1613,8 +1640,8 @@ async def removekpayqr_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ Owner သာ payment QR ဖျက်နိုင်ပါတယ်!")
         return
 
-    db.update_setting("payment_info.kpay_image", None)
-    load_global_settings()
+    await adb.update_setting("payment_info.kpay_image", None)
+    await load_global_settings()
     await update.message.reply_text("✅ KPay QR Code ဖျက်ပြီးပါပြီ!")
 
 async def setwaveqr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1627,8 +1654,8 @@ async def setwaveqr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     photo = update.message.reply_to_message.photo[-1].file_id
-    db.update_setting("payment_info.wave_image", photo)
-    load_global_settings()
+    await adb.update_setting("payment_info.wave_image", photo)
+    await load_global_settings()
     await update.message.reply_text("✅ Wave QR Code ထည့်သွင်းပြီးပါပြီ!")
 
 async def removewaveqr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1637,8 +1664,8 @@ async def removewaveqr_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ Owner သာ payment QR ဖျက်နိုင်ပါတယ်!")
         return
 
-    db.update_setting("payment_info.wave_image", None)
-    load_global_settings()
+    await adb.update_setting("payment_info.wave_image", None)
+    await load_global_settings()
     await update.message.reply_text("✅ Wave QR Code ဖျက်ပြီးပါပြီ!")
 
 async def addadm_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1657,8 +1684,8 @@ async def addadm_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("ℹ️ User သည် admin ဖြစ်နေပြီးပါပြီ။")
         return
 
-    db.add_admin(new_admin_id)
-    load_admin_ids_global()
+    await adb.add_admin(new_admin_id)
+    await load_admin_ids_global()
 
     try:
         await context.bot.send_message(
@@ -1697,8 +1724,8 @@ async def unadm_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("ℹ️ User သည် admin မဟုတ်ပါ။")
         return
 
-    db.remove_admin(target_admin_id)
-    load_admin_ids_global()
+    await adb.remove_admin(target_admin_id)
+    await load_admin_ids_global()
 
     try:
         await context.bot.send_message(
@@ -1751,8 +1778,7 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_fail = 0
     group_success = 0
     group_fail = 0
-
-    all_users = db.get_all_users()
+    group_chats = await adb.get_group_chat_ids() if send_to_groups else set()
 
     if replied_msg.photo:
         photo_file_id = replied_msg.photo[-1].file_id
@@ -1760,7 +1786,7 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         caption_entities = replied_msg.caption_entities or None
 
         if send_to_users:
-            for user_doc in all_users:
+            async for user_doc in adb.iter_users():
                 uid = user_doc.get("user_id")
                 try:
                     await context.bot.send_photo(
@@ -1773,13 +1799,6 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     user_fail += 1
         
         if send_to_groups:
-            group_chats = set()
-            for user_doc in all_users:
-                for order in user_doc.get("orders", []):
-                    if order.get("chat_id") and order.get("chat_id") < 0: group_chats.add(order.get("chat_id"))
-                for topup in user_doc.get("topups", []):
-                    if topup.get("chat_id") and topup.get("chat_id") < 0: group_chats.add(topup.get("chat_id"))
-            
             for chat_id in group_chats:
                 try:
                     await context.bot.send_photo(
@@ -1796,7 +1815,7 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         entities = replied_msg.entities or None
 
         if send_to_users:
-            for user_doc in all_users:
+            async for user_doc in adb.iter_users():
                 uid = user_doc.get("user_id")
                 try:
                     await context.bot.send_message(
@@ -1809,13 +1828,6 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     user_fail += 1
 
         if send_to_groups:
-            group_chats = set()
-            for user_doc in all_users:
-                for order in user_doc.get("orders", []):
-                    if order.get("chat_id") and order.get("chat_id") < 0: group_chats.add(order.get("chat_id"))
-                for topup in user_doc.get("topups", []):
-                    if topup.get("chat_id") and topup.get("chat_id") < 0: group_chats.add(topup.get("chat_id"))
-
             for chat_id in group_chats:
                 try:
                     await context.bot.send_message(
@@ -1843,6 +1855,68 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode="Markdown"
     )
 
+GROUPS_LIST_LIMIT = 30
+
+async def groups_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = str(update.effective_user.id)
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ သင်သည် admin မဟုတ်ပါ!")
+        return
+
+    groups = await adb.list_group_chats(GROUPS_LIST_LIMIT)
+    total = await adb.count_group_chats()
+    if not groups:
+        await update.message.reply_text("📭 Order/Topup တင်ခဲ့တဲ့ group မရှိသေးပါ!")
+        return
+
+    msg = f"👥 ***Group Chats*** ({total} ခု)\n\n"
+    for group in groups:
+        msg += (
+            f"• `{group['_id']}` - 🛒 {group.get('order_count', 0)} | 💳 {group.get('topup_count', 0)}"
+            f" | ⏰ {clock.format_date(group.get('last_seen'), '%Y-%m-%d %H:%M')}\n"
+        )
+    if total > len(groups):
+        msg += f"\n... နောက်ဆုံး အသုံးပြုခဲ့တဲ့ {len(groups)} ခုသာ ပြထားပါတယ်"
+    await update.message.reply_text(msg, parse_mode="Markdown")
+
+LEDGER_ENTRY_LIMIT = 10
+
+async def ledger_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = str(update.effective_user.id)
+    uow = adb.unit_of_work(context)
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ သင်သည် admin မဟုတ်ပါ!")
+        return
+
+    if len(context.args) != 1:
+        await update.message.reply_text("❌ မှန်ကန်တဲ့ format: `/ledger user_id`", parse_mode="Markdown")
+        return
+
+    target_user_id = context.args[0]
+    if not await uow.get_profile(target_user_id):
+        await update.message.reply_text("❌ User မတွေ့ရှိပါ!")
+        return
+
+    cached_balance = await uow.get_balance(target_user_id)
+    ledger_balance = await adb.ledger_balance(target_user_id)
+    entries = await adb.get_ledger_entries(target_user_id, LEDGER_ENTRY_LIMIT)
+
+    msg = (
+        f"📒 ***Balance Ledger*** (`{target_user_id}`)\n\n"
+        f"💳 ***လက်ကျန်ငွေ***: `{cached_balance:,} MMK`\n"
+        f"📒 ***Ledger အရ***: `{ledger_balance:,} MMK`"
+        + (" ✅" if ledger_balance == cached_balance else " ⚠️ မကိုက်ညီပါ!") + "\n\n"
+    )
+    for entry in entries:
+        msg += (
+            f"• `{entry['delta']:+,}` `{entry.get('reason')}`"
+            + (f" `{entry['ref_id']}`" if entry.get("ref_id") else "")
+            + f" | ⏰ {clock.format_date(entry.get('created_at'), '%Y-%m-%d %H:%M')}\n"
+        )
+    if not entries:
+        msg += "📭 Ledger entry မရှိသေးပါ!"
+    await update.message.reply_text(msg, parse_mode="Markdown")
+
 async def adminhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
     if not is_admin(user_id):
@@ -1850,11 +1924,6 @@ async def adminhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     is_user_owner = is_owner(user_id)
-    
-    # Reload all settings from DB for accurate status
-    load_global_settings()
-    load_authorized_users()
-    load_admin_ids_global()
 
     help_msg = "🔧 *Admin Commands List* 🔧\n\n"
 
@@ -1865,17 +1934,20 @@ async def adminhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "• /unadm <user\\_id> - Admin ဖြုတ်ခြင်း\n"
             "• /ban <user\\_id> - User ban လုပ်\n"
             "• /unban <user\\_id> - User unban လုပ်\n"
-            "• /broadcast - (Reply) Users/Groups သို့ message ပို့\n\n"
+            "• /broadcast - (Reply) Users/Groups သို့ message ပို့\n"
+            "• /migrate - Orders/Topups migration အခြေအနေ ကြည့်/ပြန်စ\n\n"
         )
 
     help_msg += (
         "💰 *Balance Management:*\n"
         "• /approve <user\\_id> <amount> - Topup approve လုပ်\n"
-        "• /deduct <user\\_id> <amount> - Balance နှုတ်ခြင်း\n\n"
+        "• /deduct <user\\_id> <amount> - Balance နှုတ်ခြင်း\n"
+        "• /ledger <user\\_id> - Balance ပြောင်းလဲမှု မှတ်တမ်း\n\n"
         "💬 *Communication:*\n"
         "• /reply <user\\_id> <message> - User ကို message ပို့\n"
         "• /done <user\\_id> - Order complete message ပို့\n"
-        "• /sendgroup <message> - Admin group ကို message ပို့\n\n"
+        "• /sendgroup <message> - Admin group ကို message ပို့\n"
+        "• /groups - Order/Topup တင်ခဲ့တဲ့ group များ\n\n"
         "🔧 *Bot Maintenance:*\n"
         "• /maintenance <orders/topups/general> <on/off> - Features ဖွင့်ပိတ်\n\n"
         "💎 *Price Management:*\n"
@@ -1902,7 +1974,7 @@ async def adminhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"• Orders: {'🟢 Enabled' if g_settings['maintenance']['orders'] else '🔴 Disabled'}\n"
         f"• Topups: {'🟢 Enabled' if g_settings['maintenance']['topups'] else '🔴 Disabled'}\n"
         f"• General: {'🟢 Enabled' if g_settings['maintenance']['general'] else '🔴 Disabled'}\n"
-        f"• Authorized Users: {len(AUTHORIZED_USERS)}\n"
+        f"• Authorized Users: {await adb.count_authorized_users()}\n"
         f"• Total Admins: {len(ADMIN_IDS)}\n\n"
         f"💳 *Current Payment Info (from DB):*\n"
         f"• Wave: {g_settings['payment_info']['wave_number']} ({g_settings['payment_info']['wave_name']})\n"
@@ -1913,17 +1985,17 @@ async def adminhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- Clone Bot Management ---
 
-def load_clone_bots():
+async def load_clone_bots():
     """Load clone bots from DB"""
-    return db.load_clone_bots()
+    return await adb.load_clone_bots()
 
-def save_clone_bot(bot_id, bot_data):
+async def save_clone_bot(bot_id, bot_data):
     """Save clone bot to DB"""
-    db.save_clone_bot(bot_id, bot_data)
+    await adb.save_clone_bot(bot_id, bot_data)
 
-def remove_clone_bot(bot_id):
+async def remove_clone_bot(bot_id):
     """Remove clone bot from DB"""
-    return db.remove_clone_bot(bot_id)
+    return await adb.remove_clone_bot(bot_id)
 
 async def addbot_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
@@ -1947,7 +2019,7 @@ async def addbot_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         bot_username = bot_info.username
         bot_id = str(bot_info.id)
 
-        clone_bots = load_clone_bots()
+        clone_bots = await load_clone_bots()
         if bot_id in clone_bots:
             await update.message.reply_text(f"ℹ️ ဒီ bot (@{bot_username}) ထည့်ပြီးသားပါ!")
             return
@@ -1958,9 +2030,9 @@ async def addbot_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "owner_id": user_id,  # Clone bot admin
             "balance": 0,
             "status": "active",
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "created_at": clock.now()
         }
-        save_clone_bot(bot_id, bot_data)
+        await save_clone_bot(bot_id, bot_data)
 
         asyncio.create_task(run_clone_bot(bot_token, bot_id, user_id))
 
@@ -1981,7 +2053,7 @@ async def listbots_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Admin များသာ bot list ကြည့်နိုင်ပါတယ်!")
         return
 
-    clone_bots = load_clone_bots()
+    clone_bots = await load_clone_bots()
     if not clone_bots:
         await update.message.reply_text("ℹ️ Clone bot များ မရှိသေးပါ။")
         return
@@ -1994,7 +2066,7 @@ async def listbots_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"├ ID: `{bot_id}`\n"
             f"├ Admin: `{bot_data.get('owner_id', 'Unknown')}`\n"
             f"├ Balance: {bot_data.get('balance', 0):,} MMK\n"
-            f"└ Created: {bot_data.get('created_at', 'Unknown')}\n\n"
+            f"└ Created: {clock.format_date(bot_data.get('created_at'), '%Y-%m-%d %H:%M:%S')}\n\n"
         )
     msg += f"📊 စုစုပေါင်း: {len(clone_bots)} bots"
     await update.message.reply_text(msg, parse_mode="Markdown")
@@ -2011,7 +2083,7 @@ async def removebot_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     bot_id = args[0]
-    if remove_clone_bot(bot_id):
+    if await remove_clone_bot(bot_id):
         if bot_id in clone_bot_apps:
             try:
                 await clone_bot_apps[bot_id].stop()
@@ -2050,13 +2122,13 @@ async def addfund_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Amount က 0 ထက် ကြီးရမယ်!")
         return
 
-    bot_found = db.get_clone_bot_by_admin(admin_id)
+    bot_found = await adb.get_clone_bot_by_admin(admin_id)
     if not bot_found:
         await update.message.reply_text(f"❌ Admin ID `{admin_id}` နဲ့ bot မတွေ့ပါ!", parse_mode="Markdown")
         return
 
     bot_id_found = str(bot_found.get("_id"))
-    db.update_clone_bot_balance(bot_id_found, amount)
+    await adb.update_clone_bot_balance(bot_id_found, amount, "admin_addfund")
     new_balance = bot_found.get("balance", 0) + amount
 
     try:
@@ -2105,7 +2177,7 @@ async def deductfund_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("❌ Amount က 0 ထက် ကြီးရမယ်!")
         return
 
-    bot_found = db.get_clone_bot_by_admin(admin_id)
+    bot_found = await adb.get_clone_bot_by_admin(admin_id)
     if not bot_found:
         await update.message.reply_text(f"❌ Admin ID `{admin_id}` နဲ့ bot မတွေ့ပါ!", parse_mode="Markdown")
         return
@@ -2120,7 +2192,7 @@ async def deductfund_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     bot_id_found = str(bot_found.get("_id"))
-    db.update_clone_bot_balance(bot_id_found, -amount)
+    await adb.update_clone_bot_balance(bot_id_found, -amount, "admin_deductfund")
     new_balance = current_balance - amount
 
     try:
@@ -2196,7 +2268,7 @@ async def clone_bot_mmb(update: Update, context: ContextTypes.DEFAULT_TYPE, bot_
         await update.message.reply_text("❌ Server ID မမှန်ကန်ပါ! (3-5 ဂဏန်းများသာ)")
         return
 
-    price = get_price(diamonds) # Uses DB-backed prices
+    price = await get_price(diamonds) # Uses DB-backed prices
     if not price:
         await update.message.reply_text(f"❌ {diamonds} diamonds မရရှိနိုင်ပါ!")
         return
@@ -2204,7 +2276,7 @@ async def clone_bot_mmb(update: Update, context: ContextTypes.DEFAULT_TYPE, bot_
     order_data = {
         "bot_id": bot_id, "user_id": user_id, "username": user.username or user.first_name,
         "game_id": game_id, "server_id": server_id, "diamonds": diamonds, "price": price,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "timestamp": clock.now()
     }
 
     keyboard = [
@@ -2278,7 +2350,7 @@ async def clone_bot_callback(update: Update, context: ContextTypes.DEFAULT_TYPE,
         game_id = parts[4]
         server_id = parts[5]
         diamonds = parts[6]
-        price = get_price(diamonds)
+        price = await get_price(diamonds)
 
         keyboard = [
             [
@@ -2312,8 +2384,8 @@ async def clone_bot_callback(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    uow = adb.unit_of_work(context)
+    if not await is_user_authorized(user_id):
         return
 
     if not is_payment_screenshot(update):
@@ -2346,7 +2418,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     user_states[user_id] = "waiting_approval"
-    topup_id = f"TOP{datetime.now().strftime('%Y%m%d%H%M%S')}{user_id[-4:]}"
+    topup_id = ids.new_topup_id()
     user_name = f"{update.effective_user.first_name} {update.effective_user.last_name or ''}".strip()
 
     admin_msg = (
@@ -2370,12 +2442,11 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "amount": amount,
         "payment_method": payment_method,
         "status": "pending",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": clock.now(),
         "chat_id": update.effective_chat.id
     }
-    db.add_topup(user_id, topup_request)
+    await uow.add_topup(user_id, topup_request)
 
-    load_admin_ids_global()
     try:
         for admin_id in ADMIN_IDS:
             try:
@@ -2450,8 +2521,7 @@ async def handle_restricted_content(update: Update, context: ContextTypes.DEFAUL
     """Handle all non-command messages for restricted users"""
     user_id = str(update.effective_user.id)
 
-    load_authorized_users()
-    if not is_user_authorized(user_id):
+    if not await is_user_authorized(user_id):
         if update.message.text:
             reply = simple_reply(update.message.text)
             await update.message.reply_text(reply, parse_mode="Markdown")
@@ -2484,7 +2554,29 @@ async def handle_restricted_content(update: Update, context: ContextTypes.DEFAUL
             parse_mode="Markdown"
         )
 
-# --- Report Commands (Using DB iteration) ---
+# --- Report Commands (Server-side aggregation via report.py) ---
+
+REPORT_MAX_PERIOD_ROWS = 31
+
+def build_report_breakdown(report):
+    """Sales report ၏ ကာလအလိုက်၊ package အလိုက်၊ payment method အလိုက် ခွဲခြမ်းချက်ကို message အဖြစ် ရေးပါ။"""
+    msg = ""
+    periods = report["periods"]
+    if len(periods) > 1:
+        msg += "\n\n📆 ***ကာလအလိုက်***:\n"
+        for row in periods[-REPORT_MAX_PERIOD_ROWS:]:
+            msg += f"• `{row['period']}` - 🛒 {row['order_total']:,} ({row['order_count']}) | 💳 {row['topup_total']:,} ({row['topup_count']})\n"
+        if len(periods) > REPORT_MAX_PERIOD_ROWS:
+            msg += f"... နောက်ဆုံး {REPORT_MAX_PERIOD_ROWS} ခုသာ ပြထားပါတယ်\n"
+    if report["packages"]:
+        msg += "\n💎 ***Package အလိုက်***:\n"
+        for row in report["packages"]:
+            msg += f"• `{row['key']}` - {row['count']} ခု | {row['total']:,} MMK\n"
+    if report["payment_methods"]:
+        msg += "\n📱 ***Payment အလိုက်***:\n"
+        for row in report["payment_methods"]:
+            msg += f"• `{str(row['key']).upper()}` - {row['count']} ခု | {row['total']:,} MMK\n"
+    return msg.rstrip("\n")
 
 async def daily_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
@@ -2494,7 +2586,7 @@ async def daily_report_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     args = context.args
     if len(args) == 0:
-        today = datetime.now()
+        today = clock.now()
         yesterday = today - timedelta(days=1)
         week_ago = today - timedelta(days=7)
         keyboard = [
@@ -2522,25 +2614,15 @@ async def daily_report_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ ***Format မှားနေပါတယ်!***")
         return
     
-    all_users = db.get_all_users()
-    total_sales = 0
-    total_orders = 0
-    total_topups = 0
-    topup_count = 0
-
-    for user_data in all_users:
-        for order in user_data.get("orders", []):
-            if order.get("status") == "confirmed":
-                order_date = order.get("confirmed_at", order.get("timestamp", ""))[:10]
-                if start_date <= order_date <= end_date:
-                    total_sales += order["price"]
-                    total_orders += 1
-        for topup in user_data.get("topups", []):
-            if topup.get("status") == "approved":
-                topup_date = topup.get("approved_at", topup.get("timestamp", ""))[:10]
-                if start_date <= topup_date <= end_date:
-                    total_topups += topup["amount"]
-                    topup_count += 1
+    try:
+        start, end = clock.period_range(start_date, end_date)
+    except ValueError:
+        await update.message.reply_text("❌ ***Format မှားနေပါတယ်!***", parse_mode="Markdown")
+        return
+
+    report = await adb.sales_report(start, end, "day")
+    total_sales, total_orders = report["order_total"], report["order_count"]
+    total_topups, topup_count = report["topup_total"], report["topup_count"]
     
     await update.message.reply_text(
         f"📊 ***ရောင်းရငွေ & ငွေဖြည့် မှတ်တမ်း***\n\n"
@@ -2550,7 +2632,8 @@ async def daily_report_command(update: Update, context: ContextTypes.DEFAULT_TYP
         f"📦 ***အရေအတွက်***: {total_orders}\n\n"
         f"💳 ***Topup Approved စုစုပေါင်း***:\n"
         f"💰 ***ငွေ***: `{total_topups:,} MMK`\n"
-        f"📦 ***အရေအတွက်***: {topup_count}",
+        f"📦 ***အရေအတွက်***: {topup_count}"
+        f"{build_report_breakdown(report)}",
         parse_mode="Markdown"
     )
 
@@ -2562,7 +2645,7 @@ async def monthly_report_command(update: Update, context: ContextTypes.DEFAULT_T
 
     args = context.args
     if len(args) == 0:
-        today = datetime.now()
+        today = clock.now()
         this_month = today.strftime("%Y-%m")
         last_month = (today.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
         three_months_ago = (today.replace(day=1) - timedelta(days=90)).strftime("%Y-%m")
@@ -2591,25 +2674,15 @@ async def monthly_report_command(update: Update, context: ContextTypes.DEFAULT_T
         await update.message.reply_text("❌ ***Format မှားနေပါတယ်!***")
         return
 
-    all_users = db.get_all_users()
-    total_sales = 0
-    total_orders = 0
-    total_topups = 0
-    topup_count = 0
-
-    for user_data in all_users:
-        for order in user_data.get("orders", []):
-            if order.get("status") == "confirmed":
-                order_month = order.get("confirmed_at", order.get("timestamp", ""))[:7]
-                if start_month <= order_month <= end_month:
-                    total_sales += order["price"]
-                    total_orders += 1
-        for topup in user_data.get("topups", []):
-            if topup.get("status") == "approved":
-                topup_month = topup.get("approved_at", topup.get("timestamp", ""))[:7]
-                if start_month <= topup_month <= end_month:
-                    total_topups += topup["amount"]
-                    topup_count += 1
+    try:
+        start, end = clock.period_range(start_month, end_month)
+    except ValueError:
+        await update.message.reply_text("❌ ***Format မှားနေပါတယ်!***", parse_mode="Markdown")
+        return
+
+    report = await adb.sales_report(start, end, "month")
+    total_sales, total_orders = report["order_total"], report["order_count"]
+    total_topups, topup_count = report["topup_total"], report["topup_count"]
 
     await update.message.reply_text(
         f"📊 ***ရောင်းရငွေ & ငွေဖြည့် မှတ်တမ်း***\n\n"
@@ -2619,7 +2692,8 @@ async def monthly_report_command(update: Update, context: ContextTypes.DEFAULT_T
         f"📦 ***အရေအတွက်:*** {total_orders}\n\n"
         f"💳 ***Topup Approved စုစုပေါင်း***:\n"
         f"💰 ***ငွေ:*** `{total_topups:,} MMK`\n"
-        f"📦 ***အရေအတွက်:*** {topup_count}",
+        f"📦 ***အရေအတွက်:*** {topup_count}"
+        f"{build_report_breakdown(report)}",
         parse_mode="Markdown"
     )
 
@@ -2631,7 +2705,7 @@ async def yearly_report_command(update: Update, context: ContextTypes.DEFAULT_TY
 
     args = context.args
     if len(args) == 0:
-        today = datetime.now()
+        today = clock.now()
         this_year = today.strftime("%Y")
         last_year = str(int(this_year) - 1)
         keyboard = [
@@ -2659,25 +2733,15 @@ async def yearly_report_command(update: Update, context: ContextTypes.DEFAULT_TY
         await update.message.reply_text("❌ ***Format မှားနေပါတယ်!***")
         return
 
-    all_users = db.get_all_users()
-    total_sales = 0
-    total_orders = 0
-    total_topups = 0
-    topup_count = 0
-
-    for user_data in all_users:
-        for order in user_data.get("orders", []):
-            if order.get("status") == "confirmed":
-                order_year = order.get("confirmed_at", order.get("timestamp", ""))[:4]
-                if start_year <= order_year <= end_year:
-                    total_sales += order["price"]
-                    total_orders += 1
-        for topup in user_data.get("topups", []):
-            if topup.get("status") == "approved":
-                topup_year = topup.get("approved_at", topup.get("timestamp", ""))[:4]
-                if start_year <= topup_year <= end_year:
-                    total_topups += topup["amount"]
-                    topup_count += 1
+    try:
+        start, end = clock.period_range(start_year, end_year)
+    except ValueError:
+        await update.message.reply_text("❌ ***Format မှားနေပါတယ်!***", parse_mode="Markdown")
+        return
+
+    report = await adb.sales_report(start, end, "year")
+    total_sales, total_orders = report["order_total"], report["order_count"]
+    total_topups, topup_count = report["topup_total"], report["topup_count"]
 
     await update.message.reply_text(
         f"📊 ***ရောင်းရငွေ & ငွေဖြည့် မှတ်တမ်း***\n\n"
@@ -2687,15 +2751,125 @@ async def yearly_report_command(update: Update, context: ContextTypes.DEFAULT_TY
         f"📦 ***အရေအတွက်***: {total_orders}\n\n"
         f"💳 ***Topup Approved စုစုပေါင်း***:\n"
         f"💰 ***ငွေ***: `{total_topups:,} MMK`\n"
-        f"📦 ***အရေအတွက်***: {topup_count}",
+        f"📦 ***အရေအတွက်***: {topup_count}"
+        f"{build_report_breakdown(report)}",
+        parse_mode="Markdown"
+    )
+
+# --- Cache Invalidation ---
+
+def start_cache_watcher():
+    """
+    settings/admins/prices/auth_users ပြောင်းတိုင်း (အခြား bot process မှ ပြောင်းရင်လည်း) in-process cache များကို
+    Event loop ပေါ်မှာ ပြန် load / invalidate လုပ်ရန် watcher.py ကို subscribe လုပ်ပြီး စပါ။
+    """
+    loop = asyncio.get_running_loop()
+
+    def on_loop(callback):
+        return lambda document_id=None: loop.call_soon_threadsafe(callback, document_id)
+
+    def reload(load):
+        return on_loop(lambda document_id: asyncio.create_task(load()))
+
+    watcher.subscribe("settings", reload(load_global_settings))
+    watcher.subscribe("admins", reload(load_admin_ids_global))
+    watcher.subscribe("prices", on_loop(invalidate_prices))
+    watcher.subscribe("auth_users", on_loop(invalidate_authorization))
+    watcher.start()
+
+# --- Data Migration ---
+
+legacy_migration_task = None
+
+def start_legacy_migration():
+    """
+    Embedded orders/topups migration ကို DB executor (adb.run) ဖြင့် စပါ (သို့) checkpoint မှ ပြန်စပါ။
+    Event loop ကို မပိတ်ဆို့ဘဲ bot က ပုံမှန်အတိုင်း ဆက်အလုပ်လုပ်ပါတယ်။
+    """
+    global legacy_migration_task
+    if legacy_migration_task and not legacy_migration_task.done():
+        return False
+    legacy_migration_task = asyncio.create_task(adb.run(migrations.migrate_embedded_records))
+    return True
+
+async def migrate_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = str(update.effective_user.id)
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ Owner သာ အသုံးပြုနိုင်ပါတယ်!")
+        return
+
+    # Embedded array migration သည် MongoDB backend အတွက်သာ ဖြစ်ပါတယ်
+    if not db.client:
+        await update.message.reply_text(
+            "ℹ️ ***Orders/Topups Migration***\n\n"
+            f"`{storage.STORAGE_BACKEND}` backend မှာ migration မလိုအပ်ပါ။",
+            parse_mode="Markdown"
+        )
+        return
+
+    status = await adb.run(migrations.get_migration_status) or {}
+    state = status.get("status", "not started")
+    if state != "done" and not migrations.is_migration_running():
+        start_legacy_migration()
+        state = "running"
+
+    await update.message.reply_text(
+        f"🔁 ***Orders/Topups Migration***\n\n"
+        f"📊 ***Status:*** `{state}`\n"
+        f"👥 ***Users:*** {status.get('users', 0):,}\n"
+        f"🛒 ***Orders:*** {status.get('orders', 0):,}\n"
+        f"💳 ***Topups:*** {status.get('topups', 0):,}\n"
+        f"⏰ ***Updated:*** {clock.format_date(status.get('updated_at'), '%Y-%m-%d %H:%M:%S')}",
         parse_mode="Markdown"
     )
 
+archive_task = None
+
+async def run_archive_schedule():
+    """ပြီးဆုံးပြီး record အဟောင်းများကို migrations.ARCHIVE_INTERVAL_SECONDS တိုင်း DB executor (adb.run) ဖြင့် archive လုပ်ပါ။"""
+    while True:
+        try:
+            await adb.run(migrations.archive_finished_records)
+        except Exception as e:
+            print(f"❌ Archive error: {e}")
+        await asyncio.sleep(migrations.ARCHIVE_INTERVAL_SECONDS)
+
+daily_stats_task = None
+
+async def run_daily_stats_schedule():
+    """
+    Business timezone ၏ ရက်ကူးပြီး DAILY_STATS_LAG_SECONDS ကြာတိုင်း ပြီးသွားတဲ့ ရက်ကို daily_stats ထဲ ထည့်ပါ။
+    ဒါကြောင့် report များက ယနေ့ကိုသာ orders/topups collection မှ ဖတ်ရပါတယ်။ (archive schedule နဲ့ မဆိုင်ပါ)
+    """
+    while True:
+        try:
+            if await adb.daily_stats_ready():
+                await adb.rebuild_daily_stats()
+        except Exception as e:
+            print(f"❌ Daily stats rebuild error: {e}")
+        next_day = clock.period_range(clock.day_key())[1]
+        delay = (next_day - clock.now()).total_seconds() + db.DAILY_STATS_LAG_SECONDS + 60
+        await asyncio.sleep(max(delay, 60))
+
+ledger_snapshot_task = None
+
+async def run_ledger_snapshots():
+    """Balance ledger snapshot ကို LEDGER_SNAPSHOT_INTERVAL_SECONDS တိုင်း ယူလို့ ledger balance သည် tail အနည်းငယ်ကိုသာ ပေါင်းရပါတယ်။"""
+    while True:
+        await asyncio.sleep(storage.LEDGER_SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            accounts = await adb.snapshot_balances()
+            if accounts:
+                print(f"📒 Balance snapshot: {accounts} accounts")
+        except Exception as e:
+            print(f"❌ Balance snapshot error: {e}")
+
 # --- Callback Handler ---
 
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = str(query.from_user.id)
+    uow = adb.unit_of_work(context)
     admin_name = query.from_user.first_name or "Admin"
     await query.answer() # Respond to callback quickly
 
@@ -2761,13 +2935,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         target_user_id = query.data.replace("register_approve_", "")
-        load_authorized_users()
-        if target_user_id in AUTHORIZED_USERS:
+        if not await adb.add_authorized_user(target_user_id):
             await query.answer("ℹ️ User ကို approve လုပ်ပြီးပါပြီ!", show_alert=True)
             return
-
-        db.add_authorized_user(target_user_id)
-        load_authorized_users()
+        invalidate_authorization(target_user_id)
 
         if target_user_id in user_states:
             del user_states[target_user_id]
@@ -2799,7 +2970,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         try:
             if await is_bot_admin_in_group(context.bot, ADMIN_GROUP_ID):
-                user_doc = db.get_user(target_user_id)
+                user_doc = await uow.get_profile(target_user_id)
                 user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
                 group_msg = (
                     f"✅ ***Registration လက်ခံပြီး!***\n\n"
@@ -2868,12 +3039,17 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         updates = {
             "status": "approved",
             "approved_by": admin_name,
-            "approved_at": datetime.now().isoformat()
+            "approved_at": clock.now()
         }
         
-        target_user_id = db.find_and_update_topup(topup_id, updates) # This also updates balance
+        approved = await uow.approve_topup(topup_id, updates) # This also updates balance
+
+        if approved:
+            target_user_id = approved["user_id"]
+            topup_amount = approved["amount"]
+            user_balance = approved["balance"]
+            user_name = approved["name"]
 
-        if target_user_id:
             if target_user_id in user_states:
                 del user_states[target_user_id]
 
@@ -2885,12 +3061,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.edit_message_caption(caption=updated_caption, parse_mode="Markdown")
             except:
                 pass # Failed to edit caption
-            
-            topup_data = db.get_topup_by_id(topup_id)
-            topup_amount = topup_data.get("amount", 0) if topup_data else 0
 
             try:
-                user_balance = db.get_balance(target_user_id)
                 keyboard = [[InlineKeyboardButton("💎 Order တင်မယ်", url=f"https://t.me/{context.bot.username}?start=order")]]
                 reply_markup = InlineKeyboardMarkup(keyboard)
                 await context.bot.send_message(
@@ -2907,10 +3079,6 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 pass
 
-            load_admin_ids_global()
-            user_doc = db.get_user(target_user_id)
-            user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
-            
             for admin_id in ADMIN_IDS:
                 if admin_id != int(user_id):
                     try:
@@ -2928,7 +3096,6 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             try:
                 if await is_bot_admin_in_group(context.bot, ADMIN_GROUP_ID):
-                    user_balance = db.get_balance(target_user_id)
                     group_msg = (
                         f"✅ ***Topup လက်ခံပြီး!***\n\n"
                         f"🔖 ***Topup ID:*** `{topup_id}`\n"
@@ -2956,10 +3123,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         updates = {
             "status": "rejected",
             "rejected_by": admin_name,
-            "rejected_at": datetime.now().isoformat()
+            "rejected_at": clock.now()
         }
         
-        target_user_id = db.find_and_update_topup(topup_id, updates) 
+        target_user_id = await uow.find_and_update_topup(topup_id, updates) 
 
         if target_user_id:
             if target_user_id in user_states:
@@ -2974,7 +3141,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 pass 
             
-            topup_data = db.get_topup_by_id(topup_id)
+            topup_data = await adb.get_topup_by_id(topup_id)
             topup_amount = topup_data.get("amount", 0) if topup_data else 0
 
             try:
@@ -2990,8 +3157,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 pass
 
-            load_admin_ids_global()
-            user_doc = db.get_user(target_user_id)
+            user_doc = await uow.get_profile(target_user_id)
             user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
             
             for admin_id in ADMIN_IDS:
@@ -3037,10 +3203,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         updates = {
             "status": "confirmed",
             "confirmed_by": admin_name,
-            "confirmed_at": datetime.now().isoformat()
+            "confirmed_at": clock.now()
         }
         
-        target_user_id = db.find_and_update_order(order_id, updates)
+        target_user_id = await uow.find_and_update_order(order_id, updates)
         
         if target_user_id:
             try:
@@ -3052,10 +3218,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 pass
             
-            order_details = db.get_order_by_id(order_id)
+            order_details = await adb.get_order_by_id(order_id)
             if not order_details: order_details = {} 
 
-            load_admin_ids_global()
             for admin_id in ADMIN_IDS:
                 if admin_id != int(user_id):
                     try:
@@ -3069,7 +3234,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     except:
                         pass
             
-            user_doc = db.get_user(target_user_id)
+            user_doc = await uow.get_profile(target_user_id)
             user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
             
             try:
@@ -3110,30 +3275,18 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         order_id = query.data.replace("order_cancel_", "")
-        order_details = db.get_order_by_id(order_id)
-        if not order_details:
-             await query.answer("❌ Order မတွေ့ရှိပါ!", show_alert=True)
-             return
-        
-        if order_details.get("status") in ["confirmed", "cancelled"]:
-            await query.answer("⚠️ Order ကို လုပ်ဆောင်ပြီးပါပြီ!", show_alert=True)
-            try:
-                await query.edit_message_reply_markup(reply_markup=None)
-            except:
-                pass
-            return
-            
-        refund_amount = order_details.get("price", 0)
         updates = {
             "status": "cancelled",
             "cancelled_by": admin_name,
-            "cancelled_at": datetime.now().isoformat()
+            "cancelled_at": clock.now()
         }
         
-        target_user_id = db.find_and_update_order(order_id, updates)
-        
-        if target_user_id:
-            db.update_balance(target_user_id, refund_amount) # Refund balance
+        cancelled = await uow.cancel_order(order_id, updates) # This also refunds balance
+
+        if cancelled:
+            target_user_id = cancelled["user_id"]
+            refund_amount = cancelled["refund"]
+            user_name = cancelled["name"]
 
             try:
                 await query.edit_message_text(
@@ -3144,7 +3297,6 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 pass
 
-            load_admin_ids_global()
             for admin_id in ADMIN_IDS:
                 if admin_id != int(user_id):
                     try:
@@ -3158,9 +3310,6 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         )
                     except:
                         pass
-            
-            user_doc = db.get_user(target_user_id)
-            user_name = user_doc.get("name", "Unknown") if user_doc else "Unknown"
 
             try:
                 if await is_bot_admin_in_group(context.bot, ADMIN_GROUP_ID):
@@ -3177,7 +3326,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 pass
 
             try:
-                chat_id = order_details.get("chat_id", int(target_user_id))
+                chat_id = cancelled.get("chat_id") or int(target_user_id)
                 await context.bot.send_message(
                     chat_id=chat_id,
                     text=f"❌ ***Order ငြင်းပယ်ခံရပါပြီ!***\n\n"
@@ -3193,7 +3342,16 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             await query.answer("❌ ***Order ငြင်းပယ်ပြီး ငွေပြန်အမ်းပါပြီ!**", show_alert=True)
         else:
-            await query.answer("❌ Order မတွေ့ရှိပါ!", show_alert=True)
+            # Cancel မရရင်သာ order ကို ဖတ်ပြီး အကြောင်းရင်း ခွဲပြပါ
+            order_details = await adb.get_order_by_id(order_id)
+            if order_details and order_details.get("status") in ["confirmed", "cancelled"]:
+                await query.answer("⚠️ Order ကို လုပ်ဆောင်ပြီးပါပြီ!", show_alert=True)
+                try:
+                    await query.edit_message_reply_markup(reply_markup=None)
+                except:
+                    pass
+            else:
+                await query.answer("❌ Order မတွေ့ရှိပါ!", show_alert=True)
         return
 
     # Report filter callbacks
@@ -3211,24 +3369,23 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             end_date = parts[2]
             period_text = f"ရက် ({start_date} မှ {end_date})"
 
-        all_users = db.get_all_users()
-        total_sales = total_orders = total_topups = topup_count = 0
-        for user_data in all_users:
-            for order in user_data.get("orders", []):
-                if order.get("status") == "confirmed" and start_date <= order.get("confirmed_at", "")[:10] <= end_date:
-                    total_sales += order["price"]
-                    total_orders += 1
-            for topup in user_data.get("topups", []):
-                if topup.get("status") == "approved" and start_date <= topup.get("approved_at", "")[:10] <= end_date:
-                    total_topups += topup["amount"]
-                    topup_count += 1
+        try:
+            start, end = clock.period_range(start_date, end_date)
+        except ValueError:
+            await query.answer("❌ Format မှားနေပါတယ်!", show_alert=True)
+            return
+
+        report = await adb.sales_report(start, end, "day")
+        total_sales, total_orders = report["order_total"], report["order_count"]
+        total_topups, topup_count = report["topup_total"], report["topup_count"]
 
         await query.edit_message_text(
             f"📊 ***Daily Report***\n📅 ***ကာလ:*** {period_text}\n\n"
             f"🛒 ***Order Confirmed***: {total_orders} ခု\n"
             f"💰 ***စုစုပေါင်း အရောင်း:*** `{total_sales:,} MMK`\n\n"
             f"💳 ***Topup Approved***: {topup_count} ခု\n"
-            f"💰 ***စုစုပေါင်း ငွေဖြည့်:*** `{total_topups:,} MMK`",
+            f"💰 ***စုစုပေါင်း ငွေဖြည့်:*** `{total_topups:,} MMK`"
+            f"{build_report_breakdown(report)}",
             parse_mode="Markdown"
         )
         return
@@ -3247,24 +3404,23 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             end_month = parts[2]
             period_text = f"လ ({start_month} မှ {end_month})"
 
-        all_users = db.get_all_users()
-        total_sales = total_orders = total_topups = topup_count = 0
-        for user_data in all_users:
-            for order in user_data.get("orders", []):
-                if order.get("status") == "confirmed" and start_month <= order.get("confirmed_at", "")[:7] <= end_month:
-                    total_sales += order["price"]
-                    total_orders += 1
-            for topup in user_data.get("topups", []):
-                if topup.get("status") == "approved" and start_month <= topup.get("approved_at", "")[:7] <= end_month:
-                    total_topups += topup["amount"]
-                    topup_count += 1
+        try:
+            start, end = clock.period_range(start_month, end_month)
+        except ValueError:
+            await query.answer("❌ Format မှားနေပါတယ်!", show_alert=True)
+            return
+
+        report = await adb.sales_report(start, end, "month")
+        total_sales, total_orders = report["order_total"], report["order_count"]
+        total_topups, topup_count = report["topup_total"], report["topup_count"]
 
         await query.edit_message_text(
             f"📊 ***Monthly Report***\n📅 ***ကာလ:*** {period_text}\n\n"
             f"🛒 ***Order Confirmed***: {total_orders} ခု\n"
             f"💰 ***စုစုပေါင်း အရောင်း:*** `{total_sales:,} MMK`\n\n"
             f"💳 ***Topup Approved***: {topup_count} ခု\n"
-            f"💰 ***စုစုပေါင်း ငွေဖြည့်:*** `{total_topups:,} MMK`",
+            f"💰 ***စုစုပေါင်း ငွေဖြည့်:*** `{total_topups:,} MMK`"
+            f"{build_report_breakdown(report)}",
             parse_mode="Markdown"
         )
         return
@@ -3283,24 +3439,23 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             end_year = parts[2]
             period_text = f"နှစ် ({start_year} မှ {end_year})"
 
-        all_users = db.get_all_users()
-        total_sales = total_orders = total_topups = topup_count = 0
-        for user_data in all_users:
-            for order in user_data.get("orders", []):
-                if order.get("status") == "confirmed" and start_year <= order.get("confirmed_at", "")[:4] <= end_year:
-                    total_sales += order["price"]
-                    total_orders += 1
-            for topup in user_data.get("topups", []):
-                if topup.get("status") == "approved" and start_year <= topup.get("approved_at", "")[:4] <= end_year:
-                    total_topups += topup["amount"]
-                    topup_count += 1
+        try:
+            start, end = clock.period_range(start_year, end_year)
+        except ValueError:
+            await query.answer("❌ Format မှားနေပါတယ်!", show_alert=True)
+            return
+
+        report = await adb.sales_report(start, end, "year")
+        total_sales, total_orders = report["order_total"], report["order_count"]
+        total_topups, topup_count = report["topup_total"], report["topup_count"]
 
         await query.edit_message_text(
             f"📊 ***Yearly Report***\n📅 ***ကာလ:*** {period_text}\n\n"
             f"🛒 ***Order Confirmed***: {total_orders} ခု\n"
             f"💰 ***စုစုပေါင်း အရောင်း:*** `{total_sales:,} MMK`\n\n"
             f"💳 ***Topup Approved***: {topup_count} ခု\n"
-            f"💰 ***စုစုပေါင်း ငွေဖြည့်:*** `{total_topups:,} MMK`",
+            f"💰 ***စုစုပေါင်း ငွေဖြည့်:*** `{total_topups:,} MMK`"
+            f"{build_report_breakdown(report)}",
             parse_mode="Markdown"
         )
         return
@@ -3361,6 +3516,33 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 reply_markup=reply_markup
             )
 
+    elif query.data.startswith("history_page_"):
+        # /history နဲ့ တူတဲ့ ခွင့်ပြုချက်နဲ့ လုပ်ငန်းစဉ် စစ်ဆေးမှုများ
+        if not await is_user_authorized(user_id):
+            await query.answer("🚫 အသုံးပြုခွင့် မရှိပါ! Owner ထံ bot အသုံးပြုခွင့် တောင်းဆိုပါ။", show_alert=True)
+            return
+        if user_states.get(user_id) == "waiting_approval":
+            await query.answer("⏳ Admin က လက်ခံပြီးကြောင်း အတည်ပြုတဲ့အထိ commands တွေ အသုံးပြုလို့ မရပါ။", show_alert=True)
+            return
+        if user_id in pending_topups:
+            await query.answer("⏳ လက်ရှိ topup လုပ်ငန်းစဉ်ကို မပြီးသေးပါ။", show_alert=True)
+            return
+        if await check_pending_topup(context, user_id):
+            await query.answer("⏳ Admin က approve မလုပ်သေးတဲ့ topup ရှိနေပါတယ်။", show_alert=True)
+            return
+
+        page = max(int(query.data.split("_")[-1]), 0)
+        history = await adb.get_history_page(user_id, page=page, page_size=HISTORY_PAGE_SIZE)
+        if not history or (not history["orders"] and not history["topups"]):
+            await query.answer("📋 ဒီစာမျက်နှာမှာ မှတ်တမ်း မရှိပါ။", show_alert=True)
+            return
+
+        msg, reply_markup = build_history_page(history, page)
+        try:
+            await query.edit_message_text(msg, parse_mode="Markdown", reply_markup=reply_markup)
+        except:
+            pass
+
     # Handle main owner approve/reject clone bot orders
     elif query.data.startswith("main_approve_"):
         if not is_owner(user_id):
@@ -3372,7 +3554,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         game_id = parts[3]
         server_id = parts[4]
         diamonds = parts[5]
-        price = get_price(diamonds)
+        price = await get_price(diamonds)
 
         await query.edit_message_reply_markup(reply_markup=None)
         try:
@@ -3431,8 +3613,63 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # --- Bot Initialization ---
 
 async def post_init(application: Application):
-    """Called after application initialization - start clone bots"""
-    clone_bots = load_clone_bots()
+    """Called after application initialization - load settings from DB and start clone bots"""
+    global archive_task, daily_stats_task, ledger_snapshot_task
+    # Load all settings from DB on startup
+    start_cache_watcher() # Load မလုပ်ခင် စလို့ load နေစဉ် ပြောင်းလဲမှုကိုလည်း မလွတ်စေပါ
+    await load_global_settings()
+    await load_admin_ids_global()
+
+    # Query တိုင်းအတွက် index များ ဆောက်ပြီး query plan များကို စစ်ပါ
+    await adb.ensure_indexes()
+    collscans = await adb.verify_query_plans()
+    if collscans:
+        print(f"🚨🚨 {len(collscans)} query shape(s) still COLLSCAN: {', '.join(collscans)}")
+    else:
+        print("✅ All query shapes use an index.")
+
+    # auth_list document အဟောင်းကို user တစ်ယောက် document တစ်ခုစီသို့ ပြောင်းရွှေ့ပါ
+    migrated = await adb.migrate_auth_list()
+    if migrated:
+        print(f"✅ Migrated {migrated} authorized users from auth_list.")
+
+    # User document အဟောင်းများတွင် pending topup counter ဖြည့်ပါ
+    backfilled = await adb.backfill_pending_topup_counts()
+    if backfilled:
+        print(f"✅ Pending topup counter backfilled for {backfilled} users.")
+
+    # ISO string timestamp အဟောင်းများကို BSON date အဖြစ် ပြောင်းပါ (ပြီးခဲ့ရင် marker ကြောင့် ချက်ချင်း ပြန်လာပါမည်)
+    converted = await adb.run(migrations.backfill_datetimes)
+    if converted:
+        print(f"✅ Converted timestamps to BSON dates in {converted} documents.")
+
+    # User document ထဲက orders/topups array များကို collection များသို့ background မှာ ရွှေ့ပါ
+    if await adb.legacy_records_pending():
+        start_legacy_migration() # ပြီးရင် daily_stats နဲ့ group_chats ကိုပါ ပြန်တွက်ပါမည်
+    else:
+        if not await adb.daily_stats_ready():
+            # Report များအတွက် ရက်အလိုက် စာရင်းကို history အားလုံးမှ တစ်ကြိမ် တွက်ထားပါ
+            await adb.rebuild_daily_stats()
+            print("✅ Daily sales stats rebuilt.")
+        if not await adb.group_chats_ready():
+            groups = await adb.backfill_group_chats()
+            print(f"✅ Group chat registry backfilled ({groups} groups).")
+
+    # ပြီးဆုံးပြီး order/topup အဟောင်းများကို archive collection များသို့ နေ့စဉ် ရွှေ့ပါ (Mongo backend သာ)
+    if db.client and not archive_task:
+        archive_task = asyncio.create_task(run_archive_schedule())
+    # ရက်ကူးတိုင်း ပြီးသွားတဲ့ ရက်ကို daily_stats ထဲ ထည့်ပါ (Mongo backend သာ)
+    if db.client and not daily_stats_task:
+        daily_stats_task = asyncio.create_task(run_daily_stats_schedule())
+
+    # Ledger မတိုင်ခင်က balance များကို opening entry အဖြစ် တစ်ကြိမ် ထည့်ပြီး snapshot ကို စပါ
+    opened = await adb.open_balance_ledger()
+    if opened:
+        print(f"✅ Balance ledger opened for {opened} accounts.")
+    if not ledger_snapshot_task:
+        ledger_snapshot_task = asyncio.create_task(run_ledger_snapshots())
+
+    clone_bots = await load_clone_bots()
     for bot_id, bot_data in clone_bots.items():
         bot_token = bot_data.get("token")
         admin_id = bot_data.get("owner_id")
@@ -3445,11 +3682,6 @@ def main():
         print("❌ BOT_TOKEN environment variable မရှိပါ!")
         return
 
-    # Load all settings from DB on startup
-    load_global_settings()
-    load_authorized_users()
-    load_admin_ids_global()
-    
     application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
 
     # User commands
@@ -3477,6 +3709,8 @@ def main():
     application.add_handler(CommandHandler("testgroup", testgroup_command))
     application.add_handler(CommandHandler("adminhelp", adminhelp_command))
     application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("groups", groups_command))
+    application.add_handler(CommandHandler("ledger", ledger_command))
 
     # Price & Payment Settings
     application.add_handler(CommandHandler("setprice", setprice_command))
@@ -3494,6 +3728,7 @@ def main():
     application.add_handler(CommandHandler("d", daily_report_command))
     application.add_handler(CommandHandler("m", monthly_report_command))
     application.add_handler(CommandHandler("y", yearly_report_command))
+    application.add_handler(CommandHandler("migrate", migrate_command))
 
     # Clone Bot Management commands
     application.add_handler(CommandHandler("addbot", addbot_command))
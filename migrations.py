@@ -0,0 +1,210 @@
+# migrations.py
+
+import os
+import threading
+import time
+
+import pymongo
+
+import clock
+import database as db
+
+# --- Embedded orders/topups -> orders/topups collections ---
+# Bot run နေစဉ်မှာပဲ user document များကို _id အစဉ်လိုက် batch ခွဲဖတ်ပြီး embedded record များကို
+# bulk write ဖြင့် ရွှေ့ပါ။ Batch တစ်ခုပြီးတိုင်း နောက်ဆုံး _id ကို checkpoint အဖြစ် သိမ်းလို့
+# Process ရပ်သွားလည်း ရပ်ခဲ့တဲ့နေရာကနေ ပြန်စနိုင်ပါတယ်။ မပြီးခင်မှာ database.py က array များမှ fallback ဖတ်ပါတယ်။
+
+MIGRATION_BATCH_SIZE = 500
+MIGRATION_PAUSE_SECONDS = 0.2 # Batch တစ်ခုပြီးတိုင်း primary ကို အနားပေးပါ
+
+_lock = threading.Lock()
+
+def get_migration_status():
+    """Embedded record migration ၏ checkpoint document ကို ပြန်ပေးပါ။ မစရသေးရင် None။"""
+    if not db.client: return None
+    return db.migrations_collection.find_one({"_id": db.LEGACY_MIGRATION_ID})
+
+def is_migration_running():
+    return _lock.locked()
+
+def migrate_embedded_records(batch_size=MIGRATION_BATCH_SIZE, pause=MIGRATION_PAUSE_SECONDS):
+    """
+    User document များထဲက orders/topups array များကို collection များသို့ checkpoint ဖြင့် ရွှေ့ပါ။
+    Blocking function ဖြစ်လို့ event loop ထဲမှာ မခေါ်ဘဲ DB executor (async_database.run) ဖြင့် run ပါ။
+    ပြီးဆုံးတဲ့ checkpoint document ကို ပြန်ပေးပြီး တခြား run တစ်ခု လုပ်နေရင် None ပြန်ပေးပါ။
+    """
+    if not db.client: return None
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        checkpoint = get_migration_status() or {}
+        if checkpoint.get("status") == "done":
+            db.mark_legacy_records_migrated()
+            return checkpoint
+
+        last_id = checkpoint.get("last_id")
+        db.migrations_collection.update_one(
+            {"_id": db.LEGACY_MIGRATION_ID},
+            {"$set": {"status": "running", "resumed_at": clock.now()},
+             "$setOnInsert": {"started_at": clock.now(), "users": 0, "orders": 0, "topups": 0}},
+            upsert=True
+        )
+        print(f"🔁 Embedded record migration {'ပြန်စ' if last_id else 'စတင်'}ပါပြီ။")
+
+        started = time.monotonic()
+        run_users = run_records = 0
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            batch = list(
+                db.users_collection.find(query, {"user_id": 1, "orders": 1, "topups": 1})
+                .sort("_id", 1)
+                .limit(batch_size)
+            )
+            if not batch: break
+
+            legacy_docs = [user_doc for user_doc in batch if "orders" in user_doc or "topups" in user_doc]
+            orders = topups = 0
+            if legacy_docs:
+                orders, topups = db.import_legacy_records(legacy_docs)
+
+            last_id = batch[-1]["_id"]
+            db.migrations_collection.update_one(
+                {"_id": db.LEGACY_MIGRATION_ID},
+                {"$set": {"last_id": last_id, "updated_at": clock.now()},
+                 "$inc": {"users": len(legacy_docs), "orders": orders, "topups": topups}}
+            )
+
+            run_users += len(batch)
+            run_records += orders + topups
+            elapsed = max(time.monotonic() - started, 0.001)
+            print(f"🔁 Migration: {run_users} users scanned, {run_records} records moved "
+                  f"({run_users / elapsed:.0f} users/s, {run_records / elapsed:.0f} records/s)")
+            time.sleep(pause)
+
+        elapsed = time.monotonic() - started
+        db.migrations_collection.update_one(
+            {"_id": db.LEGACY_MIGRATION_ID},
+            {"$set": {"status": "done", "finished_at": clock.now(),
+                      "last_run_seconds": round(elapsed, 1)}}
+        )
+        db.mark_legacy_records_migrated()
+        print(f"✅ Embedded record migration ပြီးဆုံးပါပြီ။ ({run_records} records, {elapsed:.1f}s)")
+        # Record အဟောင်းများ collection ထဲ ရောက်မှသာ ရက်အလိုက် စာရင်းနဲ့ group registry မှန်ပါမည်
+        db.rebuild_daily_stats(full=True)
+        db.backfill_group_chats()
+        return get_migration_status()
+    except Exception as e:
+        db.migrations_collection.update_one(
+            {"_id": db.LEGACY_MIGRATION_ID},
+            {"$set": {"status": "failed", "error": str(e), "updated_at": clock.now()}}
+        )
+        print(f"❌ Embedded record migration error: {e}")
+        raise
+    finally:
+        _lock.release()
+
+# --- ISO string timestamps -> BSON dates ---
+# String ဖြစ်နေသေးတဲ့ document များကိုသာ ရွေးဖတ်လို့ checkpoint မလိုဘဲ ထပ် run လည်း ရပ်ခဲ့တဲ့နေရာက ဆက်သွားပါတယ်။
+# Collection တစ်ခု ပြီးတိုင်း marker ထဲ မှတ်လို့ နောက် startup များမှာ ထပ်မ scan တော့ဘဲ
+# DATETIME_BACKFILL_FIELDS ထဲ အသစ်ထည့်တဲ့ collection ကိုသာ scan လုပ်ပါ။
+
+DATETIME_BACKFILL_ID = "datetime_backfill"
+
+DATETIME_BACKFILL_FIELDS = [
+    ("orders", clock.DATE_FIELDS),
+    ("topups", clock.DATE_FIELDS),
+    ("users", ("joined_at",)),
+    ("auth_users", ("authorized_at",)),
+    ("clone_bots", ("created_at",)),
+]
+
+def backfill_datetimes(batch_size=MIGRATION_BATCH_SIZE):
+    """
+    Collection များထဲက ISO string datetime field များကို BSON date အဖြစ် batch လိုက် ပြောင်းပါ။
+    ပြောင်းခဲ့တဲ့ document အရေအတွက်ကို ပြန်ပေးပါ။
+    """
+    if not db.client: return 0
+    marker = db.migrations_collection.find_one({"_id": DATETIME_BACKFILL_ID}, {"collections": 1}) or {}
+    done = set(marker.get("collections", []))
+    pending = [(name, fields) for name, fields in DATETIME_BACKFILL_FIELDS if name not in done]
+    if not pending: return 0
+    converted = 0
+    started = time.monotonic()
+    for name, fields in pending:
+        collection = db.db[name]
+        string_filter = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        last_id = None
+        collection_converted = 0
+        while True:
+            query = {**string_filter, "_id": {"$gt": last_id}} if last_id else string_filter
+            batch = list(collection.find(query, {field: 1 for field in fields + ("status",)}).sort("_id", 1).limit(batch_size))
+            if not batch: break
+            ops = []
+            for doc in batch:
+                fields_only = {field: value for field, value in doc.items() if field in fields}
+                if name in ("orders", "topups"):
+                    changes = db.normalize_record_dates({**fields_only, "status": doc.get("status")})
+                else:
+                    changes = {field: clock.parse(value) for field, value in fields_only.items()}
+                changes = {field: value for field, value in changes.items()
+                           if field in fields and value != doc.get(field)}
+                if changes:
+                    ops.append(pymongo.UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if ops:
+                collection.bulk_write(ops, ordered=False)
+            converted += len(ops)
+            collection_converted += len(ops)
+            last_id = batch[-1]["_id"]
+            print(f"🕒 Datetime backfill: {name} {collection_converted} documents "
+                  f"({converted / max(time.monotonic() - started, 0.001):.0f} docs/s)")
+        db.migrations_collection.update_one(
+            {"_id": DATETIME_BACKFILL_ID},
+            {"$addToSet": {"collections": name}, "$inc": {"converted": collection_converted},
+             "$set": {"finished_at": clock.now()}},
+            upsert=True
+        )
+    return converted
+
+# --- Finished orders/topups -> archive collections ---
+# main.py က ARCHIVE_INTERVAL_SECONDS တိုင်း run ပါတယ်။ Cutoff ကို run အစမှာ တစ်ကြိမ်သာ တွက်လို့
+# Run နေစဉ် settle ဖြစ်လာတဲ့ record များကို မထိဘဲ batch တစ်ခုချင်း ရွှေ့ပြီး primary ကို အနားပေးပါ။
+
+ARCHIVE_ID = "archive"
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get("ARCHIVE_INTERVAL_SECONDS", str(24 * 60 * 60)))
+
+_archive_lock = threading.Lock()
+
+def archive_finished_records(batch_size=MIGRATION_BATCH_SIZE, pause=MIGRATION_PAUSE_SECONDS):
+    """
+    ARCHIVE_AFTER_DAYS ရက်ကျော်တဲ့ confirmed/cancelled order နဲ့ approved/rejected topup များကို archive သို့ ရွှေ့ပါ။
+    Blocking function ဖြစ်လို့ DB executor (async_database.run) ဖြင့် run ပါ။ ရွှေ့ခဲ့တဲ့ {"orders": n, "topups": n} ကို ပြန်ပေးပြီး
+    Embedded record migration မပြီးသေးရင် (သို့) တခြား run တစ်ခု လုပ်နေရင် None ပြန်ပေးပါ။
+    """
+    if not db.client or db.legacy_records_pending(): return None
+    if not _archive_lock.acquire(blocking=False):
+        return None
+    try:
+        cutoff = db.archive_cutoff()
+        started = time.monotonic()
+        counts = {}
+        for collection in (db.orders_collection, db.topups_collection):
+            counts[collection.name] = 0
+            while True:
+                moved = db.archive_batch(collection, cutoff, batch_size)
+                if not moved: break
+                counts[collection.name] += moved
+                print(f"🗃️ Archive: {collection.name} {counts[collection.name]} records moved")
+                time.sleep(pause)
+
+        elapsed = time.monotonic() - started
+        db.migrations_collection.update_one(
+            {"_id": ARCHIVE_ID},
+            {"$set": {"archived_before": cutoff, "finished_at": clock.now(), "last_run_seconds": round(elapsed, 1)},
+             "$inc": counts},
+            upsert=True
+        )
+        if any(counts.values()):
+            print(f"✅ Archive ပြီးဆုံးပါပြီ။ ({counts['orders']} orders, {counts['topups']} topups, {elapsed:.1f}s)")
+        return counts
+    finally:
+        _archive_lock.release()
@@ -0,0 +1,205 @@
+# report.py
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import clock
+import database as db
+
+# --- Sales Report Engine ---
+# [start, end) ကာလအတွင်း confirmed order နဲ့ approved topup များကို Mongo aggregation pipeline ဖြင့်
+# ရက်/လ/နှစ် အလိုက်၊ diamond package အလိုက်၊ payment method အလိုက် DB ထဲမှာပဲ ပေါင်းပြီး
+# စုစုပေါင်း row အနည်းငယ်ကိုသာ Python သို့ ပြန်ယူပါ။ ရက်အစမှ စတဲ့ ကာလ ဖြစ်ပြီး daily_stats ရှိရင်
+# daily_stats ပြည့်စုံတဲ့ ရက်များ၏ စုစုပေါင်းနဲ့ breakdown များကို daily_stats row များမှ တွက်ပြီး
+# ကျန်တဲ့ ရက်များ (များသောအားဖြင့် ယနေ့) ကိုသာ collection မှ ဖတ်ပါ။
+# Archive cutoff မတိုင်မီ ကာလ ပါရင် orders_archive/topups_archive ကိုပါ $unionWith ဖြင့် ပေါင်းဖတ်ပါ။
+
+GRANULARITY_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+GRANULARITY_KEY_LENGTHS = {"day": 10, "month": 7, "year": 4}
+
+# source => (collection attribute, status, date field, amount field, breakdown field, breakdown name)
+REPORT_SOURCES = {
+    "order": ("orders_collection", "confirmed", "confirmed_at", "price", "amount", "packages"),
+    "topup": ("topups_collection", "approved", "approved_at", "amount", "payment_method", "payment_methods"),
+}
+
+def build_pipeline(source, start, end, granularity="day", with_periods=True, with_archive=False):
+    """
+    Source ("order"/"topup") တစ်ခုအတွက် aggregation pipeline ကို ဆောက်ပါ။
+    $match က status+date index ကို သုံးပြီး $facet ဖြင့် ကာလအလိုက်နဲ့ breakdown အလိုက် တစ်ခါတည်း group လုပ်ပါ။
+    with_archive ဆိုရင် archive collection ထဲက record များကိုပါ index တူဖြင့် ပေါင်းပါ။
+    """
+    _, status, date_field, amount_field, breakdown_field, breakdown_name = REPORT_SOURCES[source]
+    facets = {
+        breakdown_name: [
+            {"$group": {"_id": {"$ifNull": [f"${breakdown_field}", "Unknown"]},
+                        "total": {"$sum": f"${amount_field}"}, "count": {"$sum": 1}}},
+            {"$sort": {"total": -1}}
+        ]
+    }
+    if with_periods:
+        facets["periods"] = [
+            {"$group": {
+                "_id": {"$dateToString": {"format": GRANULARITY_FORMATS[granularity], "date": f"${date_field}",
+                                          "timezone": clock.BUSINESS_TZ.key}},
+                f"{source}_total": {"$sum": f"${amount_field}"},
+                f"{source}_count": {"$sum": 1}
+            }}
+        ]
+    match = {"status": status, date_field: {"$gte": start, "$lt": end}}
+    pipeline = [{"$match": match}]
+    if with_archive:
+        pipeline.append({"$unionWith": {"coll": f"{source}s_archive", "pipeline": [{"$match": match}]}})
+    return pipeline + [{"$facet": facets}]
+
+def _daily_stats_report(start, end, granularity):
+    """
+    daily_stats row များကို granularity အလိုက် (_id ၏ ရှေ့ပိုင်း string ဖြင့်) နဲ့ breakdown key အလိုက် ပေါင်းပါ။
+    """
+    facets = {"periods": [
+        {"$group": {"_id": {"$substrBytes": ["$_id", 0, GRANULARITY_KEY_LENGTHS[granularity]]},
+                    **{field: {"$sum": f"${field}"} for field in db.DAILY_STATS_FIELDS}}}
+    ]}
+    for name in db.DAILY_STATS_BREAKDOWNS:
+        facets[name] = [
+            {"$unwind": f"${name}"},
+            {"$group": {"_id": f"${name}.key", "total": {"$sum": f"${name}.total"}, "count": {"$sum": f"${name}.count"}}}
+        ]
+    return next(db.analytics(db.daily_stats_collection).aggregate([
+        {"$match": {"_id": {"$gte": clock.day_key(start), "$lt": clock.day_key(end)}}},
+        {"$facet": facets}
+    ]), {})
+
+def _compute_sales_report(start, end, granularity):
+    """
+    [start, end) ကာလ၏ sales report ကို DB မှ တွက်ပါ။ (sales_report ကို ကြည့်ပါ)
+    """
+    report = {field: 0 for field in db.DAILY_STATS_FIELDS}
+    report.update({"periods": [], "packages": [], "payment_methods": []})
+    if not db.client: return report
+
+    # [start, split) ကို daily_stats မှ၊ [split, end) ကို collection မှ တွက်ပါ
+    split = start
+    stats_before = db.daily_stats_before() if clock.is_day_start(start) else None
+    if stats_before:
+        split = max(start, min(end, stats_before))
+        if not clock.is_day_start(split): # end သည် ရက်အလယ်ဆိုရင် ထိုရက်ကို collection မှ ဖတ်ပါ
+            split = clock.period_range(clock.day_key(split))[0]
+    periods = {}
+    stats = _daily_stats_report(start, split, granularity) if split > start else {}
+    for row in stats.get("periods", []):
+        periods[row["_id"]] = row
+
+    for source, (collection_name, status, date_field, amount_field, breakdown_field, breakdown_name) in REPORT_SOURCES.items():
+        collection = getattr(db, collection_name)
+        breakdown = {row["_id"]: row for row in stats.get(breakdown_name, [])}
+        result = {}
+        if split < end:
+            pipeline = build_pipeline(source, split, end, granularity, with_archive=db.archive_covers(split))
+            result = next(db.analytics(collection).aggregate(pipeline), {})
+        for row in result.get(breakdown_name, []):
+            total = breakdown.setdefault(row["_id"], {"total": 0, "count": 0})
+            total["total"] += row["total"]
+            total["count"] += row["count"]
+        for row in result.get("periods", []):
+            period = periods.setdefault(row["_id"], {"_id": row["_id"]})
+            for field in (f"{source}_total", f"{source}_count"):
+                period[field] = period.get(field, 0) + row[field]
+
+        # Migration မပြီးသေးခင် user document array ထဲမှာ ကျန်နေသေးတဲ့ record များ
+        for record in db.legacy_records(collection.name, {"status": status}):
+            record_date = clock.parse(record.get(date_field, record.get("timestamp")))
+            if not isinstance(record_date, datetime) or not split <= record_date < end:
+                continue
+            amount = record.get(amount_field, 0)
+            row = breakdown.setdefault(record.get(breakdown_field) or "Unknown", {"total": 0, "count": 0})
+            row["total"] += amount
+            row["count"] += 1
+            key = clock.format_date(record_date, GRANULARITY_FORMATS[granularity])
+            row = periods.setdefault(key, {"_id": key})
+            row[f"{source}_total"] = row.get(f"{source}_total", 0) + amount
+            row[f"{source}_count"] = row.get(f"{source}_count", 0) + 1
+
+        report[breakdown_name] = sorted(
+            ({"key": key, "total": row["total"], "count": row["count"]} for key, row in breakdown.items()),
+            key=lambda row: row["total"], reverse=True
+        )
+
+    for key in sorted(periods):
+        row = {field: periods[key].get(field, 0) for field in db.DAILY_STATS_FIELDS}
+        report["periods"].append({"period": key, **row})
+        for field, value in row.items():
+            report[field] += value
+    return report
+
+# --- Report Cache ---
+# (start, end, granularity) အလိုက် report result ကို memory ထဲမှာ သိမ်းပါ။ ပြီးဆုံးသွားတဲ့ ကာလ (ယနေ့မတိုင်မီ)
+# များ မပြောင်းတော့လို့ အမြဲ သိမ်းထားပြီး ယနေ့ပါဝင်တဲ့ ကာလများကိုသာ order/topup status ပြောင်းတိုင်း ဖျက်ပါ။
+# Confirm/approve အချိန်သည် အမြဲ "ယခု" ဖြစ်လို့ ယနေ့မတိုင်မီ ကာလ၏ စုစုပေါင်းကို မပြောင်းနိုင်ပါ။
+# တခြား bot process က လုပ်တဲ့ status ပြောင်းမှုကို ဒီ process က မသိနိုင်လို့ ယနေ့ပါဝင်တဲ့ ကာလများကို
+# REPORT_OPEN_TTL_SECONDS ထက် ပိုမသိမ်းပါ။
+# Report များကို secondary မှ ဖတ်လို့ max staleness အတွင်း ပြီးခဲ့တဲ့ ကာလ (ယနေ့ အပါအဝင်) ၏ result ကို
+# max staleness ကြာမှသာ သိမ်းထားပါ။ (ဖတ်ချိန်မှာ secondary က status အသစ်ကို မမီသေးနိုင်လို့)
+# Custom ကာလများ အမျိုးမျိုးကြောင့် memory မကြီးလာစေရန် REPORT_CACHE_MAX_SIZE ခုထက် ကျော်ရင် အကြာဆုံး
+# မသုံးခဲ့တဲ့ entry ကို ဖယ်ပါ။ (LRU)
+
+REPORT_CACHE_MAX_SIZE = 256
+REPORT_OPEN_TTL_SECONDS = 60
+_cache = OrderedDict() # key => (report, expires_at) ; expires_at None = အမြဲ
+_cache_lock = threading.Lock()
+_cache_generation = 0 # Invalidate ဖြစ်တိုင်း တိုးလို့ တွက်နေဆဲ result အဟောင်းကို မသိမ်းမိစေရပါ
+
+def _today_start():
+    return clock.period_range(clock.day_key())[0]
+
+def invalidate_open_reports(kind=None, updates=None):
+    """ယနေ့ (သို့) နောက်ရက်များ ပါဝင်တဲ့ cached report များကို ဖျက်ပါ။"""
+    global _cache_generation
+    today_start = _today_start()
+    with _cache_lock:
+        _cache_generation += 1
+        for key in [key for key in _cache if key[1] > today_start]:
+            del _cache[key]
+
+def cached_sales_report(start, end, granularity="day"):
+    """Cache ထဲမှာ ရှိရင် report ကို ပြန်ပေးပါ။ မရှိရင် (သို့) သက်တမ်းကုန်ရင် None။ (DB မခေါ်ပါ)"""
+    key = (start, end, granularity)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None: return None
+        report, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+    return report
+
+def sales_report(start, end, granularity="day"):
+    """
+    [start, end) ကာလ၏ sales report ကို ပြန်ပေးပါ။ Cache ထဲမှာ ရှိရင် DB မခေါ်ဘဲ ပြန်ပေးပါ။
+    {order_total, order_count, topup_total, topup_count, periods, packages, payment_methods}
+    periods သည် ကာလအစဉ်လိုက် row များ၊ packages/payment_methods သည် ပမာဏ များရာမှ စီထားပါတယ်။
+    Cache ထဲက dict ကို ပြန်ပေးလို့ ခေါ်သူဘက်မှ မပြင်ရပါ။
+    """
+    cached = cached_sales_report(start, end, granularity)
+    if cached is not None: return cached
+    generation = _cache_generation
+    report = _compute_sales_report(start, end, granularity)
+    ttl = None
+    if end > _today_start():
+        ttl = REPORT_OPEN_TTL_SECONDS
+    if db.ANALYTICS_READS and end > clock.now() - timedelta(seconds=db.ANALYTICS_MAX_STALENESS_SECONDS):
+        ttl = min(ttl or db.ANALYTICS_MAX_STALENESS_SECONDS, db.ANALYTICS_MAX_STALENESS_SECONDS)
+    expires_at = time.monotonic() + ttl if ttl else None
+    if db.client:
+        with _cache_lock:
+            if generation == _cache_generation:
+                _cache[(start, end, granularity)] = (report, expires_at)
+                _cache.move_to_end((start, end, granularity))
+                while len(_cache) > REPORT_CACHE_MAX_SIZE:
+                    _cache.popitem(last=False)
+    return report
+
+db.add_status_listener(invalidate_open_reports)
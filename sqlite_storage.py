@@ -0,0 +1,673 @@
+# sqlite_storage.py
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import clock
+import storage
+from storage import PROFILE_FIELDS, USER_BATCH_SIZE, WATCHED_COLLECTIONS, clone_bot_account
+
+# --- SQLite Storage Backend ---
+# database.py (MongoDB) နဲ့ function နာမည်/argument/return တူတဲ့ SQLite backend ဖြစ်ပါတယ်။ (storage.py)
+# Order/topup document တစ်ခုလုံးကို data column ထဲမှာ JSON အဖြစ် သိမ်းပြီး query လုပ်ရတဲ့ field များကိုသာ
+# Column သီးသန့် + index ဖြင့် ထားပါ။ Datetime များကို UTC ISO string (millisecond) အဖြစ် သိမ်းလို့ string အစဉ်သည်
+# အချိန်အစဉ် ဖြစ်ပါတယ်။ File database ကို WAL mode ဖြင့် ဖွင့်လို့ bot process အများအပြားက ဖတ်/ရေး လုပ်နိုင်ပြီး
+# Write များကို BEGIN IMMEDIATE transaction ဖြင့် တစ်ခုချင်း လုပ်ပါ။ STORAGE_BACKEND=memory သည် ":memory:" database ကို သုံးပါတယ်။
+
+SQLITE_PATH = ":memory:" if storage.STORAGE_BACKEND == "memory" else os.environ.get("SQLITE_PATH", "mlbb_bot.db")
+SQLITE_BUSY_TIMEOUT_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    username TEXT,
+    balance INTEGER NOT NULL DEFAULT 0,
+    pending_topup_count INTEGER NOT NULL DEFAULT 0,
+    joined_at TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT,
+    timestamp TEXT,
+    settled_at TEXT,
+    chat_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_user_timestamp ON orders (user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS orders_status_settled ON orders (status, settled_at);
+CREATE TABLE IF NOT EXISTS topups (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT,
+    timestamp TEXT,
+    settled_at TEXT,
+    chat_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS topups_user_timestamp ON topups (user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS topups_status_settled ON topups (status, settled_at);
+CREATE TABLE IF NOT EXISTS group_chats (
+    chat_id INTEGER PRIMARY KEY,
+    first_seen TEXT,
+    last_seen TEXT,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    topup_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS group_chats_last_seen ON group_chats (last_seen DESC);
+CREATE TABLE IF NOT EXISTS auth_users (
+    user_id TEXT PRIMARY KEY,
+    authorized_at TEXT
+);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clone_bots (
+    bot_id TEXT PRIMARY KEY,
+    owner_id,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clone_bots_owner ON clone_bots (owner_id);
+CREATE TABLE IF NOT EXISTS balance_ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    reason TEXT,
+    ref_id TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS balance_ledger_account ON balance_ledger (account_id, id);
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    account_id TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL,
+    last_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# table => (id field, settled date field, settled status)
+RECORD_TABLES = {
+    "orders": ("order_id", "confirmed_at", "confirmed"),
+    "topups": ("topup_id", "approved_at", "approved"),
+}
+
+DATETIME_FIELDS = clock.DATE_FIELDS + ("joined_at", "authorized_at", "first_seen", "last_seen", "created_at")
+
+def connect(path):
+    """SQLite database ကို ဖွင့်ပြီး schema ကို ဆောက်ပါ။ File database ဆိုရင် WAL mode ဖြင့် ဖွင့်ပါ။"""
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+_lock = threading.RLock()
+_conn = connect(SQLITE_PATH)
+
+# --- Helpers ---
+
+def _db_time(value):
+    """Datetime ကို UTC ISO string (millisecond) အဖြစ် ပြောင်းပါ။ Datetime မဟုတ်ရင် မူလအတိုင်း ပြန်ပေးပါ။"""
+    value = clock.parse(value)
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+    return value
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _db_time(value)
+    raise TypeError(f"{type(value).__name__} ကို JSON အဖြစ် မပြောင်းနိုင်ပါ")
+
+def _dumps(doc):
+    return json.dumps(doc, default=_json_default, ensure_ascii=False)
+
+def _decode(doc):
+    """Datetime field များကို business timezone ပါတဲ့ datetime အဖြစ် ပြန်ပြောင်းပါ။ (Mongo client နဲ့ တူအောင်)"""
+    for field in DATETIME_FIELDS:
+        if isinstance(doc.get(field), str):
+            value = clock.parse(doc[field])
+            if isinstance(value, datetime):
+                doc[field] = value.astimezone(clock.BUSINESS_TZ)
+    return doc
+
+def _query(sql, params=()):
+    with _lock:
+        return _conn.execute(sql, params).fetchall()
+
+def _query_one(sql, params=()):
+    with _lock:
+        return _conn.execute(sql, params).fetchone()
+
+@contextmanager
+def _transaction():
+    """BEGIN IMMEDIATE ဖြင့် write lock ကို အစကတည်းက ယူပြီး exception ဖြစ်ရင် rollback လုပ်ပါ။"""
+    with _lock:
+        _conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield _conn
+        except BaseException:
+            _conn.execute("ROLLBACK")
+            raise
+        _conn.execute("COMMIT")
+
+def _record(row):
+    return _decode(json.loads(row["data"])) if row else None
+
+def _kv_get(conn, key, default=None):
+    row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+    return json.loads(row["value"]) if row else default
+
+def _kv_set(conn, key, value):
+    conn.execute("INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                 (key, _dumps(value)))
+
+def _bump_cache_version(conn, name):
+    conn.execute("INSERT INTO cache_versions (name, version) VALUES (?, 1) "
+                 "ON CONFLICT (name) DO UPDATE SET version = version + 1", (name,))
+
+# --- Schema / Startup ---
+
+QUERY_SHAPES = [
+    ("order by id", "SELECT data FROM orders WHERE id = ? AND status = 'pending'", ("ORD",)),
+    ("orders by user", "SELECT data FROM orders WHERE user_id = ? ORDER BY timestamp DESC LIMIT 5", ("0",)),
+    ("confirmed orders in range", "SELECT data FROM orders WHERE status = ? AND settled_at >= ? AND settled_at < ?",
+     ("confirmed", "2024", "2025")),
+    ("topup by id", "SELECT data FROM topups WHERE id = ? AND status = 'pending'", ("TOP",)),
+    ("topups by user", "SELECT data FROM topups WHERE user_id = ? ORDER BY timestamp DESC LIMIT 5", ("0",)),
+    ("approved topups in range", "SELECT data FROM topups WHERE status = ? AND settled_at >= ? AND settled_at < ?",
+     ("approved", "2024", "2025")),
+    ("group chats by last seen", "SELECT chat_id FROM group_chats ORDER BY last_seen DESC LIMIT 50", ()),
+    ("clone bot by owner", "SELECT data FROM clone_bots WHERE owner_id = ?", (0,)),
+    ("ledger tail by account", "SELECT SUM(delta) FROM balance_ledger WHERE account_id = ? AND id > ?", ("0", 0)),
+]
+
+def ensure_indexes():
+    """Table နဲ့ index များကို ဆောက်ပါ။ ရှိပြီးသားဆိုရင် ဘာမှ မလုပ်ပါ။"""
+    with _lock:
+        _conn.executescript(SCHEMA)
+
+def verify_query_plans():
+    """QUERY_SHAPES ကို EXPLAIN QUERY PLAN ဖြင့် စစ်ပြီး table တစ်ခုလုံး scan လုပ်တဲ့ shape များကို ပြန်ပေးပါ။"""
+    scans = []
+    for name, sql, params in QUERY_SHAPES:
+        details = [row["detail"] for row in _query(f"EXPLAIN QUERY PLAN {sql}", params)]
+        if any(detail.startswith("SCAN") and "USING" not in detail for detail in details):
+            scans.append(name)
+            print(f"🚨 Full table scan: '{name}' query က index မသုံးပါ! ({'; '.join(details)})")
+    return scans
+
+def legacy_records_pending():
+    return False # Embedded array များသည် Mongo data အဟောင်းတွင်သာ ရှိပါတယ်
+
+def daily_stats_ready():
+    return True # Report များကို status+settled_at index ပေါ်မှာ တိုက်ရိုက် တွက်ပါတယ်
+
+def rebuild_daily_stats(full=False):
+    return None
+
+def group_chats_ready():
+    return True # Order/topup ထည့်တဲ့ transaction ထဲမှာပဲ registry ကို update လုပ်ပါတယ်
+
+def backfill_group_chats():
+    return count_group_chats()
+
+# --- User Functions ---
+
+USER_COLUMNS = ("user_id", "name", "username", "balance", "pending_topup_count", "joined_at")
+
+def get_user(user_id):
+    row = _query_one("SELECT * FROM users WHERE user_id = ?", (str(user_id),))
+    return _decode(dict(row)) if row else None
+
+def get_user_profile(user_id):
+    row = _query_one(f"SELECT {', '.join(PROFILE_FIELDS)} FROM users WHERE user_id = ?", (str(user_id),))
+    return dict(row) if row else None
+
+def get_user_summary(user_id):
+    user = get_user_profile(user_id)
+    if not user: return None
+    user["order_count"] = _query_one("SELECT COUNT(*) AS n FROM orders WHERE user_id = ?", (str(user_id),))["n"]
+    topup_stats = _query_one(
+        "SELECT COUNT(*) AS n, COALESCE(SUM(CASE WHEN status = 'pending' THEN json_extract(data, '$.amount') END), 0) AS pending "
+        "FROM topups WHERE user_id = ?", (str(user_id),)
+    )
+    user["topup_count"] = topup_stats["n"]
+    user["pending_topup_amount"] = topup_stats["pending"]
+    return user
+
+def iter_users(projection=None, batch_size=USER_BATCH_SIZE):
+    """User များကို user_id အစဉ်လိုက် batch_size ခုစီ keyset pagination ဖြင့် yield လုပ်ပါ။"""
+    columns = [field for field, include in (projection or {"user_id": 1}).items() if include and field in USER_COLUMNS]
+    columns = columns or ["user_id"]
+    last_id = ""
+    while True:
+        rows = _query(f"SELECT user_id AS _key, {', '.join(columns)} FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                      (last_id, batch_size))
+        if not rows: return
+        for row in rows:
+            yield _decode({column: row[column] for column in columns})
+        last_id = rows[-1]["_key"]
+
+def iter_user_batches(projection=None, batch_size=USER_BATCH_SIZE):
+    batch = []
+    for user_doc in iter_users(projection, batch_size):
+        batch.append(user_doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def create_user(user_id, name, username):
+    with _transaction() as conn:
+        conn.execute("INSERT OR IGNORE INTO users (user_id, name, username, balance, pending_topup_count, joined_at) "
+                     "VALUES (?, ?, ?, 0, 0, ?)", (str(user_id), name, username, _db_time(clock.now())))
+
+def get_balance(user_id):
+    row = _query_one("SELECT balance FROM users WHERE user_id = ?", (str(user_id),))
+    return row["balance"] if row else 0
+
+def has_pending_topup(user_id):
+    row = _query_one("SELECT pending_topup_count FROM users WHERE user_id = ?", (str(user_id),))
+    return bool(row and row["pending_topup_count"] > 0)
+
+def backfill_pending_topup_counts():
+    return 0 # Counter ကို topup ထည့်/settle လုပ်တိုင်း transaction ထဲမှာ ထိန်းပါတယ်
+
+def update_balance(user_id, amount_change, reason="adjustment", ref_id=None):
+    with _transaction() as conn:
+        conn.execute("INSERT INTO users (user_id, balance) VALUES (?, ?) "
+                     "ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance",
+                     (str(user_id), amount_change))
+        _record_ledger(conn, user_id, amount_change, reason, ref_id)
+
+def _adjust_user(conn, user_id, balance_change=0, pending_change=0):
+    conn.execute("UPDATE users SET balance = balance + ?, pending_topup_count = MAX(0, pending_topup_count + ?) "
+                 "WHERE user_id = ?", (balance_change, pending_change, str(user_id)))
+    row = conn.execute("SELECT user_id, name, balance FROM users WHERE user_id = ?", (str(user_id),)).fetchone()
+    return dict(row) if row else None
+
+# --- Balance Ledger ---
+# database.py နဲ့ အဓိပ္ပာယ်တူ ဖြစ်ပြီး SQLite မှာ write များ တစ်ခုချင်း commit ဖြစ်လို့ snapshot ကို
+# Entry id (AUTOINCREMENT) ဖြင့် ခွဲပါ။ Snapshot ၏ last_id နောက်ပိုင်း entry များသည် tail ဖြစ်ပါတယ်။
+
+def _record_ledger(conn, account_id, delta, reason, ref_id=None):
+    if not delta: return
+    conn.execute("INSERT INTO balance_ledger (account_id, delta, reason, ref_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                 (str(account_id), delta, reason, ref_id, _db_time(clock.now())))
+
+def ledger_balance(account_id):
+    with _lock:
+        snapshot = _conn.execute("SELECT balance, last_id FROM balance_snapshots WHERE account_id = ?",
+                                 (str(account_id),)).fetchone()
+        balance, last_id = (snapshot["balance"], snapshot["last_id"]) if snapshot else (0, 0)
+        tail = _conn.execute("SELECT COALESCE(SUM(delta), 0) AS delta FROM balance_ledger WHERE account_id = ? AND id > ?",
+                             (str(account_id), last_id)).fetchone()
+    return balance + tail["delta"]
+
+def get_ledger_entries(account_id, limit=10):
+    rows = _query("SELECT account_id, delta, reason, ref_id, created_at FROM balance_ledger "
+                  "WHERE account_id = ? ORDER BY id DESC LIMIT ?", (str(account_id), limit))
+    return [_decode(dict(row)) for row in rows]
+
+def snapshot_balances():
+    """ယခင် snapshot နောက်ပိုင်း entry များကို account အလိုက် ပေါင်းပြီး snapshot ထဲ ထည့်ပါ။ (Transaction တစ်ခုတည်း)"""
+    with _transaction() as conn:
+        since = _kv_get(conn, "ledger_snapshot_id", 0)
+        upto = conn.execute("SELECT COALESCE(MAX(id), 0) FROM balance_ledger").fetchone()[0]
+        rows = conn.execute("SELECT account_id, SUM(delta) FROM balance_ledger WHERE id > ? AND id <= ? GROUP BY account_id",
+                            (since, upto)).fetchall()
+        conn.executemany(
+            "INSERT INTO balance_snapshots (account_id, balance, last_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (account_id) DO UPDATE SET balance = balance + excluded.balance, last_id = excluded.last_id",
+            [(account_id, delta, upto) for account_id, delta in rows]
+        )
+        _kv_set(conn, "ledger_snapshot_id", upto)
+    return len(rows)
+
+def open_balance_ledger():
+    """Ledger မတိုင်ခင်က user/clone bot balance များအတွက် opening entry ကို တစ်ကြိမ်သာ ထည့်ပါ။"""
+    with _transaction() as conn:
+        if _kv_get(conn, "balance_ledger_opened"): return 0
+        rows = conn.execute(
+            "SELECT account_id, balance - COALESCE((SELECT SUM(delta) FROM balance_ledger l "
+            "WHERE l.account_id = a.account_id), 0) FROM ("
+            "SELECT user_id AS account_id, balance FROM users UNION ALL "
+            "SELECT ? || bot_id, COALESCE(json_extract(data, '$.balance'), 0) FROM clone_bots) a",
+            (clone_bot_account(""),)
+        ).fetchall()
+        opened = [(account_id, delta) for account_id, delta in rows if delta]
+        for account_id, delta in opened:
+            _record_ledger(conn, account_id, delta, "opening")
+        _kv_set(conn, "balance_ledger_opened", True)
+    return len(opened)
+
+# --- Order & Topup Functions ---
+
+def _insert_record(conn, table, user_id, record):
+    id_field, date_field, _ = RECORD_TABLES[table]
+    doc = {**record, "user_id": str(user_id)}
+    conn.execute(
+        f"INSERT INTO {table} (id, user_id, status, timestamp, settled_at, chat_id, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (doc[id_field], doc["user_id"], doc.get("status"), _db_time(doc.get("timestamp")),
+         _db_time(doc.get(date_field)), doc.get("chat_id"), _dumps(doc))
+    )
+    _touch_group_chat(conn, doc, table[:-1])
+
+def _claim_record(conn, table, record_id, updates):
+    """Pending record ကို updates ဖြင့် ပြောင်းပြီး ပြောင်းပြီးသား document ကို ပြန်ပေးပါ။ Pending မဟုတ်ရင် None။"""
+    _, date_field, _ = RECORD_TABLES[table]
+    row = conn.execute(f"SELECT data FROM {table} WHERE id = ? AND status = 'pending'", (record_id,)).fetchone()
+    if not row: return None
+    doc = {**json.loads(row["data"]), **updates}
+    conn.execute(f"UPDATE {table} SET status = ?, settled_at = ?, data = ? WHERE id = ?",
+                 (doc.get("status"), _db_time(doc.get(date_field)), _dumps(doc), record_id))
+    return _decode(json.loads(_dumps(doc)))
+
+def _touch_group_chat(conn, record, kind):
+    chat_id = record.get("chat_id")
+    if not isinstance(chat_id, int) or chat_id >= 0: return
+    seen_at = _db_time(record.get("timestamp") or clock.now())
+    conn.execute(
+        f"INSERT INTO group_chats (chat_id, first_seen, last_seen, {kind}_count) VALUES (?, ?, ?, 1) "
+        f"ON CONFLICT (chat_id) DO UPDATE SET first_seen = MIN(first_seen, excluded.first_seen), "
+        f"last_seen = MAX(last_seen, excluded.last_seen), {kind}_count = {kind}_count + 1",
+        (chat_id, seen_at, seen_at)
+    )
+
+def add_order(user_id, order_data):
+    with _transaction() as conn:
+        _insert_record(conn, "orders", user_id, order_data)
+
+def place_order(user_id, order_data):
+    """Balance လုံလောက်မှသာ price ကို နှုတ်ပြီး order ကို ထည့်ပါ။ Balance အသစ် (သို့) None ကို ပြန်ပေးပါ။"""
+    price = order_data["price"]
+    with _transaction() as conn:
+        updated = conn.execute("UPDATE users SET balance = balance - ? WHERE user_id = ? AND balance >= ?",
+                               (price, str(user_id), price)).rowcount
+        if not updated: return None
+        _insert_record(conn, "orders", user_id, order_data)
+        _record_ledger(conn, user_id, -price, "order", order_data.get("order_id"))
+        return conn.execute("SELECT balance FROM users WHERE user_id = ?", (str(user_id),)).fetchone()["balance"]
+
+def add_topup(user_id, topup_data):
+    with _transaction() as conn:
+        _insert_record(conn, "topups", user_id, topup_data)
+        if topup_data.get("status") == "pending":
+            conn.execute("UPDATE users SET pending_topup_count = pending_topup_count + 1 WHERE user_id = ?",
+                         (str(user_id),))
+
+def find_and_update_order(order_id, updates):
+    with _transaction() as conn:
+        order = _claim_record(conn, "orders", order_id, updates)
+    return order["user_id"] if order else None
+
+def find_and_update_topup(topup_id, updates):
+    if updates.get("status") == "approved":
+        approved = approve_topup(topup_id, updates)
+        return approved["user_id"] if approved else None
+    with _transaction() as conn:
+        topup = _claim_record(conn, "topups", topup_id, updates)
+        if not topup: return None
+        if updates.get("status", "pending") != "pending":
+            _adjust_user(conn, topup["user_id"], pending_change=-1)
+    return topup["user_id"]
+
+def approve_topup(topup_id, updates):
+    with _transaction() as conn:
+        topup = _claim_record(conn, "topups", topup_id, updates)
+        if not topup: return None
+        user = _adjust_user(conn, topup["user_id"], topup.get("amount", 0), pending_change=-1)
+        if user: # User မရှိရင် balance မပြောင်းလို့ ledger မှာ မမှတ်ပါ
+            _record_ledger(conn, topup["user_id"], topup.get("amount", 0), "topup", topup_id)
+        user = user or {}
+    return {
+        "user_id": topup["user_id"],
+        "name": user.get("name") or "Unknown",
+        "amount": topup.get("amount", 0),
+        "balance": user.get("balance", 0),
+        "chat_id": topup.get("chat_id")
+    }
+
+def cancel_order(order_id, updates):
+    with _transaction() as conn:
+        order = _claim_record(conn, "orders", order_id, updates)
+        if not order: return None
+        user = _adjust_user(conn, order["user_id"], order.get("price", 0))
+        if user: # User မရှိရင် balance မပြောင်းလို့ ledger မှာ မမှတ်ပါ
+            _record_ledger(conn, order["user_id"], order.get("price", 0), "refund", order_id)
+        user = user or {}
+    return {
+        "user_id": order["user_id"],
+        "name": user.get("name") or "Unknown",
+        "refund": order.get("price", 0),
+        "balance": user.get("balance", 0),
+        "chat_id": order.get("chat_id")
+    }
+
+def _latest(table, where, params, limit, skip=0):
+    rows = _query(f"SELECT data FROM {table} WHERE {where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                  (*params, limit, skip))
+    return [_record(row) for row in rows]
+
+def get_recent_history(user_id, limit=5):
+    return {
+        "orders": get_user_orders(user_id, limit),
+        "topups": get_user_topups(user_id, limit)
+    }
+
+def get_user_orders(user_id, limit=5):
+    return _latest("orders", "user_id = ?", (str(user_id),), limit)
+
+def get_user_topups(user_id, limit=5):
+    return _latest("topups", "user_id = ?", (str(user_id),), limit)
+
+def get_history_page(user_id, page=0, page_size=5):
+    skip = page * page_size
+    orders = _latest("orders", "user_id = ?", (str(user_id),), page_size + 1, skip)
+    topups = _latest("topups", "user_id = ?", (str(user_id),), page_size + 1, skip)
+    return {
+        "orders": orders[:page_size],
+        "topups": topups[:page_size],
+        "has_next": len(orders) > page_size or len(topups) > page_size
+    }
+
+def get_latest_pending_topup(user_id, amount):
+    topups = _latest("topups", "user_id = ? AND status = 'pending' AND json_extract(data, '$.amount') = ?",
+                     (str(user_id), amount), 1)
+    return topups[0] if topups else None
+
+def get_order_by_id(order_id):
+    return _record(_query_one("SELECT data FROM orders WHERE id = ?", (order_id,)))
+
+def get_topup_by_id(topup_id):
+    return _record(_query_one("SELECT data FROM topups WHERE id = ?", (topup_id,)))
+
+def get_group_chat_ids():
+    return {row["chat_id"] for row in _query("SELECT chat_id FROM group_chats")}
+
+def list_group_chats(limit=50):
+    rows = _query("SELECT * FROM group_chats ORDER BY last_seen DESC LIMIT ?", (limit,))
+    return [_decode({"_id": row["chat_id"], **{key: row[key] for key in row.keys() if key != "chat_id"}}) for row in rows]
+
+def count_group_chats():
+    return _query_one("SELECT COUNT(*) AS n FROM group_chats")["n"]
+
+# --- Reports ---
+
+GRANULARITY_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+
+# (table, prefix, amount field, breakdown field, breakdown name)
+REPORT_SOURCES = (
+    ("orders", "order", "price", "amount", "packages"),
+    ("topups", "topup", "amount", "payment_method", "payment_methods"),
+)
+
+def sales_report(start, end, granularity="day"):
+    """report.sales_report နဲ့ ပုံစံတူ report ကို status+settled_at index ပေါ်မှာ ဖတ်ပြီး တွက်ပါ။"""
+    report = {"order_total": 0, "order_count": 0, "topup_total": 0, "topup_count": 0,
+              "periods": [], "packages": [], "payment_methods": []}
+    periods = {}
+    for table, prefix, amount_field, breakdown_field, breakdown_name in REPORT_SOURCES:
+        status = RECORD_TABLES[table][2]
+        rows = _query(f"SELECT settled_at, data FROM {table} WHERE status = ? AND settled_at >= ? AND settled_at < ?",
+                      (status, _db_time(start), _db_time(end)))
+        breakdown = {}
+        for row in rows:
+            doc = json.loads(row["data"])
+            amount = doc.get(amount_field, 0)
+            key = clock.format_date(row["settled_at"], GRANULARITY_FORMATS[granularity])
+            period = periods.setdefault(key, {"order_total": 0, "order_count": 0, "topup_total": 0, "topup_count": 0})
+            period[f"{prefix}_total"] += amount
+            period[f"{prefix}_count"] += 1
+            item = breakdown.setdefault(doc.get(breakdown_field) or "Unknown", {"total": 0, "count": 0})
+            item["total"] += amount
+            item["count"] += 1
+        report[breakdown_name] = sorted(
+            ({"key": key, **item} for key, item in breakdown.items()), key=lambda item: item["total"], reverse=True
+        )
+    for key in sorted(periods):
+        report["periods"].append({"period": key, **periods[key]})
+        for field, value in periods[key].items():
+            report[field] += value
+    return report
+
+# --- Price Functions ---
+
+def load_prices():
+    with _lock:
+        return _kv_get(_conn, "custom_prices", {})
+
+def save_prices(prices_dict):
+    with _transaction() as conn:
+        _kv_set(conn, "custom_prices", prices_dict)
+        _bump_cache_version(conn, "prices")
+
+# --- Authorization Functions ---
+
+def is_user_authorized(user_id):
+    return _query_one("SELECT 1 FROM auth_users WHERE user_id = ?", (str(user_id),)) is not None
+
+def count_authorized_users():
+    return _query_one("SELECT COUNT(*) AS n FROM auth_users")["n"]
+
+def add_authorized_user(user_id):
+    with _transaction() as conn:
+        added = conn.execute("INSERT OR IGNORE INTO auth_users (user_id, authorized_at) VALUES (?, ?)",
+                             (str(user_id), _db_time(clock.now()))).rowcount > 0
+        if added:
+            _bump_cache_version(conn, "auth_users")
+    return added
+
+def remove_authorized_user(user_id):
+    with _transaction() as conn:
+        removed = conn.execute("DELETE FROM auth_users WHERE user_id = ?", (str(user_id),)).rowcount > 0
+        if removed:
+            _bump_cache_version(conn, "auth_users")
+    return removed
+
+def migrate_auth_list(batch_size=1000):
+    return 0 # auth_list document အဟောင်းသည် Mongo data တွင်သာ ရှိပါတယ်
+
+# --- Admin Functions ---
+
+def load_admin_ids(default_owner_id):
+    with _transaction() as conn:
+        admin_list = _kv_get(conn, "admin_list")
+        if admin_list is None:
+            _kv_set(conn, "admin_list", [default_owner_id])
+            return [default_owner_id]
+    if default_owner_id not in admin_list:
+        admin_list.append(default_owner_id)
+    return admin_list
+
+def _update_admins(change):
+    with _transaction() as conn:
+        admin_list = change(_kv_get(conn, "admin_list", []))
+        _kv_set(conn, "admin_list", admin_list)
+        _bump_cache_version(conn, "admins")
+
+def add_admin(admin_id):
+    _update_admins(lambda admins: admins if int(admin_id) in admins else admins + [int(admin_id)])
+
+def remove_admin(admin_id):
+    _update_admins(lambda admins: [admin for admin in admins if admin != int(admin_id)])
+
+# --- Settings Functions ---
+
+def load_settings(default_payment, default_maintenance):
+    """Global settings ကို load လုပ်ပြီး မရှိသေးတဲ့ key များကို default ဖြင့် ဖြည့်ပါ။"""
+    with _transaction() as conn:
+        config = _kv_get(conn, "global_config", {"_id": "global_config"})
+        changed = "payment_info" not in config or "maintenance" not in config
+        for section, defaults in (("payment_info", default_payment), ("maintenance", default_maintenance)):
+            values = config.setdefault(section, {})
+            for key, value in defaults.items():
+                if key not in values:
+                    values[key] = value
+                    changed = True
+        if changed:
+            _kv_set(conn, "global_config", config)
+            _bump_cache_version(conn, "settings")
+    return config
+
+def update_setting(key, value):
+    """Setting တစ်ခုကို dot notation ဖြင့် update လုပ်ပါ။ ဥပမာ: "payment_info.kpay_number" """
+    try:
+        with _transaction() as conn:
+            config = _kv_get(conn, "global_config", {"_id": "global_config"})
+            *parents, leaf = key.split(".")
+            target = config
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+            _kv_set(conn, "global_config", config)
+            _bump_cache_version(conn, "settings")
+    except Exception as e:
+        print(f"Failed to update setting '{key}': {e}")
+
+def get_cache_versions():
+    rows = _query(f"SELECT name, version FROM cache_versions WHERE name IN ({', '.join('?' for _ in WATCHED_COLLECTIONS)})",
+                  WATCHED_COLLECTIONS)
+    return {row["name"]: row["version"] for row in rows}
+
+# --- Clone Bot Functions ---
+
+def load_clone_bots():
+    return {row["bot_id"]: _decode(json.loads(row["data"])) for row in _query("SELECT bot_id, data FROM clone_bots")}
+
+def save_clone_bot(bot_id, bot_data):
+    with _transaction() as conn:
+        row = conn.execute("SELECT data FROM clone_bots WHERE bot_id = ?", (str(bot_id),)).fetchone()
+        doc = {**(json.loads(row["data"]) if row else {}), **bot_data, "_id": bot_id}
+        conn.execute("INSERT INTO clone_bots (bot_id, owner_id, data) VALUES (?, ?, ?) "
+                     "ON CONFLICT (bot_id) DO UPDATE SET owner_id = excluded.owner_id, data = excluded.data",
+                     (str(bot_id), doc.get("owner_id"), _dumps(doc)))
+
+def remove_clone_bot(bot_id):
+    with _transaction() as conn:
+        return conn.execute("DELETE FROM clone_bots WHERE bot_id = ?", (str(bot_id),)).rowcount > 0
+
+def get_clone_bot_by_admin(admin_id):
+    row = _query_one("SELECT data FROM clone_bots WHERE owner_id = ?", (admin_id,))
+    return _decode(json.loads(row["data"])) if row else None
+
+def update_clone_bot_balance(bot_id, amount_change, reason="adjustment"):
+    with _transaction() as conn:
+        row = conn.execute("SELECT data FROM clone_bots WHERE bot_id = ?", (str(bot_id),)).fetchone()
+        if not row: return
+        doc = json.loads(row["data"])
+        doc["balance"] = doc.get("balance", 0) + amount_change
+        conn.execute("UPDATE clone_bots SET data = ? WHERE bot_id = ?", (_dumps(doc), str(bot_id)))
+        _record_ledger(conn, clone_bot_account(bot_id), amount_change, reason)
@@ -0,0 +1,86 @@
+# storage.py
+
+import importlib
+import os
+
+# --- Storage Backend Selection ---
+# STORAGE_BACKEND environment variable ဖြင့် data သိမ်းမည့် backend ကို ရွေးပါ။
+#   mongo  - database.py (MongoDB၊ default)
+#   sqlite - sqlite_storage.py (SQLITE_PATH file၊ WAL mode) - network database မလိုတဲ့ ဆိုင်သေးများအတွက်
+#   memory - sqlite_storage.py (":memory:") - load test / local run အတွက်၊ process ရပ်ရင် data ပျောက်ပါမည်
+# Backend module တိုင်းသည် STORAGE_FUNCTIONS ထဲက function များကို နာမည်တူ၊ argument တူ၊ return တူ ဖြင့် ပေးရပါမည်။
+# Sales report ကို Mongo မှာ report.py (aggregation pipeline + cache) က တွက်ပြီး အခြား backend များသည်
+# report.sales_report နဲ့ ပုံစံတူ sales_report(start, end, granularity) ကို ကိုယ်တိုင် ပေးရပါမည်။
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo").strip().lower()
+
+BACKEND_MODULES = {
+    "mongo": "database",
+    "sqlite": "sqlite_storage",
+    "memory": "sqlite_storage",
+}
+
+# Hot path တွေမှာ orders/topups array အကြီးကြီးတွေကို မသယ်ဖို့ လိုတဲ့ field တွေကိုသာ ယူပါ
+BALANCE_FIELDS = ("balance",)
+PROFILE_FIELDS = ("user_id", "name", "username", "balance", "pending_topup_count")
+SUMMARY_FIELDS = PROFILE_FIELDS + ("order_count", "topup_count", "pending_topup_amount")
+USER_BATCH_SIZE = 500
+
+# Process တိုင်းက memory ထဲမှာ cache လုပ်ထားတဲ့ collection/table များ (watcher.py)
+WATCHED_COLLECTIONS = ("settings", "prices", "admins", "auth_users")
+
+# Balance ledger: user balance/clone bot balance ပြောင်းတိုင်း entry တစ်ခု ထည့်ပြီး snapshot ကို
+# LEDGER_SNAPSHOT_INTERVAL_SECONDS တိုင်း ယူပါ။ User balance ၏ account_id သည် user_id ဖြစ်ပါတယ်။
+LEDGER_SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get("LEDGER_SNAPSHOT_INTERVAL_SECONDS", str(60 * 60)))
+
+def clone_bot_account(bot_id):
+    """Clone bot balance ၏ ledger account_id"""
+    return f"clone_bot:{bot_id}"
+
+STORAGE_FUNCTIONS = (
+    # Users
+    "get_user", "get_user_profile", "get_user_summary", "iter_users", "iter_user_batches", "create_user",
+    "get_balance", "has_pending_topup", "backfill_pending_topup_counts", "update_balance",
+    # Balance ledger
+    "ledger_balance", "get_ledger_entries", "snapshot_balances", "open_balance_ledger",
+    # Schema / startup
+    "ensure_indexes", "verify_query_plans", "legacy_records_pending",
+    "daily_stats_ready", "rebuild_daily_stats", "group_chats_ready", "backfill_group_chats",
+    # Orders & topups
+    "add_order", "place_order", "add_topup", "find_and_update_order", "find_and_update_topup",
+    "approve_topup", "cancel_order", "get_recent_history", "get_history_page", "get_user_orders",
+    "get_user_topups", "get_order_by_id", "get_topup_by_id", "get_latest_pending_topup",
+    "get_group_chat_ids", "list_group_chats", "count_group_chats",
+    # Prices, auth, admins, settings
+    "load_prices", "save_prices",
+    "is_user_authorized", "count_authorized_users", "add_authorized_user", "remove_authorized_user",
+    "migrate_auth_list",
+    "load_admin_ids", "add_admin", "remove_admin",
+    "load_settings", "update_setting", "get_cache_versions",
+    # Clone bots
+    "load_clone_bots", "save_clone_bot", "remove_clone_bot", "get_clone_bot_by_admin",
+    "update_clone_bot_balance",
+)
+
+_backend = None
+
+def load_backend():
+    """
+    STORAGE_BACKEND အတိုင်း backend module ကို import လုပ်ပြီး interface ပြည့်စုံမှု စစ်ပါ။ (ပထမအကြိမ်သာ)
+    Backend အမည်မှား၊ function ကျန်၊ (သို့) MongoDB မချိတ်နိုင်ရင် data အလွတ်များ မပြန်ဘဲ RuntimeError ဖြစ်ပါတယ်။
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    if STORAGE_BACKEND not in BACKEND_MODULES:
+        raise RuntimeError(f"STORAGE_BACKEND '{STORAGE_BACKEND}' မရှိပါ။ ({', '.join(BACKEND_MODULES)})")
+    backend = importlib.import_module(BACKEND_MODULES[STORAGE_BACKEND])
+    required = STORAGE_FUNCTIONS + (() if STORAGE_BACKEND == "mongo" else ("sales_report",))
+    missing = [name for name in required if not callable(getattr(backend, name, None))]
+    if missing:
+        raise RuntimeError(f"{backend.__name__} တွင် storage function များ မရှိပါ: {', '.join(missing)}")
+    if STORAGE_BACKEND == "mongo" and not backend.client:
+        raise RuntimeError("MongoDB နှင့် ချိတ်ဆက်၍ မရပါ။")
+    print(f"🗄️ Storage backend: {STORAGE_BACKEND}")
+    _backend = backend
+    return backend
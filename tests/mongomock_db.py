@@ -0,0 +1,41 @@
+# tests/mongomock_db.py
+
+import os
+
+import mongomock
+import pymongo
+from mongomock.collection import BulkOperationBuilder
+
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200")
+os.environ.setdefault("ADMIN_ID", "1")
+
+# --- mongomock ဖြင့် database.py ---
+# Test များသည် MongoDB server မလိုဘဲ database.py ကို mongomock client ဖြင့် import လုပ်ပြီး
+# Collection state ကိုသာ စစ်ပါတယ်။ pymongo အသစ်က bulk update တွင် sort ကို ပို့ပေမယ့်
+# mongomock က မသိသေးလို့ ဒီ argument ကိုသာ ဖယ်ပါ။
+
+_add_update = BulkOperationBuilder.add_update
+
+def _add_update_without_sort(self, *args, sort=None, **kwargs):
+    return _add_update(self, *args, **kwargs)
+
+BulkOperationBuilder.add_update = _add_update_without_sort
+
+def load_database():
+    """database module ကို mongomock client ဖြင့် (ပထမအကြိမ်သာ) import လုပ်ပြီး ပြန်ပေးပါ။"""
+    mongo_client = pymongo.MongoClient
+    pymongo.MongoClient = lambda *args, **kwargs: mongomock.MongoClient(tz_aware=True)
+    try:
+        import database
+    finally:
+        pymongo.MongoClient = mongo_client
+    return database
+
+def reset_database(db):
+    """Collection အားလုံးကို ဖျက်ပြီး process-level flag များကို ပြန်စပါ။ (mongomock မှာ transaction မရှိပါ)"""
+    for name in db.db.list_collection_names():
+        db.db.drop_collection(name)
+    db._transactions_supported = False
+    db._legacy_pending = False
+    db._daily_stats_ready = None
+    db._group_chats_ready = None
@@ -0,0 +1,44 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import clock
+
+YANGON = ZoneInfo("Asia/Yangon")
+
+
+@unittest.skipUnless(clock.BUSINESS_TZ.key == "Asia/Yangon", "BUSINESS_TIMEZONE is overridden")
+class BusinessDayTest(unittest.TestCase):
+
+    def test_day_key_switches_at_yangon_midnight(self):
+        midnight = datetime(2024, 1, 1, 17, 30, tzinfo=timezone.utc) # 2024-01-02 00:00 +06:30
+        self.assertEqual(clock.day_key(midnight), "2024-01-02")
+        self.assertEqual(clock.day_key(midnight - timedelta(milliseconds=1)), "2024-01-01")
+
+    def test_period_range_is_yangon_midnight(self):
+        start, end = clock.period_range("2024-01-02")
+        self.assertEqual(start, datetime(2024, 1, 1, 17, 30, tzinfo=timezone.utc))
+        self.assertEqual(end - start, timedelta(days=1))
+        self.assertTrue(clock.is_day_start(start))
+        self.assertFalse(clock.is_day_start(start.astimezone(timezone.utc).replace(hour=0, minute=0)))
+
+    def test_period_range_month_and_year_rollover(self):
+        self.assertEqual(clock.period_range("2023-12"),
+                         (datetime(2023, 12, 1, tzinfo=YANGON), datetime(2024, 1, 1, tzinfo=YANGON)))
+        self.assertEqual(clock.period_range("2023", "2024"),
+                         (datetime(2023, 1, 1, tzinfo=YANGON), datetime(2025, 1, 1, tzinfo=YANGON)))
+        self.assertEqual(clock.period_range("2024-02-28", "2024-02-29")[1], datetime(2024, 3, 1, tzinfo=YANGON))
+
+    def test_day_key_round_trips_period_range(self):
+        for key in ("2024-01-01", "2024-02-29", "2024-12-31"):
+            start, end = clock.period_range(key)
+            self.assertEqual(clock.day_key(start), key)
+            self.assertEqual(clock.day_key(end - timedelta(milliseconds=1)), key)
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            clock.period_range("2024-13")
+
+
+if __name__ == "__main__":
+    unittest.main()
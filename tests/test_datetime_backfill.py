@@ -0,0 +1,35 @@
+import unittest
+from datetime import datetime
+
+from mongomock_db import load_database, reset_database
+
+db = load_database()
+
+import migrations
+
+
+class BackfillDatetimesTest(unittest.TestCase):
+
+    def setUp(self):
+        reset_database(db)
+        db.orders_collection.insert_one({"order_id": "O1", "status": "pending", "timestamp": "2024-01-01T10:00:00+06:30"})
+        db.clone_bots_collection.insert_one({"_id": "9", "created_at": "2024-01-01 10:00:00"})
+
+    def test_converts_strings_once(self):
+        self.assertEqual(migrations.backfill_datetimes(), 2)
+        self.assertIsInstance(db.orders_collection.find_one()["timestamp"], datetime)
+        self.assertIsInstance(db.clone_bots_collection.find_one()["created_at"], datetime)
+        # ပြီးသွားတဲ့ collection များကို ထပ်မ scan ပါ
+        db.orders_collection.insert_one({"order_id": "O2", "status": "pending", "timestamp": "2024-01-02T10:00:00+06:30"})
+        self.assertEqual(migrations.backfill_datetimes(), 0)
+
+    def test_new_collection_is_scanned_after_marker(self):
+        names = [name for name, _ in migrations.DATETIME_BACKFILL_FIELDS if name != "clone_bots"]
+        db.migrations_collection.insert_one({"_id": migrations.DATETIME_BACKFILL_ID, "collections": names})
+        self.assertEqual(migrations.backfill_datetimes(), 1)
+        self.assertIsInstance(db.clone_bots_collection.find_one()["created_at"], datetime)
+        self.assertIsInstance(db.orders_collection.find_one()["timestamp"], str)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from datetime import timedelta
+
+from mongomock_db import load_database, reset_database
+
+db = load_database()
+
+import clock
+
+
+class HistoryWithArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        reset_database(db)
+        now = clock.now().replace(microsecond=0)
+        # O1 ကို အစောဆုံး တင်ခဲ့ပေမယ့် ယနေ့မှ confirm ဖြစ်လို့ hot ထဲမှာ ကျန်ပြီး O2-O4 က archive ထဲ ရောက်နေပါတယ်
+        db.orders_collection.insert_many([
+            {"order_id": "O1", "user_id": "5", "status": "confirmed", "timestamp": now - timedelta(days=90), "confirmed_at": now},
+            {"order_id": "O5", "user_id": "5", "status": "pending", "timestamp": now},
+        ])
+        db.archive_of(db.orders_collection).insert_many([
+            {"order_id": f"O{day}", "user_id": "5", "status": "confirmed",
+             "timestamp": now - timedelta(days=70 - day), "confirmed_at": now - timedelta(days=69 - day)}
+            for day in (2, 3, 4)
+        ])
+
+    def order_ids(self, page, page_size=2):
+        history = db.get_history_page("5", page=page, page_size=page_size)
+        return [order["order_id"] for order in history["orders"][:page_size]], history["has_next"]
+
+    def test_pages_follow_timestamp_across_hot_and_archive(self):
+        self.assertEqual(self.order_ids(0), (["O5", "O4"], True))
+        self.assertEqual(self.order_ids(1), (["O3", "O2"], True))
+        self.assertEqual(self.order_ids(2), (["O1"], False))
+
+    def test_recent_history_merges_archive(self):
+        orders = db.get_recent_history("5", limit=3)["orders"]
+        self.assertEqual([order["order_id"] for order in orders], ["O5", "O4", "O3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+import ids
+
+
+class NewUlidTest(unittest.TestCase):
+
+    def test_format(self):
+        ulid = ids.new_ulid()
+        self.assertEqual(len(ulid), 26)
+        self.assertTrue(set(ulid) <= set(ids.ENCODING))
+        self.assertTrue(ids.new_order_id().startswith("ORD"))
+        self.assertTrue(ids.new_topup_id().startswith("TOP"))
+
+    def test_monotonic_within_same_millisecond(self):
+        with mock.patch.object(ids.time, "time_ns", return_value=1_700_000_000_000 * 1_000_000):
+            generated = [ids.new_ulid() for _ in range(1000)]
+        self.assertEqual(generated, sorted(generated))
+        self.assertEqual(len(set(generated)), len(generated))
+
+    def test_monotonic_when_clock_goes_backwards(self):
+        with mock.patch.object(ids.time, "time_ns", return_value=1_800_000_000_000 * 1_000_000):
+            first = ids.new_ulid()
+        with mock.patch.object(ids.time, "time_ns", return_value=1_799_999_999_000 * 1_000_000):
+            second = ids.new_ulid()
+        self.assertLess(first, second)
+        self.assertEqual(first[:10], second[:10])
+
+    def test_random_overflow_moves_to_next_millisecond(self):
+        now_ns = 1_900_000_000_000 * 1_000_000
+        with mock.patch.object(ids.time, "time_ns", return_value=now_ns):
+            first = ids.new_ulid()
+            ids._last_random = (1 << ids.RANDOM_BITS) - 1
+            second = ids.new_ulid()
+        self.assertLess(first, second)
+        self.assertEqual(second[:10], ids._encode(1_900_000_000_001, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import timedelta
+
+from mongomock_db import load_database, reset_database
+
+db = load_database()
+
+import clock
+
+
+class BalanceLedgerTest(unittest.TestCase):
+
+    def setUp(self):
+        reset_database(db)
+        db.create_user("1", "A", "a")
+        db.create_user("2", "B", "b")
+        db.update_balance("1", 1000, "admin_topup")
+        db.update_balance("2", 50, "admin_topup")
+
+    def assertLedgerMatches(self):
+        for user_id in ("1", "2"):
+            self.assertEqual(db.ledger_balance(user_id), db.get_balance(user_id))
+
+    def test_ledger_matches_balance_across_snapshots(self):
+        self.assertEqual(db.place_order("1", {"order_id": "O1", "price": 300, "status": "pending", "timestamp": clock.now()}), 700)
+        self.assertEqual(db.snapshot_balances(), 2)
+        self.assertLedgerMatches()
+        db.cancel_order("O1", {"status": "cancelled", "cancelled_at": clock.now()})
+        self.assertLedgerMatches()
+        self.assertEqual(db.snapshot_balances(), 1) # Account 2 မှာ entry အသစ် မရှိပါ
+        db.update_balance("2", -20, "admin_deduct")
+        self.assertLedgerMatches()
+        db.snapshot_balances()
+        self.assertLedgerMatches()
+        self.assertEqual(db.balance_snapshots_collection.find_one({"_id": "1"})["balance"], 1000)
+
+    def test_late_committed_entry_is_not_lost(self):
+        db.snapshot_balances()
+        # Snapshot မတိုင်မီ created_at ဖြင့် နောက်ကျမှ commit ဖြစ်လာတဲ့ entry
+        db.users_collection.update_one({"user_id": "1"}, {"$inc": {"balance": 5}})
+        db.balance_ledger_collection.insert_one({"account_id": "1", "delta": 5, "reason": "late", "ref_id": None,
+                                                 "created_at": clock.now() - timedelta(hours=1)})
+        self.assertLedgerMatches()
+        db.snapshot_balances()
+        self.assertLedgerMatches()
+        self.assertEqual(db.balance_snapshots_collection.find_one({"_id": "1"})["balance"], 1005)
+
+    def test_interrupted_run_does_not_double_count(self):
+        db.snapshot_balances()
+        db.update_balance("1", 10, "admin_topup")
+        marker = db.migrations_collection.find_one({"_id": db.LEDGER_SNAPSHOT_ID})
+        run_id = marker["last_id"] + 1
+        # Entry များကို မှတ်ပြီး account 1 ကို ပေါင်းပြီးချိန်မှာ ရပ်သွားခဲ့သည်ဟု ယူဆပါ
+        db.migrations_collection.update_one({"_id": db.LEDGER_SNAPSHOT_ID}, {"$set": {"pending_id": run_id}})
+        db.balance_ledger_collection.update_many({"snapshot_id": None}, {"$set": {"snapshot_id": run_id}})
+        db.balance_snapshots_collection.update_one({"_id": "1"}, {"$inc": {"balance": 10}, "$set": {"last_id": run_id}})
+        self.assertLedgerMatches()
+        db.snapshot_balances()
+        self.assertLedgerMatches()
+        self.assertEqual(db.balance_snapshots_collection.find_one({"_id": "1"})["balance"], 1010)
+
+    def test_as_of_snapshots_are_carried_over(self):
+        as_of = clock.now() + timedelta(seconds=1)
+        for user_id, balance in (("1", 1000), ("2", 50)):
+            db.balance_snapshots_collection.insert_one({"_id": user_id, "balance": balance, "as_of": as_of})
+        db.migrations_collection.insert_one({"_id": db.LEDGER_SNAPSHOT_ID, "as_of": as_of})
+        db.snapshot_balances()
+        self.assertLedgerMatches()
+        db.update_balance("1", -100, "admin_deduct")
+        db.snapshot_balances()
+        self.assertLedgerMatches()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from mongomock_db import load_database, reset_database
+
+db = load_database()
+
+
+class ImportLegacyRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        reset_database(db)
+        db.orders_collection.create_index("order_id", unique=True)
+        db.topups_collection.create_index("topup_id", unique=True)
+
+    def users(self):
+        return [
+            {"_id": 1, "user_id": "A", "orders": [{"order_id": "ORD1", "timestamp": "2024-01-01T10:00:00", "price": 100}]},
+            {"_id": 2, "user_id": "B", "orders": [{"order_id": "ORD1", "timestamp": "2024-01-01T10:00:00", "price": 200}]},
+        ]
+
+    def orders(self):
+        return list(db.orders_collection.find({}, {"_id": 0}))
+
+    def test_cross_user_id_collision_suffixes_only_failed_record(self):
+        self.assertEqual(db.import_legacy_records(self.users()), (2, 0))
+        ids = sorted((doc["user_id"], doc["order_id"]) for doc in self.orders())
+        self.assertEqual(ids, [("A", "ORD1"), ("B", "ORD1-B-0")])
+        suffixed = db.orders_collection.find_one({"user_id": "B"})
+        self.assertEqual((suffixed["legacy_id"], suffixed["price"]), ("ORD1", 200))
+
+    def test_rerun_does_not_duplicate(self):
+        db.import_legacy_records(self.users())
+        db.import_legacy_records(self.users())
+        self.assertEqual(len(self.orders()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
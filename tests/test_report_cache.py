@@ -0,0 +1,84 @@
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from mongomock_db import load_database
+
+db = load_database()
+
+import clock
+import report
+
+
+class ReportCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        report._cache.clear()
+        self.computed = []
+
+        def compute(start, end, granularity):
+            self.computed.append((start, end, granularity))
+            return {"computed": len(self.computed)}
+
+        patches = [
+            mock.patch.object(report, "_compute_sales_report", compute),
+            mock.patch.object(db, "ANALYTICS_READS", False),
+            mock.patch.object(report.time, "monotonic", return_value=1000.0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.today = clock.period_range(clock.day_key())
+        self.past = clock.period_range("2020-01")
+
+    def test_closed_range_is_cached_without_expiry(self):
+        first = report.sales_report(*self.past)
+        report.time.monotonic.return_value = 10 ** 9
+        self.assertIs(report.sales_report(*self.past), first)
+        self.assertEqual(len(self.computed), 1)
+
+    def test_open_range_expires_for_other_processes_changes(self):
+        first = report.sales_report(*self.today)
+        self.assertIs(report.sales_report(*self.today), first)
+        report.time.monotonic.return_value = 1000.0 + report.REPORT_OPEN_TTL_SECONDS
+        self.assertIsNot(report.sales_report(*self.today), first)
+        self.assertEqual(len(self.computed), 2)
+
+    def test_status_change_drops_only_open_ranges(self):
+        report.sales_report(*self.past)
+        report.sales_report(*self.today)
+        report.invalidate_open_reports("order", {"status": "confirmed"})
+        self.assertIsNotNone(report.cached_sales_report(*self.past))
+        self.assertIsNone(report.cached_sales_report(*self.today))
+
+    def test_result_computed_before_invalidation_is_not_stored(self):
+        def compute(start, end, granularity):
+            report.invalidate_open_reports()
+            return {}
+
+        with mock.patch.object(report, "_compute_sales_report", compute):
+            report.sales_report(*self.today)
+        self.assertIsNone(report.cached_sales_report(*self.today))
+
+    def test_lru_evicts_least_recently_used(self):
+        days = [clock.period_range(f"2020-02-{day:02d}") for day in range(1, 5)]
+        with mock.patch.object(report, "REPORT_CACHE_MAX_SIZE", 3):
+            for day in days[:3]:
+                report.sales_report(*day)
+            report.sales_report(*days[0]) # အသုံးပြုလို့ နောက်ဆုံးသို့ ရွှေ့
+            report.sales_report(*days[3])
+        self.assertIsNone(report.cached_sales_report(*days[1]))
+        for day in (days[0], days[2], days[3]):
+            self.assertIsNotNone(report.cached_sales_report(*day))
+
+    def test_yesterday_on_secondary_waits_for_staleness(self):
+        yesterday = clock.period_range(clock.day_key(clock.now() - timedelta(days=1)))
+        with mock.patch.object(db, "ANALYTICS_READS", True), \
+             mock.patch.object(report.clock, "now", return_value=yesterday[1]):
+            report.sales_report(*yesterday)
+        _, expires_at = report._cache[(*yesterday, "day")]
+        self.assertEqual(expires_at, 1000.0 + db.ANALYTICS_MAX_STALENESS_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+import clock
+import sqlite_storage as store
+
+
+def scenario():
+    """SQLite file (WAL) နဲ့ :memory: backend နှစ်ခုလုံးမှာ တူညီတဲ့ order/topup flow ကို run ပါ။"""
+    now = clock.now()
+    store.create_user("1", "A", "a")
+    results = [store.update_balance("1", 1000, "admin_topup")]
+    results.append(store.place_order("1", {"order_id": "O1", "price": 300, "status": "pending", "timestamp": now}))
+    results.append(store.place_order("1", {"order_id": "O2", "price": 5000, "status": "pending", "timestamp": now}))
+    store.add_topup("1", {"topup_id": "T1", "amount": 500, "status": "pending", "timestamp": now})
+    results.append(store.has_pending_topup("1"))
+    results.append(store.approve_topup("T1", {"status": "approved", "approved_at": now}))
+    results.append(store.approve_topup("T1", {"status": "approved", "approved_at": now}))
+    results.append(store.has_pending_topup("1"))
+    results.append(store.cancel_order("O1", {"status": "cancelled", "cancelled_at": now}))
+    history = store.get_history_page("1", page=0, page_size=5)
+    results.append(([order["order_id"] for order in history["orders"]], [topup["topup_id"] for topup in history["topups"]]))
+    results.append((store.get_balance("1"), store.ledger_balance("1")))
+    return results
+
+
+class SqliteBackendParityTest(unittest.TestCase):
+
+    def run_on(self, path):
+        conn = store.connect(path)
+        try:
+            with mock.patch.object(store, "_conn", conn):
+                return scenario()
+        finally:
+            conn.close()
+
+    def test_file_and_memory_backends_agree(self):
+        with tempfile.TemporaryDirectory() as directory:
+            on_file = self.run_on(os.path.join(directory, "bot.db"))
+        in_memory = self.run_on(":memory:")
+        self.assertEqual(on_file, in_memory)
+        self.assertEqual(in_memory[1], 700)
+        self.assertIsNone(in_memory[2]) # Balance မလုံလောက်
+        self.assertEqual((in_memory[3], in_memory[5], in_memory[6]), (True, None, False))
+        self.assertEqual(in_memory[4]["balance"], 1200)
+        self.assertEqual(in_memory[7]["balance"], 1500)
+        self.assertEqual(in_memory[-2], (["O1"], ["T1"]))
+        self.assertEqual(in_memory[-1], (1500, 1500))
+
+
+if __name__ == "__main__":
+    unittest.main()
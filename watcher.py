@@ -0,0 +1,115 @@
+# watcher.py
+
+import os
+import sqlite3
+import threading
+
+import pymongo
+
+import database as db
+import storage
+
+# --- Cache Invalidation Watcher ---
+# settings/prices/admins/auth_users collection များကို change stream ဖြင့် စောင့်ကြည့်ပြီး ပြောင်းတာနဲ့
+# subscribe လုပ်ထားတဲ့ callback များကို ခေါ်ပါ။ Bot process အများအပြား run ထားလည်း /maintenance၊ /setprice
+# ကဲ့သို့ ပြောင်းလဲမှုကို တစ်စက္ကန့်အတွင်း မြင်ရပြီး command တိုင်းမှာ DB ကို ပြန်မဖတ်ရပါ။
+# Change stream မရတဲ့ standalone server နဲ့ SQLite backend မှာ cache_versions များကို poll လုပ်ပါ။
+# Memory backend သည် process တစ်ခုတည်းမှာသာ ရှိလို့ watcher မလိုပါ။
+
+POLL_INTERVAL_SECONDS = float(os.environ.get("CACHE_POLL_INTERVAL_SECONDS", "1"))
+RETRY_SECONDS = 5
+
+CHANGE_STREAMS_UNSUPPORTED = (40573,) # The $changeStream stage is only supported on replica sets
+CHANGE_STREAM_HISTORY_LOST = 286
+POLL_ERRORS = (pymongo.errors.PyMongoError, sqlite3.Error)
+
+_listeners = {}
+_thread = None
+_stop = threading.Event()
+
+def subscribe(collection_name, callback):
+    """
+    collection_name ပြောင်းတိုင်း callback(document_id) ကို watcher thread ထဲမှာ ခေါ်ပါ။
+    document_id သည် ပြောင်းသွားတဲ့ document ၏ _id ဖြစ်ပြီး မသိရင် (poll/resume) None ဖြစ်ပါတယ်။
+    """
+    _listeners.setdefault(collection_name, []).append(callback)
+
+def _notify(collection_name, document_id=None):
+    for callback in _listeners.get(collection_name, []):
+        try:
+            callback(document_id)
+        except Exception as e:
+            print(f"❌ Cache invalidation callback error ({collection_name}): {e}")
+
+def _notify_all():
+    for collection_name in storage.WATCHED_COLLECTIONS:
+        _notify(collection_name)
+
+def _watch_change_streams():
+    """Change stream ဖြင့် စောင့်ကြည့်ပါ။ Server က change stream မထောက်ပံ့ရင် False ပြန်ပေးပါ။"""
+    resume_token = None
+    pipeline = [{"$match": {"ns.coll": {"$in": list(storage.WATCHED_COLLECTIONS)}}}]
+    while not _stop.is_set():
+        try:
+            with db.db.watch(pipeline, resume_after=resume_token, max_await_time_ms=1000) as stream:
+                if resume_token is None:
+                    print("👀 Cache watcher: change stream ဖြင့် စောင့်ကြည့်နေပါပြီ။")
+                while not _stop.is_set() and stream.alive:
+                    change = stream.try_next()
+                    if change:
+                        if change["operationType"] in ("drop", "rename", "dropDatabase", "invalidate"):
+                            _notify_all()
+                        else:
+                            _notify(change["ns"]["coll"], change.get("documentKey", {}).get("_id"))
+                    resume_token = stream.resume_token
+        except pymongo.errors.OperationFailure as e:
+            if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                return False
+            if e.code == CHANGE_STREAM_HISTORY_LOST:
+                resume_token = None # Oplog ထဲက ကျော်သွားလို့ cache အားလုံးကို ပြန် load ခိုင်းပါ
+                _notify_all()
+            print(f"❌ Cache watcher change stream error: {e}")
+            _stop.wait(RETRY_SECONDS)
+        except pymongo.errors.PyMongoError as e:
+            # Resume token ဖြင့် ပြန်ချိတ်ရင် ပြတ်နေစဉ်က ပြောင်းလဲမှုများကိုပါ ပြန်ရပါတယ်
+            print(f"❌ Cache watcher change stream error: {e}")
+            _stop.wait(RETRY_SECONDS)
+    return True
+
+def _poll_versions():
+    """cache_versions document များကို POLL_INTERVAL_SECONDS တိုင်း ဖတ်ပြီး version ပြောင်းရင် invalidate လုပ်ပါ။"""
+    print(f"👀 Cache watcher: {POLL_INTERVAL_SECONDS:g}s တိုင်း version poll လုပ်နေပါပြီ။")
+    versions = None
+    while not _stop.is_set():
+        try:
+            current = storage.load_backend().get_cache_versions()
+            if versions is not None:
+                for collection_name in storage.WATCHED_COLLECTIONS:
+                    if current.get(collection_name) != versions.get(collection_name):
+                        _notify(collection_name)
+            versions = current
+        except POLL_ERRORS as e:
+            # ယခင် versions ကို ဆက်ထားလို့ ပြန်ချိတ်မိရင် ပြတ်နေစဉ်က ပြောင်းလဲမှုကိုပါ သိပါမည်
+            print(f"❌ Cache watcher poll error: {e}")
+        _stop.wait(POLL_INTERVAL_SECONDS)
+
+def _run():
+    if storage.STORAGE_BACKEND != "mongo":
+        _poll_versions()
+    elif not _watch_change_streams() and not _stop.is_set():
+        print("⚠️ Change stream မရပါ (standalone server)။ Polling fallback ကို သုံးပါမည်။")
+        _poll_versions()
+
+def start():
+    """Watcher ကို daemon thread ဖြင့် စပါ။ စပြီးသားဆိုရင် ဘာမှ မလုပ်ပါ။"""
+    global _thread
+    if storage.STORAGE_BACKEND == "memory" or (storage.STORAGE_BACKEND == "mongo" and not db.client):
+        return
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="cache-watcher", daemon=True)
+    _thread.start()
+
+def stop():
+    _stop.set()